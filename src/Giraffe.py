@@ -3,33 +3,145 @@ Giraffe for Rhino v1.0.0 Beta
 Peter Szerzo
 """
 
+# modules only needed by some exports (live sync, catalogs, binary and background exports) are imported where they are used,
+# so that importing the engine stays cheap
 import math
-import string
-import rhinoscriptsyntax as rs
+import os
 import rhinoinput as ri
+import numbermap as nm
+import modelstore as ms
+import writers as wr
 import giraffe_configure as gc
 import giraffe_setup as gs
 
-def get_output_path():
 
-    """Returns output path as 'system.dat' in the directory of the Rhino model (Windows + Mac OS)."""
+class DeferredModule():
+
+    """Stands in for a module that is only imported once one of its attributes is used."""
+
+
+    def __init__(self, name):
+
+        self.name = name
+        self.module = None
+
+
+    def __getattr__(self, attr):
+
+        if self.module is None:
+
+            self.module = __import__(self.name)
+
+        return getattr(self.module, attr)
+
+
+# rhinoscriptsyntax is imported on first use of the document; outside of Rhino, a document is set through use_document
+rs = DeferredModule("rhinoscriptsyntax")
+
+
+def use_document(doc):
+
+    """Sets the document models are built from, in place of rhinoscriptsyntax (e.g. a headlessdocument.HeadlessDocument)."""
+
+    global rs
+
+    rs = doc
+
+
+def get_output_path(extension = ".dat"):
+
+    """Returns output path as '_system.dat' in the directory of the Rhino model (Windows + Mac OS).
+    Parameters:
+      extension = file extension, for files written next to the export (e.g. '.gmb')
+    """
 
     path = rs.DocumentPath()
     name = rs.DocumentName()
     
     if gc.operating_system == "mac":
 
-        path = path[:-len(name)] + "_system.dat"
+        path = path[:-len(name)] + "_system" + extension
 
     elif gc.operating_system == "win":
 
         i = path.rfind("\\")
 
-        path = path[:i] + "/_system.dat" 
+        path = path[:i] + "/_system" + extension
 
     return path
 
+
+def format_number(value):
+
+    """Returns the shortest string reading back as the same float, e.g. '2' for 2.0 and '0.1' for 0.1."""
+
+    s = repr(float(value))
+
+    if s.endswith(".0"):
+
+        s = s[:-2]
+
+    if s == "-0":
+
+        s = "0"
+
+    return s
+
+
+def split_key(key):
+
+    """Returns (Guid, piece index, member index) of an element key (see StructuralElement.get_key), e.g. ('...', 2, 1) for '... m1 2'."""
+
+    parts = key.split(" ")
+
+    segment = 0
+    member = 0
+
+    for part in parts[1:]:
+
+        if part.startswith("m"):
+
+            member = int(part[1:])
+
+        else:
+
+            segment = int(part)
+
+    return parts[0], segment, member
+
+
+def get_identity(element):
+
+    """Returns what identifies a node or element within its model: its row id for elements kept in a store (read back as new objects
+    every time, see StoredElementList), its id otherwise.
+    """
+
+    return getattr(element, "store_id", None) or id(element)
+
+
+def distance_to_segment(p, a, b):
+
+    """Returns distance from point p to the segment from a to b."""
+
+    d = [b[k] - a[k] for k in range(3)]
+    r = [p[k] - a[k] for k in range(3)]
+
+    length = sum([v * v for v in d])
+
+    s = min(max(sum([d[k] * r[k] for k in range(3)]) / length, 0.0), 1.0) if length else 0.0
+
+    return sum([(r[k] - s * d[k]) ** 2 for k in range(3)]) ** 0.5
+
+
 class GiraffeLayer():
+
+
+    # options in layer properties read by Giraffe, not exported, with functions validating their values: 'seg 8' (see get_segments),
+    # 'mesh 10x20' (see get_mesh)
+    options = {
+        "seg": lambda value: value.isdigit(),
+        "mesh": lambda value: len(value.lower().split("x")) == 2 and all([v.isdigit() for v in value.lower().split("x")])
+    }
     
 
     endpoints = None
@@ -49,6 +161,21 @@ class GiraffeLayer():
         self.endpoints = GiraffeLayer("output::startpoints").create().unlock().clear().set_color([85, 26, 139])
 
 
+    @classmethod
+    def reopen(self):
+
+        """Unlocks the output layer for an update of a built model (see StructuralModel.apply_changes), keeping the markers on it;
+        teardown locks it again.
+        """
+
+        if self.endpoints is None:
+
+            self.dummy = GiraffeLayer("giraffe-dummy").create()
+            self.endpoints = GiraffeLayer("output::startpoints").create()
+
+        self.endpoints.unlock()
+
+
     @classmethod
     def teardown(self):
 
@@ -110,8 +237,9 @@ class GiraffeLayer():
         self.path = name.split("::")
         self.depth = len(self.path)
         self.last = self.path[self.depth - 1]
-        
-        return self
+
+        # exports (regular and compact) are computed once, the layer name does not change
+        self._export = {}
 
 
     def create(self):
@@ -213,13 +341,24 @@ class GiraffeLayer():
 
         for obj in objects:
 
-            if rs.ObjectType(obj) == gs.allowed_object_types[self.path[1]]:
+            if self.is_allowed(obj):
 
                 allowed_objects.append(obj)
 
         return allowed_objects
 
 
+    def is_allowed(self, obj):
+
+        """Returns True for objects allowed in the layer: objects of the type of the layer, and block instances if they are expanded (see
+        giraffe_configure.expand_blocks).
+        """
+
+        typ = rs.ObjectType(obj)
+
+        return (typ == gs.allowed_object_types[self.path[1]]) or (gc.expand_blocks and (typ == gs.object_types["Block"]))
+
+
     def clear(self):
 
         """Deletes all objects from a given layer. Sublayer objects are kept.
@@ -260,6 +399,13 @@ class GiraffeLayer():
         return self
 
 
+    def is_locked(self):
+
+        """Returns True if the layer is locked."""
+
+        return rs.LayerLocked(self.name)
+
+
     def get_grp(self):
 
         """Returns group number from layer; -1 if not specified."""
@@ -288,6 +434,31 @@ class GiraffeLayer():
         return "grp " + str(grp)
 
 
+    def get_offset_name(self, offset):
+
+        """Returns the name of the layer with its group number offset (e.g. 'input::beams::12 [ncs 1]' for 'input::beams::2 [ncs 1]' and
+        an offset of 10); layers without group number are given the offset as group number.
+        """
+
+        if self.depth == 2:
+
+            return self.name + "::" + str(offset)
+
+        inp = ri.RhinoInput(self.path[2])
+
+        group = str(max(inp.get_no(), 0) + offset)
+
+        if inp.get_prop():
+
+            group += " [" + inp.get_prop() + "]"
+
+        if inp.get_name():
+
+            group += " {" + inp.get_name() + "}"
+
+        return "::".join(self.path[:2] + [group] + self.path[3:])
+
+
     def get_name(self):
 
         """Returns group name from layer (last child only)."""
@@ -295,15 +466,74 @@ class GiraffeLayer():
         return ri.RhinoInput(self.last).get_name()
 
 
-    def get_prop(self):
+    def split_prop(self):
 
-        """Returns structural properties from layer (last child only)."""
+        """Splits the layer property into the structural properties and the options read by Giraffe (see options).
+        Returns:
+          (list of property tokens, dictionary of option values by keyword)
+        """
 
         if self.depth == 2:
 
-            return ""
+            return [], {}
 
-        return ri.RhinoInput(self.last).get_prop()
+        tokens = ri.RhinoInput(self.last).get_prop().split()
+
+        kept = []
+        options = {}
+
+        i = 0
+
+        while i < len(tokens):
+
+            keyword = tokens[i].lower()
+
+            if (keyword in GiraffeLayer.options) and (i + 1 < len(tokens)) and GiraffeLayer.options[keyword](tokens[i + 1]):
+
+                options[keyword] = tokens[i + 1]
+
+                i += 2
+
+            else:
+
+                kept.append(tokens[i])
+
+                i += 1
+
+        return kept, options
+
+
+    def get_prop(self):
+
+        """Returns structural properties from layer (last child only), without the options read by Giraffe."""
+
+        return " ".join(self.split_prop()[0])
+
+
+    def get_segments(self):
+
+        """Returns number of line elements every line or curve on the layer is divided into ('seg 8' in the layer property); None if not set."""
+
+        value = self.split_prop()[1].get("seg")
+
+        return int(value) if value and int(value) > 0 else None
+
+
+    def get_mesh(self):
+
+        """Returns (rows, columns) of the grid of quads surfaces on the layer are meshed into ('mesh 10x20' in the layer property); None
+        if not set.
+        """
+
+        value = self.split_prop()[1].get("mesh")
+
+        if not value:
+
+            return None
+
+        rows, columns = [int(v) for v in value.lower().split("x")]
+
+        return (rows, columns) if rows > 0 and columns > 0 else None
 
 
     def get_type(self):
@@ -332,9 +562,26 @@ class GiraffeLayer():
         return "\n!*!Label " + self.path[1] + " .." + grp_string + " .. " + name + "\n"
 
 
-    def export(self):
+    def export(self, compact = False):
+
+        """Returns SOFiSTiK export (computed on first call). A compact export has no trailing spaces."""
+
+        if compact not in self._export:
+
+            output = self.build_export()
+
+            if compact:
+
+                output = "\n".join([line.rstrip() for line in output.split("\n")])
+
+            self._export[compact] = output
+
+        return self._export[compact]
 
-        """Returns SOFiSTiK export."""
+
+    def build_export(self):
+
+        """Builds SOFiSTiK export."""
 
         name = self.get_name() 
 
@@ -383,6 +630,13 @@ class StructuralElement:
         # reference to containing layer
         self.layer = None
 
+        # index of the piece of an object divided by Giraffe into several elements (e.g. curves, meshed surfaces); 0 for the first piece
+        self.segment = 0
+
+        # index of the object within the block definition for elements expanded from a block instance (see
+        # StructuralModel.add_block_instance); 0 for other elements
+        self.member = 0
+
         self.build_base()
 
 
@@ -394,15 +648,74 @@ class StructuralElement:
         # in this case, self.geo is None and the no, prop and name attributes stay as the default values set in the constructor
         if (self.geo):
 
-            attr = ri.RhinoInput(rs.ObjectName(self.geo))
+            self.set_input(rs.ObjectName(self.geo))
 
-            self.no = attr.get_no()
-            if (self.no != -1):
-                self.strict_naming = True
 
-            self.name = attr.get_name()
-            self.prop = attr.get_prop()
-        
+    def set_input(self, s):
+
+        """Sets number, property and name from a RhinoInput string (e.g. the name of an object in Rhino)."""
+
+        attr = ri.RhinoInput(s or "")
+
+        self.no = attr.get_no()
+        if (self.no != -1):
+            self.strict_naming = True
+
+        self.name = attr.get_name()
+        self.prop = attr.get_prop()
+
+
+    def get_node_attributes(self):
+
+        """Returns names of the node attributes set on the element (e.g. ['n1', 'n2'] for line elements)."""
+
+        return [attr for attr in ms.NODE_REFERENCES if getattr(self, attr, None) is not None]
+
+
+    def get_key(self):
+
+        """Returns key identifying the element between runs (see numbermap): the Guid, followed by the object index within the block
+        definition for elements expanded from a block instance ('m' and the index) and by the piece index for further pieces of an object
+        divided into several elements; None if the element cannot be identified.
+        """
+
+        if not self.geo:
+
+            return None
+
+        key = str(self.geo)
+
+        if self.member:
+
+            key += " m" + str(self.member)
+
+        if self.segment:
+
+            key += " " + str(self.segment)
+
+        return key
+
+
+    def make_piece(self, piece, segment):
+
+        """Sets up a further piece of the object of the element: same Guid and attributes, not numbered.
+        Parameters:
+          piece = new element of the same type
+          segment = index of the piece
+        Returns:
+          piece
+        """
+
+        piece.geo = self.geo
+        piece.grp = self.grp
+        piece.prop = self.prop
+        piece.name = self.name
+        piece.layer = self.layer
+        piece.segment = segment
+        piece.member = self.member
+
+        return piece
+
 
     def export_base(self):
 
@@ -411,6 +724,29 @@ class StructuralElement:
         return (self.typ + " no " + str(self.no))
 
 
+    def export_end(self, output, compact = False):
+
+        """Appends property and name to an element export. A compact export has no empty property field and no trailing space."""
+
+        if not compact:
+
+            output += " " + self.prop
+
+            if (self.name != ""):
+                output += "$ " + self.name
+
+            return output
+
+        if self.prop.strip() != "":
+
+            output += " " + self.prop.strip()
+
+        if (self.name != ""):
+            output += " $ " + self.name
+
+        return output
+
+
 
 class Node(StructuralElement):
     
@@ -465,46 +801,68 @@ class Node(StructuralElement):
         return (self.distance_to(n) < gc.tolerance)
 
 
-    def export_coordinates(self):
+    def get_key(self):
 
-        """Returns coordinate export."""
+        """Returns key identifying the node between runs: as for other elements for nodes with a Guid, the coordinates otherwise."""
 
-        return "x " + str(self.x) + "*#cf" + " y " + str(self.y) + "*#cf" + " z " + str(self.z) + "*#cf"
+        if self.geo:
 
+            return StructuralElement.get_key(self)
 
-    def export(self):
-        
-        """Returns SOFiSTiK export."""
+        return "pt " + repr(self.x) + " " + repr(self.y) + " " + repr(self.z)
 
-        output = self.export_base() + " " + self.export_coordinates() + " " + self.prop
 
-        if (self.name != ""):
-            output += "$ " + self.name
+    def export_coordinates(self, cf = None):
 
-        return output
+        """Returns coordinate export.
+        Parameters:
+          cf = conversion factor applied to the coordinates, written in meters; coordinates are written as multiples of #cf if not set
+        """
+
+        if cf is not None:
+
+            return "x " + format_number(self.x * cf) + " y " + format_number(self.y * cf) + " z " + format_number(self.z * cf)
+
+        return "x " + str(self.x) + "*#cf" + " y " + str(self.y) + "*#cf" + " z " + str(self.z) + "*#cf"
+
+
+    def export(self, cf = None):
+        
+        """Returns SOFiSTiK export.
+        Parameters:
+          cf = conversion factor for a compact export (see export_coordinates)
+        """
+
+        return self.export_end(self.export_base() + " " + self.export_coordinates(cf), cf is not None)
 
 
 class SpringSN(StructuralElement): # single node spring
     
 
-    def __init__(self, obj):
+    def __init__(self, obj, direction = None):
 
         """Constructor.
         Parameters:
           obj = Guid from Rhino
-          coordinates = if there is no Guid, coordinates should be set
+          direction = if there is no Guid, the normalized direction should be set
         """
         
         StructuralElement.__init__(self, obj, "spri")
-        self.build()
+        self.build(direction)
 
         # node is not set in the constructor
         self.n = None
         
         
-    def build(self):
+    def build(self, direction = None):
+
+        """Build spring from Rhino line or direction, whichever is set."""
+
+        if not self.geo:
+
+            self.dx, self.dy, self.dz = direction
 
-        """Build node from Rhino line."""
+            return
 
         pt1 = rs.CurveStartPoint(self.geo)
         pt2 = rs.CurveEndPoint(self.geo)
@@ -529,23 +887,25 @@ class SpringSN(StructuralElement): # single node spring
         return (self.n == elem.n) and (math.fabs(self.dx - elem.dx) < 0.001) and (math.fabs(self.dy - elem.dy) < 0.001) and (math.fabs(self.dz - elem.dz) < 0.001)
 
 
-    def export_direction(self):
+    def export_direction(self, compact = False):
 
         """Returns coordinate export."""
 
-        return "dx " + str(self.dx) + " dy " + str(self.dy) + " dz " + str(self.dz)
+        if compact:
 
+            return "dx " + format_number(self.dx) + " dy " + format_number(self.dy) + " dz " + format_number(self.dz)
 
-    def export(self):
-        
-        """Returns SOFiSTiK export."""
+        return "dx " + str(self.dx) + " dy " + str(self.dy) + " dz " + str(self.dz)
 
-        output = self.export_base() + " na " + str(self.n.no) + " " + self.export_direction() + " " + self.prop
 
-        if (self.name != ""):
-            output += "$ " + self.name
+    def export(self, cf = None):
+        
+        """Returns SOFiSTiK export.
+        Parameters:
+          cf = conversion factor for a compact export (see Node.export)
+        """
 
-        return output        
+        return self.export_end(self.export_base() + " na " + str(self.n.no) + " " + self.export_direction(cf is not None), cf is not None)
 
 
 
@@ -562,6 +922,9 @@ class LineElement(StructuralElement):
         self.n1 = None
         self.n2 = None
 
+        # Guid of the start point marker (see mark_start_point); None if not marked
+        self.marker = None
+
 
     def build(self):
 
@@ -589,7 +952,31 @@ class LineElement(StructuralElement):
         """Marks start point by drawing a point in 1/10 the way towards the endpoint."""
 
         GiraffeLayer.endpoints.set_current()
-        rs.AddPoint(self.get_point_on(0.1))
+        self.marker = rs.AddPoint(self.get_point_on(0.1))
+
+
+    def split(self, nodes):
+
+        """Splits the element at nodes: the element becomes the first piece, further pieces are created with the same attributes.
+        Pieces created are not numbered, the first piece keeps the number.
+        Parameters:
+          nodes = nodes from the start node to the end node, in order along the element
+        Returns:
+          list of pieces
+        """
+
+        pieces = [self]
+
+        for i in range(1, len(nodes) - 1):
+
+            pieces.append(self.make_piece(LineElement(None, self.typ), self.segment + i))
+
+        for i, piece in enumerate(pieces):
+
+            piece.n1 = nodes[i]
+            piece.n2 = nodes[i + 1]
+
+        return pieces
 
 
     def identical_to(self, elem):
@@ -599,16 +986,14 @@ class LineElement(StructuralElement):
         return (self.n1 == elem.n1) and (self.n2 == elem.n2)
 
 
-    def export(self):
-
-        """Returns SOFiSTiK export."""
-
-        output = self.export_base() + " na " + str(self.n1.no) + " ne " + str(self.n2.no) + " " + self.prop
+    def export(self, cf = None):
 
-        if (self.name != ""):
-            output += "$ " + self.name
+        """Returns SOFiSTiK export.
+        Parameters:
+          cf = conversion factor for a compact export (see Node.export)
+        """
 
-        return output
+        return self.export_end(self.export_base() + " na " + str(self.n1.no) + " ne " + str(self.n2.no), cf is not None)
 
 
 class AreaElement(StructuralElement):
@@ -641,16 +1026,16 @@ class AreaElement(StructuralElement):
         return (self.n1 == elem.n1) and (self.n2 == elem.n2) and (self.n3 == elem.n3) and (self.n4 == elem.n4)
 
 
-    def export(self):
-
-        """Returns SOFiSTiK export."""
+    def export(self, cf = None):
 
-        output = self.export_base() + " n1 " + str(self.n1.no) + " n2 " + str(self.n2.no) + " n3 " + str(self.n3.no) + " n4 " + str(self.n4.no) + " " + self.prop
+        """Returns SOFiSTiK export.
+        Parameters:
+          cf = conversion factor for a compact export (see Node.export)
+        """
 
-        if (self.name != ""):
-            output += "$ " + self.name
+        output = self.export_base() + " n1 " + str(self.n1.no) + " n2 " + str(self.n2.no) + " n3 " + str(self.n3.no) + " n4 " + str(self.n4.no)
 
-        return output
+        return self.export_end(output, cf is not None)
 
 
 class ElementList:
@@ -663,24 +1048,131 @@ class ElementList:
         self.name = name
         self._list = []
         self._errors = []
-        
 
-    def get_identical_to(self, element):
+        # elements by (grp, no), lowest possibly free number by (grp, block)
+        self._numbers = {}
+        self._lowest_free = {}
 
-        """Returns first element in the list that is identical to the specified element. Returns None if none found."""
+        # numbers from previous runs (numbermap.NumberMap); None if not used
+        self.number_map = None
 
-        already_in_list = False
+        # size of the number blocks of layer groups (see get_block); numbers are not blocked if None
+        self.block_size = None
+        self._overflowed = []
+
+        # sections and materials properties may reference (catalog.Catalog); None if not used
+        self.catalog = None
+
+        # nodes of the list by location (splitting.NodeIndex), built on first use and kept up to date as nodes are added and removed
+        self._node_index = None
+
+        # elements inserted, removed, renumbered or pointed to other nodes since the changes were last collected, by identity (see
+        # track_changes); None if changes are not tracked
+        self._changed = None
         
-        for item in self._list:
 
-            if element.identical_to(item):
+    def is_empty(self):
 
-                return item
+        """Returns True if the list has no elements."""
 
-        return None
+        return self._list == []
 
 
-    def is_taken_number(self, number, grp = -1):
+    def iterate(self):
+
+        """Returns elements in the order they were added."""
+
+        return self._list
+
+
+    def iterate_by_layer(self):
+
+        """Returns elements grouped by layer as a list of (layer, elements) tuples.
+        Layers are in order of first appearance, elements in the order they were added; elements without a layer are grouped under None.
+        """
+
+        groups = []
+        index = {}
+
+        for item in self.iterate():
+
+            key = item.layer.name if item.layer else None
+
+            if key not in index:
+
+                index[key] = len(groups)
+                groups.append((item.layer, []))
+
+            groups[index[key]][1].append(item)
+
+        return groups
+
+
+    def track_changes(self):
+
+        """Starts tracking the elements inserted, removed, renumbered or pointed to other nodes, e.g. to update an export record by record
+        (see exportdaemon). Only lists kept in memory are tracked.
+        Returns:
+          self
+        """
+
+        self._changed = {}
+
+        return self
+
+
+    def collect_changes(self):
+
+        """Returns the elements changed since the changes were last collected, by identity (see get_identity), and starts over. Removed
+        elements are included, they are no longer registered (see is_registered).
+        """
+
+        changed, self._changed = self._changed, {}
+
+        return changed
+
+
+    def mark_changed(self, element):
+
+        """Notes a change of an element if changes are tracked (see track_changes)."""
+
+        if self._changed is not None:
+
+            self._changed[get_identity(element)] = element
+
+
+    def get_node_index(self):
+
+        """Returns the splitting.NodeIndex of the nodes of the list, used for node dedupe and location queries (see query)."""
+
+        if self._node_index is None:
+
+            import splitting as sp
+
+            self._node_index = sp.NodeIndex([item for item in self._list if item.typ == "node"], gc.tolerance)
+
+        return self._node_index
+
+
+    def get_identical_to(self, element):
+
+        """Returns first element in the list that is identical to the specified element. Returns None if none found."""
+
+        # nodes are looked up by location, the other elements compared to every element of the list
+        if element.typ == "node":
+
+            return self.get_node_index().get((element.x, element.y, element.z))
+
+        for item in self._list:
+
+            if element.identical_to(item):
+
+                return item
+
+        return None
+
+
+    def is_taken_number(self, number, grp = -1):
         
         """Returns True if a number if taken in a given group.
         Parameters:
@@ -690,31 +1182,102 @@ class ElementList:
           whether the given number/group combination is already taken
         """
 
-        for element in self._list:
-            
-            if (element.no == number) and (element.grp == grp):
-                
-                return True
-                
-        return False
+        return (grp, number) in self._numbers
 
 
-    def get_available_number(self, grp = -1):
+    def is_reserved_number(self, number, grp = -1):
+
+        """Returns True if a number was assigned to another element in a previous run and should be kept free for it."""
+
+        return bool(self.number_map) and self.number_map.is_reserved(number, grp)
+
+
+    def get_block_group(self, element):
+
+        """Returns the group whose number block an element is numbered in: the group of its layer; -1 if numbers are not blocked."""
+
+        if (not self.block_size) or (not element.layer):
+
+            return -1
+
+        return element.layer.get_grp()
+
+
+    def get_block(self, block = -1):
+
+        """Returns (first, last) number of the block of a group: grp * gdiv to (grp + 1) * gdiv - 1, the numbers SOFiSTiK assigns to the
+        group. Elements without group are numbered in the block of group 0. Not blocked: (1, None).
+        """
+
+        if not self.block_size:
+
+            return (1, None)
+
+        block = max(block, 0)
+
+        return (max(block * self.block_size, 1), (block + 1) * self.block_size - 1)
+
+
+    def is_in_block(self, number, block = -1):
+
+        """Returns True if a number is in the block of a group (always True if numbers are not blocked)."""
+
+        first, last = self.get_block(block)
+
+        return (number >= first) and ((last is None) or (number <= last))
+
+
+    def get_available_number(self, grp = -1, block = -1):
     
         """Returns lowest available number for a given group in the list.
         Parameters:
           grp = group number
+          block = group whose number block the number is taken from (see get_block_group)
         """
 
-        number = 1
+        number = self._lowest_free.get((grp, block), self.get_block(block)[0])
 
-        while(self.is_taken_number(number, grp)):
+        while(self.is_taken_number(number, grp) or self.is_reserved_number(number, grp)):
             
             number += 1
 
+        self._lowest_free[(grp, block)] = number
+
+        if not self.is_in_block(number, block):
+
+            self.report_overflow(block)
+
         return number    
 
 
+    def free_number(self, element):
+
+        """Makes the number of an element available to get_available_number again."""
+
+        block = self.get_block_group(element)
+
+        if self.is_in_block(element.no, block):
+
+            key = (element.grp, block)
+
+            self._lowest_free[key] = min(self._lowest_free.get(key, self.get_block(block)[0]), element.no)
+
+
+    def report_overflow(self, block):
+
+        """Adds an error for a group that ran out of numbers in its block (once per group)."""
+
+        if block in self._overflowed:
+
+            return
+
+        self._overflowed.append(block)
+
+        first, last = self.get_block(block)
+
+        self._errors.append("Number block of group " + str(max(block, 0)) + " (" + str(first) + " to " + str(last) + ") full, " + self.name + " numbered beyond " + str(last) + " belong to group " + str(max(block, 0) + 1) + " in SOFiSTiK.")
+
+
     def get_conflicting_element(self, new_element):
 
         """Returns element with a numbering conflict.
@@ -724,22 +1287,68 @@ class ElementList:
           conflicting element
         """
 
-        for element in self._list:
-            
-            if (element.no == new_element.no) and (element.grp == new_element.grp):
-                
-                return element
-                
-        return None
+        return self._numbers.get((new_element.grp, new_element.no))
+
+
+    def register_number(self, element):
+
+        """Indexes the number of an element in the list."""
+
+        self._numbers[(element.grp, element.no)] = element
+
+
+    def unregister_number(self, element):
+
+        """Removes the number of an element from the index, making it available again."""
+
+        key = (element.grp, element.no)
+
+        if self._numbers.get(key) is element:
+
+            del self._numbers[key]
+
+            self.free_number(element)
+
+
+    def is_registered(self, element):
+
+        """Returns True if the element is in the list (and its number indexed)."""
+
+        return self._numbers.get((element.grp, element.no)) is element
 
 
     def add_number(self, element):
 
-        """Add first available number to any element."""
+        """Add number to any element: the number from a previous run if still available, first available number otherwise."""
+
+        # elements already in the list are renumbered in place
+        registered = self.is_registered(element)
+
+        number = -1
+
+        block = self.get_block_group(element)
+
+        if self.number_map:
+
+            number = self.number_map.get(element.get_key(), element.grp)
+
+        # numbers from previous runs outside of the block, e.g. from before blocks were used, are not kept
+        if (number == -1) or self.is_taken_number(number, element.grp) or (not self.is_in_block(number, block)):
+
+            number = self.get_available_number(element.grp, block)
+
+        # released only now, so that an element renumbered over a numbering conflict does not get its number back
+        self.unregister_number(element)
+
+        element.no = number
+
+        if registered:
+
+            self.register_number(element)
+
+            self.mark_changed(element)
 
-        element.no = self.get_available_number(element.grp)
 
- 
     def resolve_numbering_conflict(self, existing_element, new_element):
 
         """Resolves numbering conflict between two elements based on specified rules.
@@ -765,265 +1374,2459 @@ class ElementList:
         return self
 
 
-    def add(self, new_element):
+    def renumber(self, items):
 
+        """Renumbers elements in a given order (see renumbering). Strict elements keep their numbers; the others exchange theirs within
+        their group and number block, in the given order, so that the numbers in use stay the same.
+        Parameters:
+          items = elements of the list in the new order
+        Returns:
+          self
         """
-        Adds new element to the list.
-        If identical element is found in the list, the method returns that element and does not add the new one.
-        If the new element has a -1 number (not specified), a new number is assigned.
-        If the new element has a number, potential numbering conflicts are resolved.
-        """
-        
-        identical = self.get_identical_to(new_element)
 
-        if identical:
+        numbers = {}
+        movable = {}
 
-            return identical
+        for item in items:
 
-        else:
+            if item.strict_naming:
 
-            if new_element.no == -1:
+                continue
 
-                self.add_number(new_element)
+            key = (item.grp, self.get_block_group(item))
 
-            else:
+            numbers.setdefault(key, []).append(item.no)
+            movable.setdefault(key, []).append(item)
 
-                conflict = self.get_conflicting_element(new_element)
+        for key in movable:
 
-                if conflict:
+            for item, number in zip(movable[key], sorted(numbers[key])):
 
-                    self.resolve_numbering_conflict(conflict, new_element)
-            
-            self._list.append(new_element)
+                if item.no != number:
 
-            return new_element
+                    item.no = number
 
+                    self.mark_changed(item)
 
-    def export_errors(self):
+        self._numbers = {}
 
-        """Returns all errors."""
+        for item in self._list:
 
-        output = ""
+            self.register_number(item)
 
-        for item in self._errors:
-            
-            output += "$ " + item + "\n"
+        return self
 
-        return output
 
+    def compact(self):
 
-    def export(self):
+        """Closes the gaps between numbers: non-strict elements take the lowest numbers of their group and number block, in one sweep in
+        the order of their numbers, so that their order is kept. Strict numbers are skipped; numbers from previous runs are not kept.
+        Returns:
+          list of (group, old number, new number) tuples of the elements renumbered
+        """
 
-        """Returns SOFiSTiK export."""
+        strict = set([(item.grp, item.no) for item in self._list if item.strict_naming])
 
-        if self._list == []:
+        movable = sorted([((item.grp, self.get_block_group(item), item.no), item) for item in self._list if not item.strict_naming],
+                         key = lambda pair: pair[0])
 
-            return ""
+        changes = []
 
-        output = "\n\n" + "!*!Label *** " + self.name.upper() + " ***\n"
+        key = None
+        number = None
 
-        output += self.export_errors()
+        for (grp, block, old), item in movable:
 
-        current_layer = -1
-        previous_layer = -1
+            if (grp, block) != key:
 
-        for item in self._list:
-            
-            previous_layer = current_layer
+                key = (grp, block)
+                number = self.get_block(block)[0]
 
-            current_layer = item.layer
+            while (grp, number) in strict:
 
-            # if layer changes while traversing list, add layer export at this location
-            if current_layer and (previous_layer != current_layer):
+                number += 1
 
-                output += current_layer.export()
+            if number != old:
 
-            # special case for the endpoints of structural elements that do not have a Guid in Rhino
-            elif (not current_layer) and (previous_layer != current_layer):
+                changes.append((grp, old, number))
 
-                output += "\n!*!Label nodes .. .. added and numbered by Giraffe" + "\n"
+                item.no = number
 
-            output += item.export() + "\n"
+                self.mark_changed(item)
 
-        return output
+            number += 1
+
+        self._numbers = {}
+        self._lowest_free = {}
 
+        for item in self._list:
 
+            self.register_number(item)
 
-class StructuralModel:
-    
+        return changes
 
-    unit_conversion = {
-        2: 0.001,
-        3: 0.01,
-        4: 1.0,
-        8: 0.0254,
-        9: 0.3048
-    }
-    
 
-    def __init__(self, name):   
+    def replace_nodes(self, replacements):
 
-        """Constructor
+        """Points the elements referencing replaced nodes to their replacements, in a single pass.
         Parameters:
-          name = model name
+          replacements = dictionary of new nodes by identity of the old node (see get_identity)
+        Returns:
+          self
         """
-    
-        self.conversion_factor = StructuralModel.unit_conversion[rs.UnitSystem()]
 
-        self.name = name    
-        
-        self.nodes = ElementList("nodes")
-        self.springs_sn = ElementList("single node springs")
-        self.line_elements = ElementList("line elements")
-        self.area_elements = ElementList("area elements")
-                
-        self.gdiv = 1000
-        self.current_group = -1
+        for element in self._list:
 
-        return self
+            for attr in element.get_node_attributes():
 
+                n = replacements.get(get_identity(getattr(element, attr)))
 
-    def add_node(self, obj, typ_sofi, layer):
+                if n is not None:
 
-        """Adds node from object."""
+                    setattr(element, attr, n)
 
-        n = Node(obj)
-        n.layer = layer
+                    self.mark_changed(element)
 
-        self.nodes.add(n)
+        return self
 
 
-    def add_line_element(self, obj, typ_sofi, layer):
+    def get_by_geometry(self, geo):
 
-        """Adds line element from object."""
+        """Returns all elements created from a given Guid."""
 
-        bm = LineElement(obj, typ_sofi)
-        bm.n1 = self.nodes.add(Node(None, rs.CurveStartPoint(obj)))
-        bm.n2 = self.nodes.add(Node(None, rs.CurveEndPoint(obj)))
+        return [item for item in self._list if item.geo == geo or (geo and item.geo and str(item.geo) == str(geo))]
 
-        bm.mark_start_point()
-        bm.layer = layer
 
-        self.line_elements.add(bm)
+    def reorder(self, elements):
 
+        """Sets the order of the elements in the list.
+        Parameters:
+          elements = all elements of the list, in the new order
+        Returns:
+          self
+        """
 
-    def add_spring_sn(self, obj, typ_sofi, layer):
+        self._list = list(elements)
 
-        """Adds single node spring element from object."""
+        # rebuilt on next use, the list may have changed
+        self._node_index = None
 
-        sp = SpringSN(obj)
-        sp.n = self.nodes.add(Node(None, rs.CurveStartPoint(obj)))
+        return self
 
-        sp.layer = layer
 
-        self.springs_sn.add(sp)   
+    def remove(self, element):
 
+        """Removes element from the list.
+        Returns:
+          self
+        """
 
-    def add_area_element(self, obj, typ_sofi, layer):
+        self._list.remove(element)
 
-        """Adds area element from object."""
+        self.unregister_number(element)
 
-        qd = AreaElement(obj)
+        self.mark_changed(element)
 
-        pts = rs.SurfacePoints(obj)
+        if (self._node_index is not None) and (element.typ == "node"):
 
-        qd.n1 = self.nodes.add(Node(None, pts[0]))
-        qd.n2 = self.nodes.add(Node(None, pts[1]))
-        qd.n3 = self.nodes.add(Node(None, pts[3]))
-        qd.n4 = self.nodes.add(Node(None, pts[2]))
+            self._node_index.remove(element)
 
-        qd.layer = layer
+        return self
 
-        self.area_elements.add(qd) 
 
+    def remove_where(self, condition):
 
-    def add_objects_from_layer(self, layer):
+        """Removes all elements meeting a condition in a single pass.
+        Parameters:
+          condition = function returning True for elements to remove
+        Returns:
+          list of removed elements
+        """
 
-        """Adds objects from a given layer to the ElementLists of the structural model."""
+        kept = []
+        removed = []
 
-        objects = layer.get_allowed_geometry()
+        for item in self._list:
 
-        typ_plural = layer.path[1]
-        typ_sofi = gs.plural_to_sofi[typ_plural]
+            if condition(item):
 
-        for obj in objects:
+                removed.append(item)
 
-            # !! REFACTOR TO CALL PROGRAMATICALLY -> ELIMINATE CONDITIONALS !!
+            else:
 
-            if typ_plural in gs.point_elements:
+                kept.append(item)
 
-                self.add_node(obj, typ_sofi, layer)
+        self._list = kept
 
-            if typ_plural in gs.line_elements:
+        for item in removed:
 
-                self.add_line_element(obj, typ_sofi, layer)
+            self.unregister_number(item)
 
-            if typ_plural in gs.spring_elements:
+            self.mark_changed(item)
 
-                self.add_spring_sn(obj, typ_sofi, layer)         
+            if (self._node_index is not None) and (item.typ == "node"):
 
-            if typ_plural in gs.area_elements:
+                self._node_index.remove(item)
 
-                self.add_area_element(obj, typ_sofi, layer) 
+        return removed
 
-        return self
 
+    def insert(self, element):
 
-    def build(self):
+        """Appends an element to the list, without any checks."""
 
-        """Builds model from current layer structure within the Rhino model."""
+        self._list.append(element)
 
-        layers = GiraffeLayer.get_all_structural()
-                    
-        for layer in layers:
+        self.register_number(element)
 
-            self.add_objects_from_layer(layer)
+        self.mark_changed(element)
 
-        return self
+        if (self._node_index is not None) and (element.typ == "node"):
 
+            self._node_index.add(element)
 
-    def get_export_header(self):
 
-        """Returns export header."""
+    def add(self, new_element, unique = False):
 
-        header = "$ generated by Giraffe for Rhino\n"
-        header += "+prog sofimsha\nhead " + self.name + "\n\n\n!*!Label *** SETUP ***\n" + "\nsyst 3d gdir negz gdiv 1000\n"
+        """
+        Adds new element to the list.
+        If identical element is found in the list, the method returns that element and does not add the new one. The search is skipped
+        for elements known to be unique (unique = True), e.g. found by a spatial index.
+        If the new element has a -1 number (not specified), a new number is assigned.
+        If the new element has a number, potential numbering conflicts are resolved.
+        """
+        
+        identical = None if unique else self.get_identical_to(new_element)
 
-        header += "\nlet#cf " + str(self.conversion_factor) + " $ conversion factor\n"
+        if identical:
+
+            return identical
+
+        else:
+
+            if new_element.no == -1:
+
+                self.add_number(new_element)
+
+            else:
+
+                conflict = self.get_conflicting_element(new_element)
+
+                if conflict:
+
+                    self.resolve_numbering_conflict(conflict, new_element)
+            
+            self.insert(new_element)
+
+            self.check_references(new_element.prop, new_element.typ + " " + str(new_element.no))
+
+            return new_element
+
+
+    def check_references(self, prop, source):
+
+        """Adds an error for every catalog entry referenced by a property that does not exist.
+        Parameters:
+          prop = property string
+          source = description of where the property comes from (e.g. 'beam 5')
+        """
+
+        if not self.catalog:
+
+            return
+
+        for error in self.catalog.validate(prop):
+
+            self._errors.append("Unknown reference in " + source + ": " + error + ".")
+
+
+    def get_number_map(self):
+
+        """Returns a NumberMap with the current numbers of all identifiable elements."""
+
+        number_map = nm.NumberMap()
+
+        for item in self.iterate():
+
+            number_map.set(item.get_key(), item.no, item.grp)
+
+        return number_map
+
+
+    def export_errors(self):
+
+        """Returns all errors."""
+
+        output = ""
+
+        for item in self._errors:
+            
+            output += "$ " + item + "\n"
+
+        return output
+
+
+    def traverse(self, writers, select = None):
+
+        """Hands the elements to writers in a single pass (see writers); lists and layers without elements are skipped.
+        Parameters:
+          writers = list of writers.Writer objects
+          select = identities of the elements to write (see get_identity, e.g. a part of the model); all elements if not set
+        Yields:
+          (writer, text) tuples in output order
+        """
+
+        if self.is_empty():
+
+            return
+
+        started = False
+
+        # one layer header per layer, even if elements from different layers were added alternately
+        for layer, items in self.iterate_by_layer():
+
+            layer_started = False
+
+            for item in items:
+
+                if (select is not None) and (get_identity(item) not in select):
+
+                    continue
+
+                if not started:
+
+                    started = True
+
+                    for writer in writers:
+
+                        yield writer, writer.begin_list(self)
+
+                if not layer_started:
+
+                    layer_started = True
+
+                    for writer in writers:
+
+                        yield writer, writer.begin_layer(layer, self)
+
+                for writer in writers:
+
+                    yield writer, writer.element(item, self)
+
+
+    def iter_export(self, cf = None, select = None):
+
+        """Yields SOFiSTiK export line by line.
+        Parameters:
+          cf = conversion factor for a compact export (see Node.export)
+          select = identities of the elements to export (see get_identity, e.g. a part of the model); all elements if not set
+        """
+
+        for writer, text in self.traverse([wr.SofimshaWriter(cf)], select):
+
+            yield text
+
+
+    def export(self, cf = None):
+
+        """Returns SOFiSTiK export."""
+
+        return "".join(self.iter_export(cf))
+
+
+
+class StoredElementList(ElementList):
+
+
+    def __init__(self, name, store, get_layer):
+
+        """Constructor.
+        Parameters:
+          name = list name
+          store = modelstore.SQLiteStore holding the elements
+          get_layer = function returning a GiraffeLayer by name
+        """
+
+        ElementList.__init__(self, name)
+
+        self.store = store
+        self.get_layer = get_layer
+
+
+    def to_record(self, element):
+
+        """Returns store record of an element."""
+
+        record = {
+            "typ": element.typ,
+            "no": element.no,
+            "grp": element.grp,
+            "strict": int(element.strict_naming),
+            "prop": element.prop,
+            "name": element.name,
+            "layer": element.layer.name if element.layer else None,
+            "geo": str(element.geo) if element.geo else None,
+            "marker": str(element.marker) if getattr(element, "marker", None) else None,
+            "topo": self.get_topology_key(element)
+        }
+
+        for attr in ["x", "y", "z", "dx", "dy", "dz"]:
+
+            if hasattr(element, attr):
+
+                record[attr] = getattr(element, attr)
+
+        for attr in element.get_node_attributes():
+
+            record[attr] = getattr(element, attr).store_id
+
+        return record
+
+
+    def to_element(self, row):
+
+        """Returns element from a store row. Referenced nodes are only set if the row comes with joined node columns (see iterate)."""
+
+        typ = row["typ"]
+
+        if typ == "node":
+
+            item = Node(None, [row["x"], row["y"], row["z"]])
+
+        elif typ == "quad":
+
+            item = AreaElement(None)
+
+        elif typ == "spri":
+
+            item = SpringSN(None, [row["dx"], row["dy"], row["dz"]])
+
+        else:
+
+            item = LineElement(None, typ)
+
+        item.store_id = row["id"]
+        item.geo = row["geo"]
+        item.no = row["no"]
+        item.grp = row["grp"]
+        item.strict_naming = bool(row["strict"])
+        item.prop = row["prop"]
+        item.name = row["name"]
+        item.layer = self.get_layer(row["layer"]) if row["layer"] else None
+
+        if typ not in ["node", "quad", "spri"]:
+
+            item.marker = row["marker"]
+
+        keys = row.keys()
+
+        for attr in ms.NODE_REFERENCES:
+
+            if (attr + "_no" in keys) and (row[attr] is not None):
+
+                n = Node(None, [row[attr + "_x"], row[attr + "_y"], row[attr + "_z"]])
+                n.no = row[attr + "_no"]
+                n.store_id = row[attr]
+
+                setattr(item, attr, n)
+
+        return item
+
+
+    def get_topology_key(self, element):
+
+        """Returns key shared by identical elements (same nodes, same direction for springs); None for nodes, which are compared by location."""
+
+        if element.typ == "node":
+
+            return None
+
+        key = " ".join([str(getattr(element, attr).store_id) for attr in element.get_node_attributes()])
+
+        if element.typ == "spri":
+
+            key += " " + " ".join(["%.3f" % d for d in [element.dx, element.dy, element.dz]])
+
+        return key
+
+
+    def is_empty(self):
+
+        """Returns True if the list has no elements."""
+
+        return self.store.count(self.name) == 0
+
+
+    def iterate(self):
+
+        """Yields elements in the order they were added, streamed from the store."""
+
+        for row in self.store.iterate(self.name):
+
+            yield self.to_element(row)
+
+
+    def iterate_layer(self, layer_name):
+
+        """Yields elements of a layer in the order they were added, streamed from the store."""
+
+        for row in self.store.iterate_layer(self.name, layer_name):
+
+            yield self.to_element(row)
+
+
+    def iterate_by_layer(self):
+
+        """Yields elements grouped by layer as (layer, elements) tuples, see ElementList.iterate_by_layer. Elements are streamed."""
+
+        for layer_name in self.store.get_layers(self.name):
+
+            yield (self.get_layer(layer_name) if layer_name else None, self.iterate_layer(layer_name))
+
+
+    def get_node_index(self):
+
+        """Returns a splitting.NodeIndex of the nodes read back from the store, for location queries; node dedupe uses the grid cells of
+        the store instead (see get_identical_to).
+        """
+
+        import splitting as sp
+
+        return sp.NodeIndex(self.iterate(), gc.tolerance)
+
+
+    def get_identical_to(self, element):
+
+        """Returns first element in the list that is identical to the specified element. Returns None if none found."""
+
+        if element.typ == "node":
+
+            near = self.store.get_near(self.name, element.x, element.y, element.z, gc.tolerance)
+
+            return self.to_element(near[0]) if near else None
+
+        row = self.store.get_by_topology(self.name, self.get_topology_key(element))
+
+        return self.to_element(row) if row else None
+
+
+    def is_taken_number(self, number, grp = -1):
+
+        """Returns True if a number if taken in a given group."""
+
+        return self.store.is_taken_number(self.name, number, grp)
+
+
+    def get_conflicting_element(self, new_element):
+
+        """Returns element with a numbering conflict."""
+
+        row = self.store.get_by_number(self.name, new_element.no, new_element.grp)
+
+        return self.to_element(row) if row else None
+
+
+    def is_registered(self, element):
+
+        """Returns True if the element is in the store."""
+
+        return getattr(element, "store_id", None) is not None
+
+
+    def register_number(self, element):
+
+        """Stores the number of an element already in the store."""
+
+        self.store.set_number(element.store_id, element.no)
+
+
+    def unregister_number(self, element):
+
+        """Makes the number of an element available again."""
+
+        if self.is_registered(element):
+
+            self.free_number(element)
+
+
+    def insert(self, element):
+
+        """Adds an element to the store, without any checks."""
+
+        element.store_id = self.store.insert(self.name, self.to_record(element))
+
+
+    def get_by_geometry(self, geo):
+
+        """Returns all elements created from a given Guid."""
+
+        return [self.to_element(row) for row in self.store.get_by_geometry(self.name, str(geo) if geo else None)]
+
+
+    def remove(self, element):
+
+        """Removes element from the list.
+        Returns:
+          self
+        """
+
+        self.unregister_number(element)
+
+        self.store.remove(element.store_id)
+
+        return self
+
+
+    def remove_where(self, condition):
+
+        """Removes all elements meeting a condition in a single pass over the store.
+        Parameters:
+          condition = function returning True for elements to remove
+        Returns:
+          list of removed elements
+        """
+
+        removed = [item for item in self.iterate() if condition(item)]
+
+        for item in removed:
+
+            self.remove(item)
+
+        return removed
+
+
+    def replace_nodes(self, replacements):
+
+        """Points the elements referencing replaced nodes to their replacements, in a single pass over the store.
+        Parameters:
+          replacements = dictionary of new nodes by identity (row id) of the old node
+        Returns:
+          self
+        """
+
+        self.store.replace_references(self.name, dict([(old, n.store_id) for old, n in replacements.items()]))
+
+        return self
+
+
+
+class StructuralModel:
+    
+
+    unit_conversion = {
+        2: 0.001,
+        3: 0.01,
+        4: 1.0,
+        8: 0.0254,
+        9: 0.3048
+    }
+    
+
+    def __init__(self, name, conversion_factor = None, store = None):   
+
+        """Constructor
+        Parameters:
+          name = model name
+          conversion_factor = conversion factor to meters; taken from the unit system of the Rhino model if not set
+          store = modelstore.SQLiteStore keeping elements out of memory; elements are kept in lists if not set
+        """
+
+        if conversion_factor is None:
+
+            conversion_factor = StructuralModel.unit_conversion[rs.UnitSystem()]
+    
+        self.conversion_factor = conversion_factor
+
+        self.name = name    
+
+        # GiraffeLayer objects by name
+        self.layers = {}
+
+        self.store = store
+        
+        self.nodes = self.create_element_list("nodes")
+        self.springs_sn = self.create_element_list("single node springs")
+        self.line_elements = self.create_element_list("line elements")
+        self.area_elements = self.create_element_list("area elements")
+                
+        self.gdiv = 1000
+        self.current_group = -1
+
+        # numbering sidecar file, set when numbers are kept between runs
+        self.numbering_path = None
+
+        # ids of the elements of a part built with build_part; None for full builds
+        self.part = None
+
+        # False if building the part changed elements outside of it (see build_part), which the part export then lacks
+        self.part_complete = True
+
+        # bandwidth and profile before and after renumbering (see renumber); None if not renumbered
+        self.renumbering = None
+
+        # (element list name, group, old number, new number) of the elements renumbered by compact_numbering; None if not compacted
+        self.compaction = None
+
+        # objects of block definitions by (definition name, instance layer name), see get_block_definition
+        self._definitions = {}
+
+        # (member, layer name, name, points, number offset) lists by Guid for objects whose elements are built from points sent along
+        # with them instead of the document (see add_object, exportdaemon); None if all objects are read from the document
+        self.members = None
+
+        # query.ModelQuery indexing the model, dropped whenever objects are added or removed (see get_query)
+        self._query = None
+
+        # catalog.Catalog of the sections and materials properties refer to; None if not loaded (see load_catalog)
+        self.catalog = None
+
+        self._errors = []
+
+
+    def create_element_list(self, name):
+
+        """Returns a new element list, kept in the store if the model has one."""
+
+        if self.store:
+
+            return StoredElementList(name, self.store, self.get_layer)
+
+        return ElementList(name)
+
+
+    def get_layer(self, name):
+
+        """Returns GiraffeLayer by name, creating it on first use so that elements on the same layer share one layer object."""
+
+        if name not in self.layers:
+
+            self.layers[name] = GiraffeLayer(name)
+
+        return self.layers[name]
+
+
+    def get_element_lists(self):
+
+        """Returns all element lists whose elements reference nodes."""
+
+        return [self.springs_sn, self.line_elements, self.area_elements]
+
+
+    def replace_node(self, old_node, new_node):
+
+        """Points all elements referencing old_node to new_node.
+        Returns:
+          self
+        """
+
+        return self.replace_nodes({get_identity(old_node): new_node})
+
+
+    def replace_nodes(self, replacements):
+
+        """Points all elements referencing replaced nodes to their replacements, in a single pass over every element list.
+        Parameters:
+          replacements = dictionary of new nodes by identity of the old node (see get_identity)
+        Returns:
+          self
+        """
+
+        for element_list in self.get_element_lists():
+
+            element_list.replace_nodes(replacements)
+
+        return self
+
+
+    def split_line_elements(self, splits):
+
+        """Splits line elements at given points (see splitting), each piece following the element it was split from; nodes already in
+        the model at the points are used.
+        Parameters:
+          splits = dictionary of lists of (parameter, point) tuples by id of the element; parameters from 0 (start) to 1 (end)
+        Returns:
+          self
+        """
+
+        self._query = None
+
+        elements = []
+
+        for element in list(self.line_elements.iterate()):
+
+            elements.append(element)
+
+            if id(element) not in splits:
+
+                continue
+
+            nodes = [element.n1]
+
+            for s, point in sorted(splits[id(element)]):
+
+                n = self.nodes.add(Node(None, point))
+
+                if (n is not nodes[-1]) and (n is not element.n2):
+
+                    nodes.append(n)
+
+            nodes.append(element.n2)
+
+            for piece in element.split(nodes)[1:]:
+
+                elements.append(self.line_elements.add(piece, unique = True))
+
+        self.line_elements.reorder(elements)
+
+        return self
+
+
+    def get_referenced_nodes(self):
+
+        """Returns identities of all nodes referenced by elements (see get_identity)."""
+
+        referenced = set()
+
+        for element_list in self.get_element_lists():
+
+            for element in element_list.iterate():
+
+                for attr in element.get_node_attributes():
+
+                    referenced.add(get_identity(getattr(element, attr)))
+
+        return referenced
+
+
+    def add_node(self, obj, typ_sofi, layer):
+
+        """Adds node from object."""
+
+        n = Node(obj)
+        n.layer = layer
+
+        self.add_user_node(n)
+
+
+    def add_user_node(self, n):
+
+        """Adds a user-specified node (a node with a Guid, on a node layer)."""
+
+        identical = self.nodes.get_identical_to(n)
+
+        # when updating a built model, a user-specified node takes over from an endpoint node previously added by Giraffe
+        if identical and (not identical.geo):
+
+            self.nodes.remove(identical)
+            self.nodes.add(n)
+            self.replace_node(identical, n)
+
+            return
+
+        self.nodes.add(n)
+
+
+    def add_nodes(self, points):
+
+        """Adds nodes at points, e.g. along a curve; each point is looked up in the node index of the model (see
+        ElementList.get_node_index).
+        Returns:
+          list of nodes at the points, identical nodes (already in the model or at several points) only once
+        """
+
+        return [self.nodes.add(Node(None, pt)) for pt in points]
+
+
+    def get_curve_points(self, obj, layer):
+
+        """Returns points along a line, polyline or curve, from start to end: ends and vertices, divided into the number of segments set
+        on the layer (see GiraffeLayer.get_segments). Curves without segments set are divided so that the line elements are within
+        curve_tolerance (see giraffe_configure) of the curve. Only the ends if neither segments nor divide_curves are set.
+        """
+
+        segments = layer.get_segments()
+
+        if not (segments or gc.divide_curves):
+
+            return [rs.CurveStartPoint(obj), rs.CurveEndPoint(obj)]
+
+        if rs.IsLine(obj) or rs.IsPolyline(obj):
+
+            vertices = [rs.CurveStartPoint(obj), rs.CurveEndPoint(obj)] if rs.IsLine(obj) else rs.PolylineVertices(obj)
+
+            if not segments:
+
+                return vertices
+
+            points = [vertices[0]]
+
+            for a, b in zip(vertices[:-1], vertices[1:]):
+
+                for i in range(1, segments + 1):
+
+                    points.append([a[k] + (b[k] - a[k]) * i / float(segments) for k in range(3)])
+
+            return points
+
+        if segments:
+
+            return rs.DivideCurve(obj, segments, False, True)
+
+        return self.get_adaptive_points(obj, gc.curve_tolerance / self.conversion_factor)
+
+
+    def get_adaptive_points(self, obj, tolerance, depth = 10):
+
+        """Returns points along a curve, from start to end, such that the chords between them are within tolerance of the curve.
+        Parameters:
+          obj = curve Guid
+          tolerance = largest distance between curve and chords, in document units
+          depth = number of times a chord may be halved (at most 2 ** depth chords)
+        """
+
+        t0, t1 = rs.CurveDomain(obj)
+
+        points = [rs.EvaluateCurve(obj, t0)]
+
+        # chords still to check as (start parameter, start point, end parameter, end point, depth), first chord on top
+        chords = [(t0, points[0], t1, rs.EvaluateCurve(obj, t1), 0)]
+
+        while chords:
+
+            ta, a, tb, b, level = chords.pop()
+
+            # quarter points too, so that chords across an inflection point are refined
+            samples = [rs.EvaluateCurve(obj, ta + (tb - ta) * i / 4.0) for i in [1, 2, 3]]
+
+            if (level < depth) and (max([distance_to_segment(p, a, b) for p in samples]) > tolerance):
+
+                tm = (ta + tb) / 2.0
+
+                chords.append((tm, samples[1], tb, b, level + 1))
+                chords.append((ta, a, tm, samples[1], level + 1))
+
+            else:
+
+                points.append(b)
+
+        return points
+
+
+    def add_line_element(self, obj, typ_sofi, layer):
+
+        """Adds line elements from object: one for a line, one per segment for polylines and curves (see get_curve_points)."""
+
+        bm = LineElement(obj, typ_sofi)
+        bm.layer = layer
+
+        self.add_line_pieces(bm, self.get_curve_points(obj, layer))
+
+
+    def add_line_pieces(self, bm, points):
+
+        """Adds a line element along points, split into one piece per segment between them.
+        Parameters:
+          bm = LineElement, layer and attributes set, no nodes
+          points = points from start to end
+        """
+
+        nodes = []
+
+        for n in self.add_nodes(points):
+
+            if (not nodes) or (get_identity(n) != get_identity(nodes[-1])):
+
+                nodes.append(n)
+
+        bm.n1 = nodes[0]
+        bm.n2 = nodes[-1]
+
+        pieces = bm.split(nodes) if len(nodes) > 2 else [bm]
+
+        pieces[0].mark_start_point()
+
+        for piece in pieces:
+
+            self.line_elements.add(piece)
+
+
+    def add_spring_sn(self, obj, typ_sofi, layer):
+
+        """Adds single node spring element from object."""
+
+        sp = SpringSN(obj)
+        sp.n = self.nodes.add(Node(None, rs.CurveStartPoint(obj)))
+
+        sp.layer = layer
+
+        self.springs_sn.add(sp)   
+
+
+    def get_surface_grid(self, obj, rows, columns):
+
+        """Returns points of a structured grid on a surface, evaluated in a single batch.
+        Parameters:
+          obj = surface Guid
+          rows, columns = number of grid cells in the u and v directions of the surface
+        Returns:
+          rows + 1 lists of columns + 1 points
+        """
+
+        u0, u1 = rs.SurfaceDomain(obj, 0)
+        v0, v1 = rs.SurfaceDomain(obj, 1)
+
+        us = [u0 + (u1 - u0) * i / float(rows) for i in range(rows + 1)]
+        vs = [v0 + (v1 - v0) * j / float(columns) for j in range(columns + 1)]
+
+        return [[rs.EvaluateSurface(obj, u, v) for v in vs] for u in us]
+
+
+    def add_mesh(self, obj, layer, rows, columns):
+
+        """Adds a structured grid of quads on a surface. Nodes on the edges of the surface are compared to the nodes of the model, so that
+        neighbouring objects connect; nodes inside the surface are new and shared by the quads around them by grid index.
+        Parameters:
+          obj = surface Guid
+          layer = GiraffeLayer
+          rows, columns = number of quads in the u and v directions of the surface
+        """
+
+        first = AreaElement(obj)
+        first.layer = layer
+
+        self.add_quad_grid(first, self.get_surface_grid(obj, rows, columns))
+
+
+    def add_quad_grid(self, first, grid):
+
+        """Adds a structured grid of quads on a grid of points (see add_mesh).
+        Parameters:
+          first = AreaElement of the first quad, layer and attributes set, no nodes; further quads are pieces of it
+          grid = rows + 1 lists of columns + 1 points
+        """
+
+        rows = len(grid) - 1
+        columns = len(grid[0]) - 1
+
+        edges = [(i, j) for i in range(rows + 1) for j in range(columns + 1) if i in [0, rows] or j in [0, columns]]
+
+        nodes = [[None] * (columns + 1) for i in range(rows + 1)]
+
+        for (i, j), n in zip(edges, self.add_nodes([grid[i][j] for i, j in edges])):
+
+            nodes[i][j] = n
+
+        for i in range(1, rows):
+
+            for j in range(1, columns):
+
+                nodes[i][j] = self.nodes.add(Node(None, grid[i][j]), unique = True)
+
+        for i in range(rows):
+
+            for j in range(columns):
+
+                qd = first if (i, j) == (0, 0) else first.make_piece(AreaElement(None), i * columns + j)
+
+                qd.n1 = nodes[i][j]
+                qd.n2 = nodes[i][j + 1]
+                qd.n3 = nodes[i + 1][j + 1]
+                qd.n4 = nodes[i + 1][j]
+
+                # quads with a node inside the surface are new, others may overlap a quad already in the model
+                inside = [1 for a in [i, i + 1] for b in [j, j + 1] if (0 < a < rows) and (0 < b < columns)] != []
+
+                self.area_elements.add(qd, unique = inside)
+
+
+    def add_area_element(self, obj, typ_sofi, layer):
+
+        """Adds area element from object: a single quad, or a grid of quads on layers with a mesh set (see GiraffeLayer.get_mesh)."""
+
+        mesh = layer.get_mesh()
+
+        if mesh:
+
+            self.add_mesh(obj, layer, mesh[0], mesh[1])
+
+            return
+
+        qd = AreaElement(obj)
+        qd.layer = layer
+
+        self.add_quad(qd, rs.SurfacePoints(obj))
+
+
+    def add_quad(self, qd, pts):
+
+        """Adds a quad on the control points of a surface, in the order returned by rs.SurfacePoints.
+        Parameters:
+          qd = AreaElement, layer and attributes set, no nodes
+          pts = four points
+        """
+
+        qd.n1 = self.nodes.add(Node(None, pts[0]))
+        qd.n2 = self.nodes.add(Node(None, pts[1]))
+        qd.n3 = self.nodes.add(Node(None, pts[3]))
+        qd.n4 = self.nodes.add(Node(None, pts[2]))
+
+        self.area_elements.add(qd) 
+
+
+    def add_object(self, obj, layer):
+
+        """Adds a single object from a structural layer to the ElementLists of the structural model."""
+
+        self._query = None
+
+        # objects sent along with the points their elements are built from (see exportdaemon) are not read from the document
+        if self.members and (str(obj) in self.members):
+
+            for member, layer_name, name, points, no_offset in self.members[str(obj)]:
+
+                self.add_member(obj, member, self.get_layer(layer_name), name, points, no_offset)
+
+            return self
+
+        if gc.expand_blocks and (rs.ObjectType(obj) == gs.object_types["Block"]):
+
+            return self.add_block_instance(obj, layer)
+
+        typ_plural = layer.path[1]
+        typ_sofi = gs.plural_to_sofi[typ_plural]
+
+        # !! REFACTOR TO CALL PROGRAMATICALLY -> ELIMINATE CONDITIONALS !!
+
+        if typ_plural in gs.point_elements:
+
+            self.add_node(obj, typ_sofi, layer)
+
+        if typ_plural in gs.line_elements:
+
+            self.add_line_element(obj, typ_sofi, layer)
+
+        if typ_plural in gs.spring_elements:
+
+            self.add_spring_sn(obj, typ_sofi, layer)         
+
+        if typ_plural in gs.area_elements:
+
+            self.add_area_element(obj, typ_sofi, layer) 
+
+        return self
+
+
+    def get_object_points(self, obj, layer):
+
+        """Returns the points elements are built from for an object of the type of a structural layer: node coordinates, points along
+        lines and curves (see get_curve_points), spring start and end, surface control points or the points of the mesh grid, row after
+        row (see get_surface_grid).
+        """
+
+        typ_plural = layer.path[1]
+
+        if typ_plural in gs.point_elements:
+
+            return [rs.PointCoordinates(obj)]
+
+        if typ_plural in gs.line_elements:
+
+            return self.get_curve_points(obj, layer)
+
+        if typ_plural in gs.spring_elements:
+
+            return [rs.CurveStartPoint(obj), rs.CurveEndPoint(obj)]
+
+        mesh = layer.get_mesh()
+
+        if mesh:
+
+            return [pt for row in self.get_surface_grid(obj, mesh[0], mesh[1]) for pt in row]
+
+        return rs.SurfacePoints(obj)
+
+
+    def get_block_definition(self, name, layer):
+
+        """Returns the objects of a block definition as (layer, name, points) tuples, points in definition coordinates. Definitions are read
+        once per layer their instances are on; objects of nested instances are included, transformed into definition coordinates.
+        Parameters:
+          name = block definition name
+          layer = GiraffeLayer of the instance; objects of the definition on other than structural layers are placed on it
+        """
+
+        key = (name, layer.name)
+
+        if key in self._definitions:
+
+            return self._definitions[key]
+
+        import blocks as bl
+
+        members = []
+
+        for obj in rs.BlockObjects(name):
+
+            member_layer = self.get_layer(rs.ObjectLayer(obj))
+
+            if not member_layer.is_structural():
+
+                member_layer = layer
+
+            if not member_layer.is_allowed(obj):
+
+                continue
+
+            if rs.ObjectType(obj) == gs.object_types["Block"]:
+
+                matrix = bl.get_matrix(rs.BlockInstanceXform(obj))
+
+                for nested_layer, nested_name, points in self.get_block_definition(rs.BlockInstanceName(obj), member_layer):
+
+                    members.append((nested_layer, nested_name, bl.transform(matrix, points)))
+
+                continue
+
+            members.append((member_layer, rs.ObjectName(obj), self.get_object_points(obj, member_layer)))
+
+        self._definitions[key] = members
+
+        return members
+
+
+    def get_block_members(self, obj, layer):
+
+        """Returns the objects of a block definition, placed by a block instance (see blocks module), as (member, layer, name, points,
+        no_offset) tuples for add_member. The points of all objects are transformed in a single batch.
+        """
+
+        import blocks as bl
+
+        members = self.get_block_definition(rs.BlockInstanceName(obj), layer)
+
+        grp_offset, no_offset = bl.get_offsets(rs.ObjectName(obj))
+
+        points = bl.transform(bl.get_matrix(rs.BlockInstanceXform(obj)), [pt for member in members for pt in member[2]])
+
+        placed = []
+
+        start = 0
+
+        for i, (member_layer, name, member_points) in enumerate(members):
+
+            if grp_offset:
+
+                member_layer = self.get_layer(member_layer.get_offset_name(grp_offset))
+
+            placed.append((i + 1, member_layer, name, points[start:(start + len(member_points))], no_offset))
+
+            start += len(member_points)
+
+        return placed
+
+
+    def add_block_instance(self, obj, layer):
+
+        """Adds the elements of the objects of a block definition, placed by a block instance (see get_block_members). Elements have the
+        Guid of the instance and the index of their object in the definition.
+        Returns:
+          self
+        """
+
+        for member, member_layer, name, points, no_offset in self.get_block_members(obj, layer):
+
+            self.add_member(obj, member, member_layer, name, points, no_offset)
+
+        return self
+
+
+    def add_member(self, obj, member, layer, name, points, no_offset = 0):
+
+        """Adds the elements of an object of a block definition, placed by a block instance.
+        Parameters:
+          obj = Guid of the instance
+          member = index of the object in the definition, from 1
+          layer = GiraffeLayer
+          name = name of the object in Rhino
+          points = points of the object, transformed (see get_object_points)
+          no_offset = added to the number of the object if it is set
+        """
+
+        typ_plural = layer.path[1]
+        typ_sofi = gs.plural_to_sofi[typ_plural]
+
+        if typ_plural in gs.point_elements:
+
+            element = Node(None, points[0])
+
+        if typ_plural in gs.line_elements:
+
+            element = LineElement(None, typ_sofi)
+
+        if typ_plural in gs.spring_elements:
+
+            d = [b - a for a, b in zip(points[0], points[1])]
+            length = sum([v ** 2 for v in d]) ** 0.5
+
+            element = SpringSN(None, [v / length for v in d])
+
+        if typ_plural in gs.area_elements:
+
+            element = AreaElement(None)
+
+        element.geo = obj
+        element.member = member
+        element.layer = layer
+
+        element.set_input(name)
+
+        if element.strict_naming:
+
+            element.no += no_offset
+
+        if typ_plural in gs.point_elements:
+
+            self.add_user_node(element)
+
+        if typ_plural in gs.line_elements:
+
+            self.add_line_pieces(element, points)
+
+        if typ_plural in gs.spring_elements:
+
+            element.n = self.nodes.add(Node(None, points[0]))
+
+            self.springs_sn.add(element)
+
+        if typ_plural in gs.area_elements:
+
+            mesh = layer.get_mesh()
+
+            if mesh:
+
+                self.add_quad_grid(element, [points[(i * (mesh[1] + 1)):((i + 1) * (mesh[1] + 1))] for i in range(mesh[0] + 1)])
+
+            else:
+
+                self.add_quad(element, points)
+
+
+    def add_objects_from_layer(self, layer, build_filter = None):
+
+        """Adds objects from a given layer to the ElementLists of the structural model.
+        Parameters:
+          layer = GiraffeLayer
+          build_filter = buildfilter.BuildFilter; only objects it accepts are added if set
+        """
+
+        objects = layer.get_allowed_geometry()
+
+        for obj in objects:
+
+            if build_filter and not build_filter.accepts_object(obj):
+
+                continue
+
+            self.add_object(obj, layer)
+
+        return self
+
+
+    def remove_object(self, obj):
+
+        """Removes all elements created from a given Guid, and the start point markers of removed line elements.
+        Removed nodes still referenced by elements are replaced by endpoint nodes, endpoint nodes no longer referenced are removed.
+        Returns:
+          self
+        """
+
+        self._query = None
+
+        markers = []
+
+        for element_list in self.get_element_lists():
+
+            for element in element_list.get_by_geometry(obj):
+
+                element_list.remove(element)
+
+                if getattr(element, "marker", None):
+
+                    markers.append(element.marker)
+
+        # start point markers of removed line elements, on the output layer, locked unless the model is being updated (see apply_changes)
+        if markers:
+
+            locked = GiraffeLayer.endpoints.is_locked()
+
+            GiraffeLayer.endpoints.unlock()
+
+            for marker in markers:
+
+                rs.DeleteObject(marker)
+
+            if locked:
+
+                GiraffeLayer.endpoints.lock()
+
+        # nodes referenced by the remaining elements, taken before removing any (stored elements read back their nodes)
+        referenced = self.get_referenced_nodes()
+
+        for n in self.nodes.get_by_geometry(obj):
+
+            self.nodes.remove(n)
+
+            if get_identity(n) in referenced:
+
+                self.replace_node(n, self.nodes.add(Node(None, [n.x, n.y, n.z])))
+
+        referenced = self.get_referenced_nodes()
+
+        for n in self.nodes.get_by_geometry(None):
+
+            if get_identity(n) not in referenced:
+
+                self.nodes.remove(n)
+
+        return self
+
+
+    def update_object(self, obj):
+
+        """Adds object to the model if it exists, lies on a structural layer and is of an allowed type.
+        Returns:
+          self
+        """
+
+        if not rs.IsObject(obj):
+
+            return self
+
+        layer = self.get_layer(rs.ObjectLayer(obj))
+
+        if layer.is_structural() and layer.is_allowed(obj):
+
+            self.add_object(obj, layer)
+
+        return self
+
+
+    def apply_changes(self, changes):
+
+        """Updates a built model incrementally.
+        Parameters:
+          changes = list of (kind, guid) tuples as collected by livesync.LiveSync
+        Returns:
+          self
+        """
+
+        import livesync as ls
+
+        # start point markers of added line elements are drawn on the output layer, locked between builds
+        GiraffeLayer.reopen()
+
+        try:
+
+            for kind, obj in changes:
+
+                if kind in [ls.DELETE, ls.UPDATE]:
+
+                    self.remove_object(obj)
+
+                if kind in [ls.ADD, ls.UPDATE]:
+
+                    self.update_object(obj)
+
+        finally:
+
+            GiraffeLayer.teardown()
+
+        return self
+
+
+    def prepare(self):
+
+        """Loads what the build relies on besides the document: numbers from previous runs, catalog, number blocks.
+        Returns:
+          self
+        """
+
+        if gc.stable_numbering:
+
+            self.numbering_path = get_output_path(".numbering.json")
+
+            self.load_numbering(self.numbering_path)
+
+        if gc.catalog_file:
+
+            self.load_catalog(os.path.join(os.path.dirname(get_output_path()), gc.catalog_file))
+
+        if gc.group_blocks:
+
+            for element_list in self.get_all_element_lists():
+
+                element_list.block_size = self.gdiv
+
+        return self
+
+
+    def build(self, build_filter = None):
+
+        """Builds model from current layer structure within the Rhino model.
+        Parameters:
+          build_filter = buildfilter.BuildFilter restricting the build to a part of the model; see build_part to build a part within the
+            full model
+        """
+
+        self.prepare()
+
+        layers = GiraffeLayer.get_all_structural()
+                    
+        for layer in layers:
+
+            if build_filter and not build_filter.accepts_layer(layer):
+
+                continue
+
+            self.layers[layer.name] = layer
+
+            self.get_element_list(layer.path[1]).check_references(layer.get_prop(), "layer " + layer.name)
+
+            self.add_objects_from_layer(layer, build_filter)
+
+        # a filtered build holds only part of the model, stages working on the whole model are left out
+        if not build_filter:
+
+            self.finish()
+
+        return self
+
+
+    def finish(self):
+
+        """Runs the stages set in giraffe_configure that work on the whole built model: splitting, renumbering, compacting numbers.
+        Returns:
+          self
+        """
+
+        if gc.split_intersections:
+
+            self.split_intersections()
+
+        if gc.split_at_nodes:
+
+            self.split_at_nodes()
+
+        if gc.bandwidth_renumbering:
+
+            self.renumber()
+
+        if gc.compact_numbering:
+
+            self.compact_numbering()
+
+        return self
+
+
+    def split_intersections(self):
+
+        """Splits line elements where they intersect, so that crossing members share a node (see splitting). Not supported for models
+        kept in a store.
+        Returns:
+          self
+        """
+
+        if self.store:
+
+            self._errors.append("Splitting intersections is not supported with out_of_core, lines are not split.")
+
+            return self
+
+        import splitting as sp
+
+        sp.split_intersections(self, gc.tolerance)
+
+        return self
+
+
+    def split_at_nodes(self):
+
+        """Splits line elements at nodes on their interior, e.g. at the end of a line meeting another one in a T-junction (see splitting).
+        Not supported for models kept in a store.
+        Returns:
+          self
+        """
+
+        if self.store:
+
+            self._errors.append("Splitting at nodes is not supported with out_of_core, lines are not split.")
+
+            return self
+
+        import splitting as sp
+
+        sp.split_at_nodes(self, gc.tolerance)
+
+        return self
+
+
+    def renumber(self):
+
+        """Renumbers non-strict nodes and elements to reduce the bandwidth of the stiffness matrix (see renumbering). Not supported for
+        models kept in a store.
+        Returns:
+          self
+        """
+
+        if self.store:
+
+            self._errors.append("Renumbering is not supported with out_of_core, numbers are kept.")
+
+            return self
+
+        import renumbering as rn
+
+        self.renumbering = rn.renumber(self)
+
+        return self
+
+
+    def compact_numbering(self):
+
+        """Closes the gaps between the numbers of non-strict nodes and elements, per group (see ElementList.compact). The numbers changed
+        are written to a renumber map next to the export (see save_renumber_map). Not supported for models kept in a store.
+        Returns:
+          self
+        """
+
+        if self.store:
+
+            self._errors.append("Compacting numbers is not supported with out_of_core, numbers are kept.")
+
+            return self
+
+        self.compaction = []
+
+        for element_list in self.get_all_element_lists():
+
+            self.compaction += [(element_list.name,) + change for change in element_list.compact()]
+
+        return self
+
+
+    def save_renumber_map(self, path):
+
+        """Saves the numbers changed by compact_numbering as csv (list, grp, old, new), e.g. to remap load definitions referring to them.
+        Returns:
+          self
+        """
+
+        f = open(path, "w")
+
+        f.write("list,grp,old,new\n")
+
+        for name, grp, old, new in self.compaction:
+
+            f.write(name + "," + str(grp) + "," + str(old) + "," + str(new) + "\n")
+
+        f.close()
+
+        return self
+
+
+    def build_part(self, build_filter):
+
+        """Builds a part of the model again from the Rhino model, keeping the rest as it is. Meant for models loaded from the index of the
+        last full export (see from_binary_file): node dedupe and numbering then respect the full model. Elements of the part are remembered
+        in self.part, so that the part can be exported on its own (see make_part_file). The stages of a full build then run on the whole
+        model (see finish). Lines split in the last export are not joined again, so that splitting may split them differently than a full
+        build (ExportPart builds the full model instead then).
+        Parameters:
+          build_filter = buildfilter.BuildFilter defining the part
+        Returns:
+          self
+        """
+
+        self.prepare()
+
+        # remove the part as it was, in one pass per list
+        for element_list in self.get_element_lists():
+
+            element_list.remove_where(build_filter.accepts_element)
+
+        referenced = self.get_referenced_nodes()
+
+        replacements = {}
+
+        for n in self.nodes.remove_where(build_filter.accepts_element):
+
+            # user-specified nodes still used outside of the part are replaced by endpoint nodes until they are added again
+            if get_identity(n) in referenced:
+
+                replacements[get_identity(n)] = self.nodes.add(Node(None, [n.x, n.y, n.z]))
+
+        self.replace_nodes(replacements)
+
+        # add the part again; elements that were not in the model before are in the part (held, so that their ids are not reused)
+        kept = dict([(get_identity(item), item) for element_list in self.get_all_element_lists() for item in element_list.iterate()])
+
+        for layer in GiraffeLayer.get_all_structural():
+
+            if not build_filter.accepts_layer(layer):
+
+                continue
+
+            layer = self.get_layer(layer.name)
+
+            self.get_element_list(layer.path[1]).check_references(layer.get_prop(), "layer " + layer.name)
+
+            self.add_objects_from_layer(layer, build_filter)
+
+        # endpoint nodes only used by the part as it was
+        referenced = self.get_referenced_nodes()
+
+        self.nodes.remove_where(lambda n: (not n.geo) and (get_identity(n) not in referenced))
+
+        outside = self.get_element_ids().intersection(kept)
+
+        if gc.split_intersections or gc.split_at_nodes:
+
+            self._errors.append("Lines split in the last export are not joined again, the part may be split differently than in a full export.")
+
+        self.finish()
+
+        # splitting replaces elements, renumbering and compacting change numbers, also outside of the part
+        self.part_complete = outside.issubset(self.get_element_ids()) and (not self.renumbering) and (self.compaction is None)
+
+        self.part = set()
+
+        for element_list in self.get_all_element_lists():
+
+            for item in element_list.iterate():
+
+                if get_identity(item) in kept:
+
+                    continue
+
+                self.part.add(get_identity(item))
+
+                for attr in item.get_node_attributes():
+
+                    self.part.add(get_identity(getattr(item, attr)))
+
+        return self
+
+
+    def get_element_ids(self):
+
+        """Returns the identities of the nodes and elements of the model as a set (see get_identity)."""
+
+        return set([get_identity(item) for element_list in self.get_all_element_lists() for item in element_list.iterate()])
+
+
+    def get_element_list(self, typ_plural):
+
+        """Returns the element list elements of a given type are added to.
+        Parameters:
+          typ_plural = element type as used in layer names (e.g. 'beams')
+        """
+
+        if typ_plural in gs.point_elements:
+
+            return self.nodes
+
+        if typ_plural in gs.line_elements:
+
+            return self.line_elements
+
+        if typ_plural in gs.spring_elements:
+
+            return self.springs_sn
+
+        return self.area_elements
+
+
+    def load_catalog(self, path):
+
+        """Loads sections and materials defined in a SOFiSTiK input file (and its includes) to validate properties against.
+        Nothing is validated if the file does not exist.
+        Returns:
+          self
+        """
+
+        if not os.path.isfile(path):
+
+            return self
+
+        import catalog as cat
+
+        catalog = cat.load(path, [get_output_path()])
+
+        self._errors += catalog._errors
+
+        self.catalog = catalog
+
+        for element_list in self.get_all_element_lists():
+
+            element_list.catalog = catalog
+
+        return self
+
+
+    def get_all_element_lists(self):
+
+        """Returns all element lists, nodes included."""
+
+        return [self.nodes] + self.get_element_lists()
+
+
+    def get_takeoff(self):
+
+        """Returns quantities per element list, group and property (see takeoff.Takeoff.get_rows); weights are resolved against the
+        catalog if loaded.
+        """
+
+        import takeoff as tk
+
+        takeoff = tk.Takeoff(self.catalog, self.conversion_factor)
+
+        for element_list in self.get_element_lists():
+
+            for item in element_list.iterate():
+
+                takeoff.add(item, element_list.name)
+
+        return takeoff.get_rows()
+
+
+    def get_query(self):
+
+        """Returns the query.ModelQuery of the model, indexing it on first use after objects were added or removed."""
+
+        if self._query is None:
+
+            import query as qr
+
+            self._query = qr.ModelQuery(self)
+
+        return self._query
+
+
+    def get_nodes_in_box(self, low, high):
+
+        """Returns the nodes within a box given by its low and high corners, boundary included."""
+
+        return self.get_query().get_nodes_in_box(low, high)
+
+
+    def get_nodes_in_radius(self, center, radius):
+
+        """Returns the nodes within a distance of a point, in order of distance."""
+
+        return self.get_query().get_nodes_in_radius(center, radius)
+
+
+    def get_nearest_node(self, point):
+
+        """Returns the node closest to a point; None for a model without nodes."""
+
+        return self.get_query().get_nearest_node(point)
+
+
+    def get_elements_in_box(self, low, high):
+
+        """Returns the springs, line and area elements with all their nodes within a box given by its low and high corners."""
+
+        return self.get_query().get_elements_in_box(low, high)
+
+
+    def get_by_group(self, grp, element_list = None):
+
+        """Returns nodes and elements of a group (the group of their layer, as exported; -1 for none).
+        Parameters:
+          grp = group number
+          element_list = name of the element list the elements are taken from (e.g. 'line elements'); all lists if not set
+        """
+
+        return self.get_query().get_by("grp", grp, element_list)
+
+
+    def get_by_prop(self, prop, element_list = None):
+
+        """Returns nodes and elements by property: those whose property, as exported (the property of their layer merged with their own,
+        see rhinoinput.merge_props), has all items of the given one (e.g. 'ncs 1' for 'ncs 1 ahin mymz'); '' for none.
+        """
+
+        return self.get_query().get_by("prop", prop, element_list)
+
+
+    def get_by_layer(self, name, element_list = None):
+
+        """Returns nodes and elements by full layer name; None for the nodes added by Giraffe."""
+
+        return self.get_query().get_by("layer", name, element_list)
+
+
+    def load_numbering(self, path):
+
+        """Loads numbers assigned in a previous run, so that elements keep their numbers.
+        Returns:
+          self
+        """
+
+        maps = nm.load(path)
+
+        for element_list in self.get_all_element_lists():
+
+            element_list.number_map = maps.get(element_list.name, nm.NumberMap())
+
+        return self
+
+
+    def save_numbering(self, path):
+
+        """Saves numbers assigned in this run for subsequent runs.
+        Returns:
+          self
+        """
+
+        maps = {}
+
+        for element_list in self.get_all_element_lists():
+
+            maps[element_list.name] = element_list.get_number_map()
+
+        nm.save(path, maps)
+
+        return self
+
+
+    def get_export_header(self):
+
+        """Returns export header."""
+
+        header = "$ generated by Giraffe for Rhino\n"
+        header += "+prog sofimsha\nhead " + self.name + "\n\n\n!*!Label *** SETUP ***\n" + "\nsyst 3d gdir negz gdiv " + str(self.gdiv) + "\n"
+
+        header += "\nlet#cf " + str(self.conversion_factor) + " $ conversion factor\n"
+
+        if self.renumbering:
+
+            for measure in ["bandwidth", "profile"]:
+
+                header += "$ node " + measure + " " + str(self.renumbering[measure][1]) + " (" + str(self.renumbering[measure][0]) + " before renumbering)\n"
+
+        if self.compaction is not None:
+
+            header += "$ numbers compacted, " + str(len(self.compaction)) + " changed (see .renumber.csv)\n"
+
+        for error in self._errors:
+
+            header += "$ " + error + "\n"
 
         return header
 
 
+    def traverse(self, writers, select = None):
+
+        """Hands the model to writers in a single pass over the elements (see writers).
+        Parameters:
+          writers = list of writers.Writer objects
+          select = identities of the elements to write (see get_identity, e.g. self.part); all elements if not set
+        Yields:
+          (writer, text) tuples in output order
+        """
+
+        for writer in writers:
+
+            yield writer, writer.begin(self)
+
+        for element_list in [self.nodes, self.line_elements, self.area_elements, self.springs_sn]:
+
+            for output in element_list.traverse(writers, select):
+
+                yield output
+
+        for writer in writers:
+
+            yield writer, writer.end(self)
+
+
+    def get_sofimsha_writer(self):
+
+        """Returns writer of the SOFiSTiK export. In a compact export (see giraffe_configure), coordinates are written in meters; in a loop
+        export, regular runs of elements are written as loops (see writers.LoopWriter).
+        """
+
+        cf = self.conversion_factor if gc.compact_export else None
+
+        if gc.loop_export:
+
+            return wr.LoopWriter(cf)
+
+        return wr.SofimshaWriter(cf)
+
+
+    def iter_export(self, select = None):
+
+        """Yields SOFiSTiK export in chunks.
+        Parameters:
+          select = identities of the elements to export (see get_identity, e.g. self.part); all elements if not set
+        """
+
+        for writer, text in self.traverse([self.get_sofimsha_writer()], select):
+
+            yield text
+
+
+    def write(self, outputs, cancelled = None):
+
+        """Writes the model in several formats in a single pass over the elements.
+        Parameters:
+          outputs = list of (writers.Writer, path) tuples
+          cancelled = function returning True once writing should stop (see backgroundexport)
+        Files are written to temporary files moved into place once all are complete, so that the previous files are kept if writing
+        stops or fails.
+        Returns:
+          self
+        """
+
+        import backgroundexport as bx
+
+        writers = [writer for writer, path in outputs]
+        index = dict((id(writer), i) for i, writer in enumerate(writers))
+
+        # written as it is generated, so that the export never has to be held in memory as a whole
+        chunks = ((index[id(writer)], text) for writer, text in self.traverse(writers))
+
+        bx.write_replacing([path for writer, path in outputs], chunks, cancelled)
+
+        return self
+
+
     def export(self):
 
         """Returns SOFiSTiK export."""
         
-        return self.get_export_header() + self.nodes.export() + self.line_elements.export() + self.area_elements.export() + self.springs_sn.export() + "\n\nend"
+        return "".join(self.iter_export())
 
 
-    def make_file(self):
+    def get_binary_columns(self):
 
-        """Creates or updates exported file.
+        """Returns the model as columns for the binary model format (see binarymodel).
+        Returns:
+          dictionary of columns by name, string table
+        """
+
+        import array
+        import binarymodel as bm
+
+        strings = bm.StringTable()
+
+        columns = {
+            "model.name": array.array("i", [strings.intern(self.name)]),
+            "model.cf": array.array("d", [self.conversion_factor]),
+            "model.gdiv": array.array("i", [self.gdiv])
+        }
+
+        # row of each node, by store id for stored lists
+        node_index = {}
+
+        for prefix, element_list in [("node", self.nodes), ("line", self.line_elements), ("quad", self.area_elements), ("spri", self.springs_sn)]:
+
+            for attr in ["no", "grp", "strict", "typ", "prop", "name", "layer", "key", "geo", "segment", "member", "n", "n1", "n2", "n3", "n4"]:
+
+                columns[prefix + "." + attr] = array.array("i")
+
+            for attr in ["x", "y", "z", "dx", "dy", "dz"]:
+
+                columns[prefix + "." + attr] = array.array("d")
+
+            for item in element_list.iterate():
+
+                if prefix == "node":
+
+                    node_index[get_identity(item)] = len(columns["node.no"])
+
+                columns[prefix + ".no"].append(item.no)
+                columns[prefix + ".grp"].append(item.grp)
+                columns[prefix + ".strict"].append(int(item.strict_naming))
+                columns[prefix + ".typ"].append(strings.intern(item.typ))
+                columns[prefix + ".prop"].append(strings.intern(item.prop))
+                columns[prefix + ".name"].append(strings.intern(item.name))
+                columns[prefix + ".layer"].append(strings.intern(item.layer.name if item.layer else None))
+                columns[prefix + ".key"].append(strings.intern(item.get_key()))
+                columns[prefix + ".geo"].append(strings.intern(str(item.geo) if item.geo else None))
+                columns[prefix + ".segment"].append(item.segment)
+                columns[prefix + ".member"].append(item.member)
+
+                for attr in ["x", "y", "z", "dx", "dy", "dz"]:
+
+                    if hasattr(item, attr):
+
+                        columns[prefix + "." + attr].append(getattr(item, attr))
+
+                for attr in item.get_node_attributes():
+
+                    n = getattr(item, attr)
+
+                    columns[prefix + "." + attr].append(node_index[get_identity(n)])
+
+            columns[prefix + ".errors"] = array.array("i", [strings.intern(error) for error in element_list._errors])
+
+        return columns, strings
+
+
+    def make_binary_file(self, path):
+
+        """Writes the built model in the binary model format.
         Returns:
           self
         """
 
-        f = open(get_output_path(), "w")
-        
-        f.write(self.export())
-        
+        import binarymodel as bm
+
+        columns, strings = self.get_binary_columns()
+
+        bm.write(path, columns, strings)
+
+        return self
+
+
+    @classmethod
+    def from_binary_file(self, path):
+
+        """Rebuilds a model from a binary model file, without querying Rhino. Elements keep their numbers, properties and layers.
+        Returns:
+          StructuralModel
+        """
+
+        import binarymodel as bm
+
+        data = bm.read(path)
+
+        model = StructuralModel(data.get_string(data.get("model.name")[0]), data.get("model.cf")[0])
+        model.gdiv = data.get("model.gdiv")[0]
+
+        # nodes in file order, referenced by index
+        nodes = []
+
+        for prefix, element_list in [("node", model.nodes), ("line", model.line_elements), ("quad", model.area_elements), ("spri", model.springs_sn)]:
+
+            no = data.get(prefix + ".no")
+            grp = data.get(prefix + ".grp")
+            strict = data.get(prefix + ".strict")
+            typ = data.get_strings(prefix + ".typ")
+            prop = data.get_strings(prefix + ".prop")
+            name = data.get_strings(prefix + ".name")
+            layer = data.get_strings(prefix + ".layer")
+            key = data.get_strings(prefix + ".key")
+            geo = data.get_strings(prefix + ".geo")
+            segment = data.get(prefix + ".segment")
+            member = data.get(prefix + ".member")
+
+            for i in range(len(no)):
+
+                if prefix == "node":
+
+                    item = Node(None, [data.get("node.x")[i], data.get("node.y")[i], data.get("node.z")[i]])
+
+                elif prefix == "line":
+
+                    item = LineElement(None, typ[i])
+
+                elif prefix == "quad":
+
+                    item = AreaElement(None)
+
+                else:
+
+                    item = SpringSN(None, [data.get("spri.dx")[i], data.get("spri.dy")[i], data.get("spri.dz")[i]])
+
+                for attr in ["n", "n1", "n2", "n3", "n4"]:
+
+                    if len(data.get(prefix + "." + attr)):
+
+                        setattr(item, attr, nodes[data.get(prefix + "." + attr)[i]])
+
+                item.no = no[i]
+                item.grp = grp[i]
+                item.strict_naming = bool(strict[i])
+                item.prop = prop[i]
+                item.name = name[i]
+                item.layer = model.get_layer(layer[i]) if layer[i] is not None else None
+
+                # Guids are kept as strings, so that elements can be found and replaced by object (see build_part); files written before
+                # Guid, piece and member had columns of their own have them in the key only
+                if len(geo):
+
+                    item.geo, item.segment, item.member = geo[i], segment[i], member[i]
+
+                elif (key[i] is not None) and (not key[i].startswith("pt ")):
+
+                    item.geo, item.segment, item.member = split_key(key[i])
+
+                # numbers are taken over as they are; conflicts were resolved when the model was built
+                element_list.insert(item)
+
+                if prefix == "node":
+
+                    nodes.append(item)
+
+            element_list._errors = data.get_strings(prefix + ".errors")
+
+        data.close()
+
+        return model
+
+
+    def make_part_file(self, path = None):
+
+        """Creates or updates the export of the part built with build_part: a standalone input file holding the elements of the part and
+        the nodes they reference, numbered as in the full model.
+        Parameters:
+          path = output path; '_system.partial.dat' next to the Rhino model if not set
+        Returns:
+          self
+        """
+
+        if path is None:
+
+            path = get_output_path(".partial.dat")
+
+        if not self.part_complete:
+
+            self._errors.append("Splitting, renumbering or compacting numbers changed elements outside of the part, which are not in this export; merge the part (partial_merge) to export them.")
+
+        f = open(path, "w")
+
+        for chunk in self.iter_export(self.part or set()):
+
+            f.write(chunk)
+
         f.close()
 
         return self
 
 
+    def make_file(self, path = None, cancelled = None):
+
+        """Creates or updates exported file.
+        Parameters:
+          path = output path; next to the Rhino model if not set
+          cancelled = function returning True once the export should stop (see backgroundexport); the previous export is kept then
+        Further formats set in giraffe_configure are written next to the export.
+        Returns:
+          self
+        """
+
+        if path is None:
+
+            path = get_output_path()
+
+        outputs = [(self.get_sofimsha_writer(), path)]
+
+        # further formats are written in the same pass
+        for name in gc.export_formats:
+
+            writer, extension = wr.FORMATS[name]
+
+            outputs.append((writer(), path[:-len(".dat")] + extension))
+
+        self.write(outputs, cancelled)
+
+        if self.numbering_path:
+
+            self.save_numbering(self.numbering_path)
+
+        if self.compaction is not None:
+
+            self.save_renumber_map(path[:-len(".dat")] + ".renumber.csv")
+
+        if gc.binary_export:
+
+            self.make_binary_file(path[:-len(".dat")] + ".gmb")
+
+        return self
+
+
+
+def Watch():
+
+    """Exports the model, then keeps the export in sync with the document until the script is run again."""
+
+    import scriptcontext as sc
+    import livesync as ls
+
+    running = sc.sticky.get("giraffe_live_sync")
+
+    # running the script while live sync is active switches it off
+    if running:
+
+        running.stop()
+        del sc.sticky["giraffe_live_sync"]
+
+        return
+
+    if gc.export_daemon:
+
+        import exportdaemon as ed
+
+        # the daemon keeps the model: the document is sent once, then only the changes
+        client = ed.DaemonClient().load()
+
+        sc.sticky["giraffe_live_sync"] = ls.LiveSync(ls.RhinoEventSource(), client, client, gc.live_sync_delay).start()
+
+        return
 
-def Main():
-    
     GiraffeLayer.setup()
 
     sofi = StructuralModel("structure").build().make_file()
 
     GiraffeLayer.teardown()
+
+    def write():
+
+        sofi.make_file()
+        GiraffeLayer.teardown()
+
+    sc.sticky["giraffe_live_sync"] = ls.LiveSync(ls.RhinoEventSource(), sofi, write, gc.live_sync_delay).start()
+
+
+def report_export(job):
+
+    """Reports the status of a background export on the command line."""
+
+    import backgroundexport as bx
+
+    if job.status == bx.DONE:
+
+        print("Giraffe: exported " + job.path)
+
+    elif job.status == bx.FAILED:
+
+        print("Giraffe: export failed: " + job.error)
+
+
+def Export(name = "structure", callback = report_export):
+
+    """Builds the model from the current document and creates or updates the exported file.
+    Parameters:
+      name = model name
+      callback = status callback of background exports (see backgroundexport)
+    Returns:
+      StructuralModel
+    """
+
+    build_filter = get_build_filter()
+
+    if build_filter:
+
+        return ExportPart(build_filter, name, gc.partial_merge)
+
+    GiraffeLayer.setup()
+
+    store = ms.SQLiteStore(get_output_path(".sqlite"), gc.tolerance, background = gc.background_export) if gc.out_of_core else None
+
+    sofi = StructuralModel(name, store = store).build()
+
+    if gc.background_export:
+
+        import backgroundexport as bx
+
+        # the document is only queried while building: the model is handed off and written while the user carries on
+        bx.submit(sofi, get_output_path(), callback)
+
+        GiraffeLayer.teardown()
+
+        return sofi
+
+    sofi.make_file()
+
+    if store:
+
+        store.close()
+
+    GiraffeLayer.teardown()
+
+    return sofi
+
+
+def get_build_filter():
+
+    """Returns the part of the model set up for partial exports in giraffe_configure; None if the whole model is exported."""
+
+    if not (gc.partial_layer or gc.partial_groups or gc.partial_selection):
+
+        return None
+
+    import buildfilter as bf
+
+    objects = (rs.SelectedObjects() or []) if gc.partial_selection else None
+
+    return bf.BuildFilter(gc.partial_layer, gc.partial_groups, objects)
+
+
+def is_index_current(path):
+
+    """Returns True if the index of the full model (binary model file) exists and is not older than the export."""
+
+    export = get_output_path()
+
+    return os.path.isfile(path) and ((not os.path.isfile(export)) or (os.path.getmtime(path) >= os.path.getmtime(export)))
+
+
+def ExportPart(build_filter, name = "structure", merge = False):
+
+    """Builds part of the model from the current document within the full model of the last export (taken from its index,
+    '_system.gmb'), and writes it to '_system.partial.dat' or merges it into the export. Without a current index, or with splitting set
+    (lines split in the index are not joined again, see build_part), the full model is built and exported instead, writing the index.
+    Parameters:
+      build_filter = buildfilter.BuildFilter defining the part
+      name = model name
+      merge = True to update the export with the part, False for a standalone partial export
+    Returns:
+      StructuralModel
+    """
+
+    GiraffeLayer.setup()
+
+    index = get_output_path(".gmb")
+
+    if is_index_current(index) and not (gc.split_intersections or gc.split_at_nodes):
+
+        sofi = StructuralModel.from_binary_file(index).build_part(build_filter)
+
+        if merge:
+
+            sofi.make_file()
+            sofi.make_binary_file(index)
+
+        else:
+
+            sofi.make_part_file()
+
+    else:
+
+        sofi = StructuralModel(name).build().make_file()
+        sofi.make_binary_file(index)
+
+    GiraffeLayer.teardown()
+
+    return sofi
+
+
+def Main():
+
+    if gc.live_sync:
+
+        Watch()
+
+        return
     
-Main()
\ No newline at end of file
+    Export()
+
+
+if __name__ == "__main__":
+
+    Main()
@@ -0,0 +1,268 @@
+##
+# BackgroundExport module.
+# Writes built models on a background thread, so that Rhino returns to the user as soon as the model is built.
+# - a submitted model is handed off to the writer: it must not be changed afterwards
+# - the export is written to a temporary file next to the output and moved into place once complete, so an unfinished export never
+#   replaces the previous one
+# - submitting an export supersedes the one in flight: that one is cancelled before its next chunk is written and the new export
+#   only starts writing once it has stopped
+# - completion, failure and cancellation are reported through a status callback, called on the writer thread
+##
+
+import os
+import threading
+import traceback
+
+
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# job currently in flight (the last one submitted)
+_current = None
+_lock = threading.Lock()
+
+
+class Cancelled(Exception):
+
+    """Raised by an export that was cancelled while writing."""
+
+    pass
+
+
+
+class ExportJob():
+
+
+    def __init__(self, model, path, callback = None, previous = None):
+
+        """Constructor.
+        Parameters:
+          model = built StructuralModel; its store, if any, is closed once written
+          path = output path
+          callback = function called with the job whenever its status changes
+          previous = job superseded by this one
+        """
+
+        self.model = model
+        self.path = path
+        self.callback = callback
+        self.previous = previous
+
+        self.status = None
+        self.error = None
+
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+
+        self.thread = None
+
+
+    def cancel(self):
+
+        """Requests cancellation; the job stops before writing its next chunk."""
+
+        self._cancelled.set()
+
+
+    def is_cancelled(self):
+
+        """Returns True if cancellation was requested."""
+
+        return self._cancelled.is_set()
+
+
+    def is_finished(self):
+
+        """Returns True once the job is done, failed or cancelled."""
+
+        return self._finished.is_set()
+
+
+    def wait(self, timeout = None):
+
+        """Waits for the job to finish.
+        Returns:
+          True if the job finished, False on timeout
+        """
+
+        self._finished.wait(timeout)
+
+        return self._finished.is_set()
+
+
+    def report(self, status, error = None):
+
+        """Sets status and calls the status callback; errors raised by the callback are ignored."""
+
+        self.status = status
+        self.error = error
+
+        if self.callback:
+
+            try:
+
+                self.callback(self)
+
+            except Exception:
+
+                pass
+
+
+    def run(self):
+
+        """Writes the export; runs on the writer thread."""
+
+        try:
+
+            if self.previous:
+
+                self.previous.cancel()
+                self.previous.wait()
+
+                # no reference to finished jobs, their models can be released
+                self.previous = None
+
+            if self.is_cancelled():
+
+                self.report(CANCELLED)
+
+                return
+
+            self.report(STARTED)
+
+            self.model.make_file(self.path, self.is_cancelled)
+
+            self.report(DONE)
+
+        except Cancelled:
+
+            self.report(CANCELLED)
+
+        except Exception as e:
+
+            self.report(FAILED, (str(e) or e.__class__.__name__) + "\n" + traceback.format_exc())
+
+        finally:
+
+            if self.model.store:
+
+                self.model.store.close()
+
+            self._finished.set()
+
+
+    def start(self):
+
+        """Starts the writer thread.
+        Returns:
+          self
+        """
+
+        self.thread = threading.Thread(target = self.run)
+
+        # an export in flight does not keep Rhino or the interpreter from exiting
+        self.thread.daemon = True
+        self.thread.start()
+
+        return self
+
+
+
+def submit(model, path, callback = None):
+
+    """Exports a built model on a background thread, superseding the export in flight if there is one.
+    Parameters:
+      model = built StructuralModel
+      path = output path
+      callback = function called with the job whenever its status changes
+    Returns:
+      ExportJob
+    """
+
+    global _current
+
+    _lock.acquire()
+
+    try:
+
+        job = ExportJob(model, path, callback, _current)
+
+        _current = job
+
+        job.start()
+
+    finally:
+
+        _lock.release()
+
+    return job
+
+
+def get_current():
+
+    """Returns the last job submitted; None if there is none."""
+
+    return _current
+
+
+def write_replacing(path, chunks, cancelled = None):
+
+    """Writes chunks to a temporary file and moves it into place once complete.
+    Parameters:
+      path = output path; or list of output paths, chunks being (index of the path, string) tuples then, and the files being moved into
+        place once all are complete
+      chunks = iterable of strings
+      cancelled = function returning True once writing should stop; Cancelled is raised then and the output is left untouched
+    """
+
+    if isinstance(path, list):
+
+        paths = path
+
+    else:
+
+        paths = [path]
+        chunks = ((0, chunk) for chunk in chunks)
+
+    files = [open(path + ".part", "w") for path in paths]
+
+    try:
+
+        for i, chunk in chunks:
+
+            if cancelled and cancelled():
+
+                raise Cancelled()
+
+            files[i].write(chunk)
+
+    except:
+
+        for f, path in zip(files, paths):
+
+            f.close()
+            os.remove(path + ".part")
+
+        raise
+
+    for f in files:
+
+        f.close()
+
+    for path in paths:
+
+        move_into_place(path + ".part", path)
+
+
+def move_into_place(temp, path):
+
+    """Replaces a file by a temporary file."""
+
+    # no atomic replace in IronPython 2.7 on Windows
+    if os.path.exists(path):
+
+        os.remove(path)
+
+    os.rename(temp, path)
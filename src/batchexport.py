@@ -0,0 +1,184 @@
+##
+# BatchExport module.
+# Command line exporter for headless model inputs (see headlessdocument), e.g. to regenerate the exports of many models overnight.
+# Models are exported in parallel by a pool of worker processes; each export is written next to its model input as _system.dat.
+#
+# usage: python batchexport.py [-j JOBS] [--name NAME] input [input ...]
+# - input = json model input, or directory searched recursively for model inputs named *.giraffe.json
+# - exit code: 0 if all models were exported, 1 if any export failed, 2 if the arguments are invalid or no model input was found
+##
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+
+INPUT_SUFFIX = ".giraffe.json"
+
+
+def find_inputs(paths):
+
+    """Returns model input paths from files and directories, in order and without duplicates."""
+
+    inputs = []
+
+    for path in paths:
+
+        if os.path.isdir(path):
+
+            for directory, subdirectories, files in sorted(os.walk(path)):
+
+                subdirectories.sort()
+
+                inputs += [os.path.join(directory, f) for f in sorted(files) if f.endswith(INPUT_SUFFIX)]
+
+        else:
+
+            inputs.append(path)
+
+    unique = []
+
+    for path in inputs:
+
+        if path not in unique:
+
+            unique.append(path)
+
+    return unique
+
+
+def export_model(job):
+
+    """Builds and exports a single model input; called in a worker process.
+    Parameters:
+      job = (model input path, model name)
+    Returns:
+      (model input path, duration in seconds, error message or None)
+    """
+
+    path, name = job
+
+    start = time.time()
+
+    try:
+
+        import Giraffe
+        import headlessdocument as hd
+
+        Giraffe.use_document(hd.HeadlessDocument.load(path))
+        Giraffe.Export(name)
+
+    except Exception as e:
+
+        error = str(e) or e.__class__.__name__
+
+        return (path, time.time() - start, error + "\n" + traceback.format_exc())
+
+    return (path, time.time() - start, None)
+
+
+def run(inputs, jobs = None, name = "structure", out = sys.stdout):
+
+    """Exports all model inputs and reports per-model timings and failures.
+    Parameters:
+      inputs = list of model input paths
+      jobs = number of worker processes; number of CPUs if not set, no pool if 1
+      name = model name written to the export header
+      out = stream the report is written to
+    Returns:
+      list of (model input path, duration, error message or None) tuples in completion order
+    """
+
+    work = [(path, name) for path in inputs]
+
+    start = time.time()
+
+    results = []
+
+    if (jobs == 1) or (len(work) == 1):
+
+        outcomes = map(export_model, work)
+        pool = None
+
+    else:
+
+        pool = multiprocessing.Pool(jobs)
+        outcomes = pool.imap_unordered(export_model, work)
+
+    try:
+
+        for result in outcomes:
+
+            path, duration, error = result
+
+            if error is None:
+
+                out.write("ok     %8.2fs  %s\n" % (duration, path))
+
+            else:
+
+                out.write("FAILED %8.2fs  %s: %s\n" % (duration, path, error.splitlines()[0]))
+
+            out.flush()
+
+            results.append(result)
+
+    finally:
+
+        if pool:
+
+            pool.close()
+            pool.join()
+
+    failed = [result for result in results if result[2] is not None]
+
+    out.write("%d exported, %d failed in %.2fs\n" % (len(results) - len(failed), len(failed), time.time() - start))
+
+    for path, duration, error in failed:
+
+        out.write("\n" + path + "\n" + error)
+
+    return results
+
+
+def main(argv = None):
+
+    """Command line entry point.
+    Returns:
+      exit code
+    """
+
+    parser = argparse.ArgumentParser(description = "Exports Giraffe model inputs (*" + INPUT_SUFFIX + ") to sofimsha input files.")
+    parser.add_argument("inputs", nargs = "+", help = "model input files, or directories searched for *" + INPUT_SUFFIX)
+    parser.add_argument("-j", "--jobs", type = int, default = None, help = "number of worker processes (default: number of CPUs)")
+    parser.add_argument("--name", default = "structure", help = "model name written to the export header")
+
+    args = parser.parse_args(argv)
+
+    if (args.jobs is not None) and (args.jobs < 1):
+
+        parser.error("--jobs must be at least 1")
+
+    inputs = find_inputs(args.inputs)
+
+    if inputs == []:
+
+        sys.stderr.write("No model inputs found.\n")
+
+        return 2
+
+    results = run(inputs, args.jobs, args.name)
+
+    if [result for result in results if result[2] is not None]:
+
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -0,0 +1,327 @@
+##
+# BinaryModel module.
+# Compact columnar file format for a built structural model, meant to be memory-mapped by other tools instead of parsing text.
+# Layout (little-endian):
+# - header: magic 'GMB1', version, number of columns, reserved (4 x 4 bytes)
+# - column directory: per column its name (24 bytes), array typecode (1 byte + 7 padding), length and offset (8 bytes each)
+# - column data, each column aligned to 8 bytes
+# Strings are interned in a string table stored as two columns ('strings.offsets' and 'strings.data'); -1 stands for no string.
+##
+
+import array
+import struct
+import sys
+
+
+MAGIC = b"GMB1"
+VERSION = 1
+
+HEADER = struct.Struct("<4sIII")
+COLUMN = struct.Struct("<24sc7xQQ")
+
+ALIGNMENT = 8
+
+
+class StringTable():
+
+
+    def __init__(self, strings = None):
+
+        """Constructor.
+        Parameters:
+          strings = list of strings already in the table
+        """
+
+        self.strings = strings or []
+        self.index = {}
+
+        for i, s in enumerate(self.strings):
+
+            self.index[s] = i
+
+
+    def intern(self, s):
+
+        """Returns index of a string, adding it to the table if needed; -1 for None."""
+
+        if s is None:
+
+            return -1
+
+        if s not in self.index:
+
+            self.index[s] = len(self.strings)
+            self.strings.append(s)
+
+        return self.index[s]
+
+
+    def get(self, i):
+
+        """Returns string by index; None for -1."""
+
+        if i == -1:
+
+            return None
+
+        return self.strings[i]
+
+
+    def to_columns(self):
+
+        """Returns the table as offset and data columns."""
+
+        offsets = array.array("i", [0])
+        data = array.array("B")
+
+        for s in self.strings:
+
+            data.extend(bytearray(s.encode("utf-8")))
+            offsets.append(len(data))
+
+        return offsets, data
+
+
+    @classmethod
+    def from_columns(self, offsets, data):
+
+        """Builds table from offset and data columns."""
+
+        raw = bytes(bytearray(data))
+
+        strings = [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+        return StringTable(strings)
+
+
+
+def get_padding(position):
+
+    """Returns number of bytes needed to align a position."""
+
+    return (ALIGNMENT - position % ALIGNMENT) % ALIGNMENT
+
+
+def to_little_endian(column):
+
+    """Returns the column in little-endian byte order."""
+
+    if sys.byteorder == "little" or column.itemsize == 1:
+
+        return column
+
+    swapped = array.array(column.typecode, column)
+    swapped.byteswap()
+
+    return swapped
+
+
+def write(path, columns, strings):
+
+    """Writes columns and string table to a file.
+    Parameters:
+      path = file path
+      columns = dictionary of array.array objects by column name (typecodes 'd', 'i' or 'B')
+      strings = StringTable
+    """
+
+    offsets, data = strings.to_columns()
+
+    columns = dict(columns)
+    columns["strings.offsets"] = offsets
+    columns["strings.data"] = data
+
+    names = sorted(columns.keys())
+
+    position = HEADER.size + COLUMN.size * len(names)
+    position += get_padding(position)
+
+    directory = []
+
+    for name in names:
+
+        column = columns[name]
+
+        directory.append(COLUMN.pack(name.encode("utf-8"), column.typecode.encode("ascii"), len(column), position))
+
+        position += len(column) * column.itemsize
+        position += get_padding(position)
+
+    f = open(path, "wb")
+
+    f.write(HEADER.pack(MAGIC, VERSION, len(names), 0))
+
+    for entry in directory:
+
+        f.write(entry)
+
+    for name in names:
+
+        f.write(b"\0" * get_padding(f.tell()))
+
+        to_little_endian(columns[name]).tofile(f)
+
+    f.close()
+
+
+
+class BinaryModel():
+
+
+    def __init__(self, columns):
+
+        """Constructor.
+        Parameters:
+          columns = dictionary of column sequences by name; memoryviews when the file is memory-mapped
+        """
+
+        self.columns = columns
+
+        self.strings = StringTable.from_columns(columns.pop("strings.offsets"), columns.pop("strings.data"))
+
+        # (mmap, memoryview) when memory-mapped
+        self._mmap = None
+
+
+    def get(self, name):
+
+        """Returns column by name; an empty list if the column does not exist."""
+
+        return self.columns.get(name, [])
+
+
+    def get_string(self, i):
+
+        """Returns interned string by index."""
+
+        return self.strings.get(i)
+
+
+    def get_strings(self, name):
+
+        """Returns a string column as a list of strings."""
+
+        return [self.strings.get(i) for i in self.get(name)]
+
+
+    def close(self):
+
+        """Releases the memory map, if any."""
+
+        if self._mmap:
+
+            m, buf = self._mmap
+
+            for name in self.columns:
+
+                self.columns[name].release()
+
+            self.columns = {}
+
+            buf.release()
+            m.close()
+
+            self._mmap = None
+
+
+
+def read_directory(buf):
+
+    """Returns list of (name, typecode, length, offset) tuples from the start of a file."""
+
+    magic, version, count, reserved = HEADER.unpack_from(buf, 0)
+
+    if magic != MAGIC:
+
+        raise ValueError("Not a Giraffe binary model.")
+
+    if version > VERSION:
+
+        raise ValueError("Unsupported binary model version " + str(version) + ".")
+
+    directory = []
+
+    for i in range(count):
+
+        name, typecode, length, offset = COLUMN.unpack_from(buf, HEADER.size + i * COLUMN.size)
+
+        directory.append((name.rstrip(b"\0").decode("utf-8"), typecode.decode("ascii"), length, offset))
+
+    return directory
+
+
+def read(path):
+
+    """Reads a binary model. Columns are memory-mapped where possible (no copy, no parsing), read into arrays otherwise.
+    Returns:
+      BinaryModel
+    """
+
+    if hasattr(memoryview, "cast") and sys.byteorder == "little":
+
+        return read_mapped(path)
+
+    return read_copied(path)
+
+
+def read_mapped(path):
+
+    """Reads a binary model through a memory map."""
+
+    import mmap
+
+    f = open(path, "rb")
+    m = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    f.close()
+
+    buf = memoryview(m)
+
+    columns = {}
+
+    try:
+
+        for name, typecode, length, offset in read_directory(buf):
+
+            itemsize = array.array(typecode).itemsize
+
+            columns[name] = buf[offset:offset + length * itemsize].cast(typecode)
+
+    except ValueError:
+
+        buf.release()
+        m.close()
+
+        raise
+
+    model = BinaryModel(columns)
+    model._mmap = (m, buf)
+
+    return model
+
+
+def read_copied(path):
+
+    """Reads a binary model into arrays (e.g. IronPython)."""
+
+    f = open(path, "rb")
+    buf = f.read()
+    f.close()
+
+    columns = {}
+
+    for name, typecode, length, offset in read_directory(buf):
+
+        column = array.array(typecode)
+        itemsize = column.itemsize
+
+        if hasattr(column, "frombytes"):
+
+            column.frombytes(buf[offset:offset + length * itemsize])
+
+        else:
+
+            column.fromstring(buf[offset:offset + length * itemsize])
+
+        columns[name] = to_little_endian(column)
+
+    return BinaryModel(columns)
@@ -0,0 +1,71 @@
+##
+# Blocks module.
+# Block instances on structural layers are expanded into the elements of the objects of their block definition (see
+# StructuralModel.add_block_instance):
+# - a definition is read once per layer it is placed on; its points are taken from the objects in definition coordinates
+# - the points of an instance are transformed in a single batch by the instance transform
+# - objects of the definition on structural layers keep their layer, other objects are placed on the layer of the instance
+# - the instance name sets offsets for the instance: 'grp 10' adds 10 to the group of every object, 'no 1000' adds 1000 to the number
+#   of every object with a number set in Rhino (e.g. '[grp 10 no 1000]' or 'grp 10 no 1000 {plate 2}')
+# Nested instances are expanded when the definition is read; their names do not set offsets.
+##
+
+import rhinoinput as ri
+
+
+def get_matrix(xform):
+
+    """Returns the rows of a 4x4 transformation matrix (e.g. Rhino.Geometry.Transform) as lists."""
+
+    return [[xform[i, j] for j in range(4)] for i in range(4)]
+
+
+def transform(matrix, points):
+
+    """Returns points transformed by a 4x4 transformation matrix, all in one pass.
+    Parameters:
+      matrix = rows of the matrix (see get_matrix)
+      points = list of coordinate triples
+    Returns:
+      list of coordinate lists
+    """
+
+    (a, b, c, d), (e, f, g, h), (i, j, k, l), (m, n, o, p) = matrix
+
+    # affine transforms (the usual block transforms) need no division
+    if (m, n, o, p) == (0, 0, 0, 1):
+
+        return [[a * x + b * y + c * z + d, e * x + f * y + g * z + h, i * x + j * y + k * z + l] for x, y, z in points]
+
+    transformed = []
+
+    for x, y, z in points:
+
+        w = m * x + n * y + o * z + p
+
+        transformed.append([(a * x + b * y + c * z + d) / w, (e * x + f * y + g * z + h) / w, (i * x + j * y + k * z + l) / w])
+
+    return transformed
+
+
+def get_offsets(name):
+
+    """Returns (group offset, number offset) set in the name of a block instance; 0 for offsets not set."""
+
+    tokens = ri.RhinoInput(name or "").get_prop().split()
+
+    offsets = {"grp": 0, "no": 0}
+
+    for keyword, value in zip(tokens[:-1], tokens[1:]):
+
+        if keyword.lower() in offsets:
+
+            try:
+
+                offsets[keyword.lower()] = int(value)
+
+            except ValueError:
+
+                pass
+
+    return offsets["grp"], offsets["no"]
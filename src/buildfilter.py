@@ -0,0 +1,63 @@
+##
+# BuildFilter module.
+# Restricts a build to part of the model (see StructuralModel.build and StructuralModel.build_part), e.g. to iterate on a single truss of
+# a large model. Parts are defined by any combination of:
+# - a layer subtree: the layer and its sublayers
+# - a group range: layers whose group number is in the range
+# - a set of objects, e.g. the objects selected in Rhino
+# An element is in the part if it meets all criteria that are set. Elements without layer (nodes added by Giraffe) never are.
+##
+
+
+class BuildFilter():
+
+
+    def __init__(self, layer = None, groups = None, objects = None):
+
+        """Constructor.
+        Parameters:
+          layer = full layer name (e.g. 'input::beams::2'); objects on the layer and its sublayers are accepted
+          groups = (first, last) range of accepted group numbers, both included
+          objects = Guids of accepted objects
+        """
+
+        self.layer = layer
+        self.groups = groups
+        self.objects = set([str(obj) for obj in objects]) if objects is not None else None
+
+
+    def accepts_layer(self, layer):
+
+        """Returns True if objects on a GiraffeLayer can be in the part; False for None."""
+
+        if layer is None:
+
+            return False
+
+        if self.layer and (layer.name != self.layer) and (not layer.name.startswith(self.layer + "::")):
+
+            return False
+
+        if self.groups:
+
+            first, last = self.groups
+
+            if not (first <= layer.get_grp() <= last):
+
+                return False
+
+        return True
+
+
+    def accepts_object(self, obj):
+
+        """Returns True if an object (Guid) can be in the part."""
+
+        return (self.objects is None) or (str(obj) in self.objects)
+
+
+    def accepts_element(self, element):
+
+        """Returns True if an element is in the part: all pieces and block members of an accepted object are."""
+
+        return self.accepts_layer(element.layer) and self.accepts_object(element.geo)
@@ -0,0 +1,716 @@
+##
+# Catalog module.
+# Index of the cross sections and materials defined in SOFiSTiK input files (e.g. the model.dat next to the Rhino model and the
+# files it includes), so that properties referencing them (e.g. 'ncs 5', 'mno 1') can be validated while the model is built.
+# Supported CADINP constructs:
+# - #include of files (relative to the including file) and of blocks defined with #define ... #enddef
+# - let#name value and name = value variables, referenced as #name and $(name), with simple arithmetic and [unit] suffixes
+# - $ comments, !*!Label lines
+# Section records (SECT, CABL, TUBE ...) and material records (STEE, MATE, CONC ...) of AQUA are indexed by their number; records of
+# other programs (e.g. CABL elements in sofimsha) are skipped.
+# Cross-section areas and unit weights are read for quantity takeoffs (see get_area, get_unit_weight): areas of sections made of plates
+# (SECT followed by PLAT rows, thin-walled), of SREC, TUBE and CABL records with their dimensions given, in mm; unit weights (GAM) in
+# kN/m3. Values that cannot be evaluated (e.g. functions of variables) leave the area unknown.
+# Catalogs are cached and only parsed again once one of the files read has been modified.
+##
+
+import math
+import os
+import re
+
+
+SECTION_RECORDS = ["sect", "cabl", "tube", "srec", "scit", "sval", "prof"]
+MATERIAL_RECORDS = ["stee", "mate", "mat", "conc", "nmat", "timb", "mast", "bric", "stah", "beto"]
+
+# property keywords referencing catalog entries
+REFERENCES = {
+    "ncs": "sections",
+    "ncse": "sections",
+    "mno": "materials",
+    "mrf": "materials"
+}
+
+VARIABLE = re.compile(r"#([A-Za-z_][A-Za-z0-9_]*)|\$\(([^)]*)\)")
+UNIT = re.compile(r"\[[^\]]*\]")
+ARITHMETIC = re.compile(r"^([0-9eE.+\-*/() ]|sin|cos|tan|sqrt|abs)+$", re.IGNORECASE)
+
+TOKEN = re.compile(r"\s*(?:([0-9]+(?:\.[0-9]*)?(?:e[+\-]?[0-9]+)?|\.[0-9]+(?:e[+\-]?[0-9]+)?)|(\*\*|[+\-*/()])|([a-z]+))")
+
+# largest exponent allowed in expressions, so that no expression takes long or overflows to be evaluated
+MAX_EXPONENT = 64
+
+# functions in expressions, angles in degrees as in CADINP
+FUNCTIONS = {
+    "sin": lambda x: math.sin(math.radians(x)),
+    "cos": lambda x: math.cos(math.radians(x)),
+    "tan": lambda x: math.tan(math.radians(x)),
+    "sqrt": math.sqrt,
+    "abs": abs
+}
+
+# programs whose records are indexed; records outside of any +prog block (e.g. in included files) are indexed as well
+PROGRAMS = ["aqua"]
+
+# positional items of the section records areas are computed from, and of plates
+SECTION_ITEMS = {
+    "sect": ["no"],
+    "srec": ["no", "h", "b"],
+    "tube": ["no", "d", "t"],
+    "cabl": ["no", "d"]
+}
+PLATE_ITEMS = ["no", "yb", "zb", "ye", "ze", "t"]
+
+QUOTED = re.compile(r"'[^']*'")
+
+# parsed catalogs by (path, ignored paths)
+_cache = {}
+
+
+def tokenize(text):
+
+    """Returns the tokens of an arithmetic expression as (kind, value) tuples: ('number', value), ('operator', text) or
+    ('name', text). Raises ValueError for other text.
+    """
+
+    tokens = []
+
+    i = 0
+
+    text = text.lower().rstrip()
+
+    while i < len(text):
+
+        match = TOKEN.match(text, i)
+
+        if not match:
+
+            raise ValueError("Not an expression: " + text)
+
+        number, operator, name = match.groups()
+
+        if number is not None:
+
+            tokens.append(("number", int(number) if number.isdigit() else float(number)))
+
+        elif operator is not None:
+
+            tokens.append(("operator", operator))
+
+        else:
+
+            tokens.append(("name", name))
+
+        i = match.end()
+
+    return tokens
+
+
+def calculate(text):
+
+    """Returns the value of an arithmetic expression: numbers, + - * / ** (exponents up to MAX_EXPONENT), parentheses and FUNCTIONS.
+    Raises ValueError for anything else.
+    """
+
+    tokens = tokenize(text)
+
+    position = [0]
+
+    def peek():
+
+        return tokens[position[0]] if position[0] < len(tokens) else (None, None)
+
+    def take(expected = None):
+
+        token = peek()
+
+        if (token[0] is None) or ((expected is not None) and (token[1] != expected)):
+
+            raise ValueError("Not an expression: " + text)
+
+        position[0] += 1
+
+        return token
+
+    def expression():
+
+        value = term()
+
+        while peek()[1] in ["+", "-"]:
+
+            value = value + term() if take()[1] == "+" else value - term()
+
+        return value
+
+    def term():
+
+        value = factor()
+
+        while peek()[1] in ["*", "/"]:
+
+            value = value * factor() if take()[1] == "*" else value / float(factor())
+
+        return value
+
+    def factor():
+
+        # signs bind less tightly than powers, as in CADINP: -2**2 = -4
+        if peek()[1] in ["+", "-"]:
+
+            return factor() if take()[1] == "+" else -factor()
+
+        value = atom()
+
+        if peek()[1] == "**":
+
+            take()
+
+            exponent = factor()
+
+            if abs(exponent) > MAX_EXPONENT:
+
+                raise ValueError("Exponent too large: " + text)
+
+            value = float(value) ** exponent
+
+        return value
+
+    def atom():
+
+        kind, value = take()
+
+        if kind == "number":
+
+            return value
+
+        if (kind == "name") and (value in FUNCTIONS):
+
+            take("(")
+
+            result = FUNCTIONS[value](expression())
+
+            take(")")
+
+            return result
+
+        if value == "(":
+
+            result = expression()
+
+            take(")")
+
+            return result
+
+        raise ValueError("Not an expression: " + text)
+
+    value = expression()
+
+    if position[0] != len(tokens):
+
+        raise ValueError("Not an expression: " + text)
+
+    return value
+
+
+
+class Catalog():
+
+
+    def __init__(self, ignore = None):
+
+        """Constructor.
+        Parameters:
+          ignore = paths of files that are never parsed, even when included (e.g. the Giraffe export itself)
+        """
+
+        self.ignore = [os.path.abspath(path) for path in (ignore or [])]
+
+        self.sections = {}
+        self.materials = {}
+
+        # values of section and material records by number (see get_values), 'plates' = summed area of the plates of a section
+        self.section_values = {}
+        self.material_values = {}
+
+        # section plates are added to, plate items of rows without keywords and end point of the last plate
+        self.section = None
+        self.plate_items = PLATE_ITEMS
+        self.plate_end = None
+
+        self.variables = {}
+        self.macros = {}
+
+        # current +prog block; None outside of any
+        self.program = None
+
+        # modification time of every file read, by path
+        self.files = {}
+
+        self._errors = []
+        self._validated = {}
+
+
+    def evaluate(self, expression):
+
+        """Returns value of an expression after substituting variables; a number if the expression is arithmetic, the text otherwise."""
+
+        def substitute(match):
+
+            name = match.group(1) or match.group(2)
+
+            return str(self.variables.get(name.lower(), match.group(0)))
+
+        text = UNIT.sub("", VARIABLE.sub(substitute, expression)).strip()
+
+        if text and ARITHMETIC.match(text):
+
+            try:
+
+                value = calculate(text)
+
+                if value == int(value):
+
+                    return int(value)
+
+                return value
+
+            except (ZeroDivisionError, OverflowError, ValueError):
+
+                pass
+
+        return text
+
+
+    def get_number(self, tokens):
+
+        """Returns record number from the tokens following a record keyword (e.g. '301 type ...' or 'no #ncs mno ...'); None if not found."""
+
+        if tokens and tokens[0].lower() == "no":
+
+            tokens = tokens[1:]
+
+        if not tokens:
+
+            return None
+
+        value = self.evaluate(tokens[0])
+
+        if isinstance(value, int):
+
+            return value
+
+        return None
+
+
+    def strip_comment(self, line):
+
+        """Removes '$' comments; '$(' starts a variable reference and is kept."""
+
+        i = 0
+
+        while True:
+
+            i = line.find("$", i)
+
+            if i == -1:
+
+                return line
+
+            if line[i + 1:i + 2] != "(":
+
+                return line[:i]
+
+            i += 1
+
+
+    def read_lines(self, path):
+
+        """Returns lines of a file, remembering its modification time."""
+
+        self.files[path] = os.path.getmtime(path)
+
+        f = open(path, "r")
+        lines = f.readlines()
+        f.close()
+
+        return lines
+
+
+    def parse_file(self, path, depth = 0):
+
+        """Parses a file and the files it includes.
+        Returns:
+          self
+        """
+
+        path = os.path.abspath(path)
+
+        if path in self.ignore:
+
+            return self
+
+        if not os.path.isfile(path):
+
+            self._errors.append("Catalog file not found: " + path)
+
+            return self
+
+        return self.parse_lines(self.read_lines(path), os.path.dirname(path), depth)
+
+
+    def parse_lines(self, lines, directory, depth = 0):
+
+        """Parses lines of input.
+        Parameters:
+          lines = list of lines
+          directory = directory files are included from
+          depth = include depth, guarding against recursive includes
+        Returns:
+          self
+        """
+
+        if depth > 20:
+
+            self._errors.append("Catalog includes nested too deeply.")
+
+            return self
+
+        macro = None
+
+        for line in lines:
+
+            line = self.strip_comment(line).strip()
+
+            if line == "" or line.startswith("!"):
+
+                continue
+
+            tokens = line.split()
+            keyword = tokens[0].lower()
+
+            # titles are free text
+            values = QUOTED.sub("", line.split(";")[0]).split()
+
+            if macro is not None:
+
+                if keyword == "#enddef":
+
+                    macro = None
+
+                else:
+
+                    self.macros[macro].append(line)
+
+                continue
+
+            if keyword == "#define" and len(tokens) > 1:
+
+                macro = tokens[1].lower()
+                self.macros[macro] = []
+
+            elif keyword == "#include" and len(tokens) > 1:
+
+                name = tokens[1]
+
+                if name.lower() in self.macros:
+
+                    self.parse_lines(self.macros[name.lower()], directory, depth + 1)
+
+                else:
+
+                    self.parse_file(os.path.join(directory, name), depth + 1)
+
+            elif keyword == "+prog":
+
+                self.program = tokens[1].lower() if len(tokens) > 1 else None
+
+            elif keyword == "end":
+
+                self.program = None
+
+            elif keyword.startswith("let#") or keyword.startswith("sto#"):
+
+                self.variables[tokens[0][4:].lower()] = self.evaluate(line[len(tokens[0]):])
+
+            elif (len(tokens) > 2) and (tokens[1] == "=") and (not keyword.startswith("#")):
+
+                self.variables[tokens[0].lower()] = self.evaluate(line[line.index("=") + 1:])
+
+            elif (self.program is not None) and (self.program not in PROGRAMS):
+
+                continue
+
+            elif keyword in SECTION_RECORDS:
+
+                number = self.get_number(tokens[1:])
+
+                self.add_section(keyword, number, values[1:])
+                self.add(self.sections, number, line)
+
+            elif keyword in MATERIAL_RECORDS:
+
+                number = self.get_number(tokens[1:])
+
+                self.add(self.material_values, number, self.get_values(values[1:], ["no"]))
+                self.add(self.materials, number, line)
+
+                self.section = None
+
+            elif keyword == "plat":
+
+                self.add_plate(values[1:])
+
+            elif (self.section is not None) and isinstance(self.evaluate(tokens[0]), (int, float)):
+
+                # further rows of plates start with the plate number
+                self.add_plate(values)
+
+            else:
+
+                self.section = None
+
+        return self
+
+
+    def get_values(self, tokens, items):
+
+        """Returns the values of the items of a record by name (lower case). Items are given by keyword (e.g. 'mno 1'), or by position
+        in items, counting from the last keyword in items; values are evaluated (see evaluate).
+        Parameters:
+          tokens = tokens following the record keyword, titles removed
+          items = names of the positional items of the record
+        """
+
+        values = {}
+
+        # position of the next positional value in items; None after a keyword not in items, which only takes the value following it
+        position = 0
+        keyword = None
+
+        for token in tokens:
+
+            if token[0].isalpha():
+
+                if token.lower() in items:
+
+                    position = items.index(token.lower())
+                    keyword = None
+
+                else:
+
+                    position = None
+                    keyword = token.lower()
+
+                continue
+
+            if keyword is not None:
+
+                values[keyword] = self.evaluate(token)
+                keyword = None
+
+            elif (position is not None) and (position < len(items)):
+
+                values[items[position]] = self.evaluate(token)
+                position += 1
+
+        return values
+
+
+    def add_section(self, keyword, number, tokens):
+
+        """Reads the values of a section record; the plates following it are added to it."""
+
+        self.section = None
+
+        if (number is None) or (number in self.section_values):
+
+            return
+
+        values = self.get_values(tokens, SECTION_ITEMS.get(keyword, ["no"]))
+        values["record"] = keyword
+
+        self.section_values[number] = values
+
+        self.section = number
+        self.plate_items = PLATE_ITEMS
+        self.plate_end = None
+
+
+    def add_plate(self, tokens):
+
+        """Adds a plate row to the area of the current section. Rows of keywords only set the items of the rows following them; plates
+        without start point start at the end of the previous plate.
+        """
+
+        if self.section is None:
+
+            return
+
+        if tokens and all([token[0].isalpha() for token in tokens]):
+
+            self.plate_items = [token.lower() for token in tokens]
+
+            return
+
+        values = self.get_values(tokens, self.plate_items)
+
+        start = self.plate_end or (None, None)
+
+        points = [values.get("yb", start[0]), values.get("zb", start[1]), values.get("ye"), values.get("ze"), values.get("t")]
+
+        self.plate_end = (points[2], points[3])
+
+        section = self.section_values[self.section]
+
+        if (section.get("plates", 0.0) is None) or not all([isinstance(v, (int, float)) for v in points]):
+
+            section["plates"] = None
+
+            return
+
+        yb, zb, ye, ze, t = points
+
+        section["plates"] = section.get("plates", 0.0) + ((ye - yb) ** 2 + (ze - zb) ** 2) ** 0.5 * t
+
+
+    def get_area(self, number):
+
+        """Returns the area of a section in m2; None if unknown."""
+
+        values = self.section_values.get(number)
+
+        if values is None:
+
+            return None
+
+        def number_of(name):
+
+            value = values.get(name)
+
+            return value if isinstance(value, (int, float)) else None
+
+        d, t, h, b = number_of("d"), number_of("t"), number_of("h"), number_of("b")
+
+        if "plates" in values:
+
+            area = values["plates"]
+
+        elif (values["record"] == "srec") and (h is not None) and (b is not None):
+
+            area = h * b
+
+        elif (values["record"] == "tube") and (d is not None) and (t is not None):
+
+            area = math.pi / 4 * (d ** 2 - (d - 2 * t) ** 2)
+
+        elif (values["record"] == "cabl") and (d is not None):
+
+            area = math.pi / 4 * d ** 2
+
+        else:
+
+            return None
+
+        return None if area is None else area * 1e-6
+
+
+    def get_section_material(self, number):
+
+        """Returns the material number of a section; None if not set."""
+
+        value = self.section_values.get(number, {}).get("mno")
+
+        return value if isinstance(value, int) else None
+
+
+    def get_unit_weight(self, number):
+
+        """Returns the unit weight of a material in kN/m3; None if unknown."""
+
+        value = self.material_values.get(number, {}).get("gam")
+
+        return value if isinstance(value, (int, float)) else None
+
+
+    def add(self, index, number, line):
+
+        """Adds a record to an index; the first definition of a number is kept."""
+
+        if (number is not None) and (number not in index):
+
+            index[number] = line
+
+
+    def is_up_to_date(self):
+
+        """Returns True if none of the files read has been modified since."""
+
+        for path in self.files:
+
+            if (not os.path.isfile(path)) or (os.path.getmtime(path) != self.files[path]):
+
+                return False
+
+        return True
+
+
+    def validate(self, prop):
+
+        """Returns list of errors for catalog entries referenced by a property string that do not exist, e.g. 'ncs 5' with no section 5.
+        References through variables (e.g. 'ncs #ncs') are not checked. Results are memoized per property string.
+        """
+
+        if prop in self._validated:
+
+            return self._validated[prop]
+
+        errors = []
+
+        tokens = prop.split()
+
+        for i in range(len(tokens) - 1):
+
+            keyword = tokens[i].lower()
+
+            if keyword not in REFERENCES:
+
+                continue
+
+            try:
+
+                number = int(tokens[i + 1])
+
+            except ValueError:
+
+                continue
+
+            if number not in getattr(self, REFERENCES[keyword]):
+
+                errors.append(keyword + " " + str(number) + " not found in catalog " + REFERENCES[keyword])
+
+        self._validated[prop] = errors
+
+        return errors
+
+
+
+def load(path, ignore = None):
+
+    """Returns the catalog of a file and its includes, parsing it only if it was not parsed before or any of its files changed since.
+    Parameters:
+      path = file path
+      ignore = paths of files that are never parsed (see Catalog)
+    """
+
+    path = os.path.abspath(path)
+
+    key = (path, tuple(sorted([os.path.abspath(p) for p in (ignore or [])])))
+
+    if key in _cache and _cache[key].is_up_to_date():
+
+        return _cache[key]
+
+    catalog = Catalog(ignore).parse_file(path)
+
+    _cache[key] = catalog
+
+    return catalog
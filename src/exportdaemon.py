@@ -0,0 +1,710 @@
+##
+# ExportDaemon module.
+# Long-lived local export process: keeps a built model, its number map and its document in memory and updates them from batches of
+# changes sent over a local socket, so that an export after a change costs neither imports, nor layer scanning, nor a full rebuild.
+# Requests and responses are json objects, one per line:
+#   {"op": "load", "path": "system.giraffe.json"}             builds and exports a model input (see headlessdocument)
+#   {"op": "load", "path": "...", "document": {...}}          same, with the contents of the model input sent along (e.g. from Rhino)
+#   {"op": "changes", "changes": [change, ...]}               applies changes and exports
+#   {"op": "changes", "changes": [...], "write": false}       applies changes, returns the changed records without writing the export
+#   {"op": "export"}                                           exports
+#   {"op": "status"}                                           returns the number of elements per element list
+#   {"op": "shutdown"}                                         stops the daemon
+# - change = {"kind": "add" | "update" | "delete", "id": "...", "object": {...}}, object as in model inputs (not set for deletions)
+# - objects of model inputs and changes may come with the points their elements are built from, computed in Rhino (see describe_object):
+#   "members": [[member, layer, name, points, number offset], ...], one entry per object of a block instance or a single entry with
+#   member 0 for other objects (see StructuralModel.add_member); the elements are built from these points instead of the object points
+# - responses: {"ok": true, ...} or {"ok": false, "error": "..."}; exports return the output path, the time taken in ms and the element
+#   records added to and removed from the export since the last response ("added", "removed"), computed from the elements a change
+#   touched only (see ElementList.track_changes); a load returns every record. The export file is written as a whole, unless write is false
+# Every client is served on its own thread, requests of all clients are handled one after the other (the model is locked). The daemon
+# runs in CPython; the client (DaemonClient, usable from Rhino as a live sync target) also runs in IronPython 2.7 and uses plain sockets.
+#
+# usage: python exportdaemon.py [--port PORT] [--name NAME] [input]
+##
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+
+from collections import Counter
+
+import giraffe_configure as gc
+import giraffe_setup as gs
+
+
+class Daemon():
+
+
+    def __init__(self, name = "structure"):
+
+        """Constructor.
+        Parameters:
+          name = model name written to the export header
+        """
+
+        self.name = name
+
+        self.document = None
+        self.model = None
+
+        # points elements are built from by object id, for objects sent with them (see module description)
+        self.members = {}
+
+        # (element list, element, identities of its nodes, export record) of every element by identity (see Giraffe.get_identity), and
+        # identities of the elements referencing every node by identity of the node, to export again only what a change touched
+        self.records = {}
+        self.users = {}
+
+        # requests of all clients are handled one after the other
+        self.lock = threading.Lock()
+
+        self.stopped = False
+        self.port = None
+        self.server = None
+
+
+    def load(self, path, data = None):
+
+        """Builds a model input and exports it.
+        Parameters:
+          path = path of the model input; the export is written to its directory
+          data = contents of the model input; read from path if not set
+        Returns:
+          export response (see export)
+        """
+
+        import Giraffe
+        import headlessdocument as hd
+
+        if data is None:
+
+            f = open(path, "r")
+            data = json.load(f)
+            f.close()
+
+        self.document = hd.HeadlessDocument.from_data(data, path)
+
+        self.members = dict([(obj["id"], obj["members"]) for obj in data.get("objects", []) if obj.get("id") and obj.get("members")])
+
+        Giraffe.use_document(self.document)
+        Giraffe.GiraffeLayer.setup()
+
+        self.model = Giraffe.StructuralModel(self.name)
+        self.model.members = self.members
+        self.model.build()
+
+        self.records = {}
+        self.users = {}
+
+        for element_list in self.get_element_lists():
+
+            element_list.track_changes()
+
+        return self.export([(element_list, item) for element_list in self.get_element_lists() for item in element_list.iterate()])
+
+
+    def apply(self, changes):
+
+        """Applies changes to the document and the model.
+        Parameters:
+          changes = list of change dictionaries (see module description)
+        """
+
+        import livesync as ls
+
+        # the document is only changed once all changes are known to be valid, so that it stays in sync with the model
+        for change in changes:
+
+            check_change(change)
+
+        applied = []
+
+        for change in changes:
+
+            kind = change["kind"]
+            obj = change["id"]
+
+            if kind in [ls.DELETE, ls.UPDATE]:
+
+                self.document.DeleteObject(obj)
+
+                self.members.pop(obj, None)
+
+            if kind in [ls.ADD, ls.UPDATE]:
+
+                data = dict(change["object"])
+                data["id"] = obj
+
+                self.document.load_object(data)
+
+                if data.get("members"):
+
+                    self.members[obj] = data["members"]
+
+            applied.append((kind, obj))
+
+        self.model.apply_changes(applied)
+
+
+    def get_element_lists(self):
+
+        """Returns the element lists of the model, nodes first."""
+
+        return [self.model.nodes] + self.model.get_element_lists()
+
+
+    def update_records(self, changed):
+
+        """Exports changed elements again, and the elements referencing nodes renumbered by the change.
+        Parameters:
+          changed = list of (element list, element) tuples, removed elements included
+        Returns:
+          (added, removed) tuple of collections.Counter objects of record lines
+        """
+
+        import Giraffe
+        import writers as wr
+
+        writer = wr.SofimshaWriter(self.model.get_sofimsha_writer().cf)
+
+        added = Counter()
+        removed = Counter()
+
+        done = set()
+
+        while changed:
+
+            element_list, item = changed.pop()
+
+            key = Giraffe.get_identity(item)
+
+            if key in done:
+
+                continue
+
+            done.add(key)
+
+            old = self.records.pop(key, None)
+
+            if old is not None:
+
+                removed.update(old[3].splitlines())
+
+                for n in old[2]:
+
+                    self.users.get(n, set()).discard(key)
+
+            if not element_list.is_registered(item):
+
+                self.users.pop(key, None)
+
+                continue
+
+            record = writer.element(item, element_list)
+
+            nodes = [Giraffe.get_identity(getattr(item, attr)) for attr in item.get_node_attributes()]
+
+            self.records[key] = (element_list, item, nodes, record)
+
+            added.update(record.splitlines())
+
+            for n in nodes:
+
+                self.users.setdefault(n, set()).add(key)
+
+            # elements referencing a renumbered node are exported again
+            if (old is not None) and (old[3] != record) and (item.typ == "node"):
+
+                changed.extend([self.records[user][:2] for user in self.users.get(key, []) if user in self.records])
+
+        return added - removed, removed - added
+
+
+    def export(self, changed = None, write = True):
+
+        """Exports the elements changed since the last export and writes the export of the model.
+        Parameters:
+          changed = list of (element list, element) tuples exported in addition to the changes tracked by the element lists
+          write = False to leave the export file as it is
+        Returns:
+          response with the output path, time taken and records added to and removed from the export
+        """
+
+        import Giraffe
+
+        start = time.time()
+
+        changed = list(changed or [])
+
+        for element_list in self.get_element_lists():
+
+            changed.extend([(element_list, item) for item in element_list.collect_changes().values()])
+
+        added, removed = self.update_records(changed)
+
+        path = Giraffe.get_output_path()
+
+        if write:
+
+            self.model.make_file(path)
+
+        Giraffe.GiraffeLayer.teardown()
+
+        return {"ok": True, "path": path, "ms": round((time.time() - start) * 1000, 1),
+                "added": sorted(added.elements()), "removed": sorted(removed.elements())}
+
+
+    def status(self):
+
+        """Returns response with the number of elements per element list."""
+
+        counts = {}
+
+        for element_list in [self.model.nodes] + self.model.get_element_lists():
+
+            counts[element_list.name] = len(list(element_list.iterate()))
+
+        return {"ok": True, "elements": counts}
+
+
+    def handle(self, request):
+
+        """Handles a request.
+        Returns:
+          response
+        """
+
+        op = request.get("op")
+
+        if op == "load":
+
+            return self.load(request["path"], request.get("document"))
+
+        if op == "shutdown":
+
+            self.stopped = True
+
+            return {"ok": True}
+
+        if self.model is None:
+
+            return {"ok": False, "error": "No model loaded."}
+
+        if op == "changes":
+
+            self.apply(request.get("changes", []))
+
+            return self.export(write = request.get("write", True))
+
+        if op == "export":
+
+            return self.export()
+
+        if op == "status":
+
+            return self.status()
+
+        return {"ok": False, "error": "Unknown request: " + str(op)}
+
+
+    def handle_line(self, line):
+
+        """Handles a request line once no other request is being handled; errors are returned as responses, the daemon keeps running."""
+
+        self.lock.acquire()
+
+        try:
+
+            return self.handle(json.loads(line))
+
+        except Exception as e:
+
+            return {"ok": False, "error": (str(e) or e.__class__.__name__) + "\n" + traceback.format_exc()}
+
+        finally:
+
+            self.lock.release()
+
+
+    def serve_connection(self, connection):
+
+        """Answers the requests of a client until it disconnects or the daemon is stopped."""
+
+        f = connection.makefile("rw")
+
+        try:
+
+            while not self.stopped:
+
+                line = f.readline()
+
+                if not line:
+
+                    return
+
+                if not line.strip():
+
+                    continue
+
+                f.write(json.dumps(self.handle_line(line)) + "\n")
+                f.flush()
+
+        finally:
+
+            f.close()
+
+
+    def serve(self, port = None, host = "127.0.0.1", ready = None):
+
+        """Answers requests on a local socket until stopped, every client on its own thread: a client keeping its connection open does
+        not hold up the others.
+        Parameters:
+          port = port to listen on; gc.export_daemon_port if not set, any free port if 0
+          host = address to listen on; local connections only by default
+          ready = function called with the daemon once it listens (e.g. to read the port)
+        """
+
+        try:
+
+            import socketserver
+
+        except ImportError:
+
+            import SocketServer as socketserver
+
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+
+            def handle(self):
+
+                daemon.serve_connection(self.request)
+
+                # stopped by this client: no further clients are accepted
+                if daemon.stopped:
+
+                    self.server.shutdown()
+
+        class Server(socketserver.ThreadingTCPServer):
+
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = Server((host, gc.export_daemon_port if port is None else port), Handler)
+
+        try:
+
+            self.port = self.server.server_address[1]
+
+            if ready:
+
+                ready(self)
+
+            self.server.serve_forever(0.1)
+
+        finally:
+
+            self.server.server_close()
+
+
+
+def check_change(change):
+
+    """Raises ValueError for a change the daemon cannot apply (see module description)."""
+
+    import livesync as ls
+
+    if not isinstance(change, dict):
+
+        raise ValueError("Invalid change: " + str(change))
+
+    kind = change.get("kind")
+
+    if kind not in [ls.ADD, ls.UPDATE, ls.DELETE]:
+
+        raise ValueError("Invalid change kind: " + str(kind))
+
+    if not change.get("id"):
+
+        raise ValueError("Change without id: " + str(change))
+
+    if kind == ls.DELETE:
+
+        return
+
+    obj = change.get("object")
+
+    if not isinstance(obj, dict):
+
+        raise ValueError("Change of " + str(change["id"]) + " without object.")
+
+    keys = ["type", "layer", "block"] if obj.get("type") == "Block" else ["type", "layer", "points"]
+
+    missing = [key for key in keys if key not in obj]
+
+    if missing:
+
+        raise ValueError("Object of " + str(change["id"]) + " without " + ", ".join(missing) + ".")
+
+    if obj["type"] not in gs.object_types:
+
+        raise ValueError("Object of " + str(change["id"]) + " of unknown type " + str(obj["type"]) + ".")
+
+    members = obj.get("members", [])
+
+    if (not isinstance(members, list)) or [member for member in members if not (isinstance(member, list) and len(member) == 5)]:
+
+        raise ValueError("Object of " + str(change["id"]) + " with invalid members.")
+
+
+def send(requests, port = None, host = "127.0.0.1", timeout = 60):
+
+    """Sends requests to a running daemon over a single connection.
+    Parameters:
+      requests = list of request dictionaries
+      port = port of the daemon; gc.export_daemon_port if not set
+    Returns:
+      list of responses
+    """
+
+    connection = socket.create_connection((host, gc.export_daemon_port if port is None else port), timeout)
+
+    f = connection.makefile("rw")
+
+    responses = []
+
+    try:
+
+        for request in requests:
+
+            f.write(json.dumps(request) + "\n")
+            f.flush()
+
+            responses.append(json.loads(f.readline()))
+
+    finally:
+
+        f.close()
+        connection.close()
+
+    return responses
+
+
+
+def describe_object(obj, model):
+
+    """Returns an object of the Rhino document as in model inputs (see headlessdocument). Objects model inputs cannot describe exactly,
+    curves other than lines, polylines and arcs, surfaces and block instances, come with the points their elements are built from in
+    Rhino ("members", see module description), so that the daemon builds the same elements as an export in Rhino: curves divided as set
+    (divide_curves, curve_tolerance, seg on the layer), surfaces meshed on the surface itself, block instances expanded.
+    Parameters:
+      obj = Guid
+      model = StructuralModel the points are computed with (unit system, block definitions); it is not built
+    """
+
+    import Giraffe
+    import blocks as bl
+
+    rs = Giraffe.rs
+
+    typ = rs.ObjectType(obj)
+    layer = model.get_layer(rs.ObjectLayer(obj))
+
+    data = {
+        "type": [name for name in gs.object_types if gs.object_types[name] == typ][0],
+        "layer": layer.name,
+        "name": rs.ObjectName(obj) or "",
+        "id": str(obj)
+    }
+
+    members = None
+
+    if typ == gs.object_types["Block"]:
+
+        data["block"] = rs.BlockInstanceName(obj)
+        data["xform"] = bl.get_matrix(rs.BlockInstanceXform(obj))
+
+        members = model.get_block_members(obj, layer)
+
+    elif typ == gs.object_types["Point"]:
+
+        data["points"] = [rs.PointCoordinates(obj)]
+
+    elif typ == gs.object_types["Surface"]:
+
+        data["points"] = rs.SurfacePoints(obj)
+
+        members = [(0, layer, data["name"], model.get_object_points(obj, layer), 0)]
+
+    elif rs.IsLine(obj):
+
+        data["points"] = [rs.CurveStartPoint(obj), rs.CurveEndPoint(obj)]
+
+    elif rs.IsPolyline(obj):
+
+        data["points"] = rs.PolylineVertices(obj)
+
+    elif rs.IsArc(obj):
+
+        t0, t1 = rs.CurveDomain(obj)
+
+        data["points"] = [rs.CurveStartPoint(obj), rs.EvaluateCurve(obj, (t0 + t1) / 2.0), rs.CurveEndPoint(obj)]
+        data["arc"] = True
+
+    else:
+
+        # the model input holds the curve as a polyline through the points of its elements
+        data["points"] = model.get_object_points(obj, layer)
+
+        members = [(0, layer, data["name"], data["points"], 0)]
+
+    if "points" in data:
+
+        data["points"] = [[pt[0], pt[1], pt[2]] for pt in data["points"]]
+
+    if members is not None:
+
+        data["members"] = [[member, member_layer.name, name, [[pt[0], pt[1], pt[2]] for pt in points], no_offset]
+                           for member, member_layer, name, points, no_offset in members]
+
+    return data
+
+
+
+class DaemonClient():
+
+    """Rhino side of the daemon: sends the document once, then the changes collected by live sync (see livesync.LiveSync, this client
+    being both target and write function). Objects are described along with the points their elements are built from where needed (see
+    describe_object).
+    """
+
+
+    def __init__(self, port = None):
+
+        """Constructor.
+        Parameters:
+          port = port of the daemon; gc.export_daemon_port if not set
+        """
+
+        self.port = port
+
+        self.changes = []
+
+
+    def request(self, request):
+
+        """Sends a request and returns the response; errors reported by the daemon are raised."""
+
+        response = send([request], self.port)[0]
+
+        if not response.get("ok"):
+
+            raise Exception("Giraffe export daemon: " + response.get("error", ""))
+
+        return response
+
+
+    def load(self):
+
+        """Sends the structural objects of the Rhino document to the daemon, which builds and exports them.
+        Returns:
+          self
+        """
+
+        import Giraffe
+
+        model = Giraffe.StructuralModel("structure")
+
+        objects = []
+
+        for layer in Giraffe.GiraffeLayer.get_all_structural():
+
+            for obj in layer.get_allowed_geometry():
+
+                objects.append(describe_object(obj, model))
+
+        document = {"unit_system": Giraffe.rs.UnitSystem(), "layers": Giraffe.rs.LayerNames(), "objects": objects}
+
+        self.request({"op": "load", "path": Giraffe.rs.DocumentPath(), "document": document})
+
+        return self
+
+
+    def apply_changes(self, changes):
+
+        """Collects changes (see StructuralModel.apply_changes), sent on the next write."""
+
+        import Giraffe
+
+        # block definitions are read again for every batch of changes, they may have been edited
+        model = Giraffe.StructuralModel("structure")
+
+        for kind, obj in changes:
+
+            change = {"kind": kind, "id": str(obj)}
+
+            if Giraffe.rs.IsObject(obj):
+
+                change["object"] = describe_object(obj, model)
+
+            self.changes.append(change)
+
+        return self
+
+
+    def __call__(self):
+
+        """Sends the changes collected to the daemon, which applies them and rewrites the export."""
+
+        changes, self.changes = self.changes, []
+
+        return self.request({"op": "changes", "changes": changes})
+
+
+
+def main(argv = None):
+
+    """Command line entry point.
+    Returns:
+      exit code
+    """
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description = "Keeps Giraffe models in memory and exports them on request.")
+    parser.add_argument("input", nargs = "?", help = "model input built on startup (*.giraffe.json)")
+    parser.add_argument("--port", type = int, default = gc.export_daemon_port, help = "local port to listen on")
+    parser.add_argument("--name", default = "structure", help = "model name written to the export header")
+
+    args = parser.parse_args(argv)
+
+    daemon = Daemon(args.name)
+
+    if args.input:
+
+        response = daemon.handle_line(json.dumps({"op": "load", "path": os.path.abspath(args.input)}))
+
+        if not response["ok"]:
+
+            sys.stderr.write(response["error"])
+
+            return 1
+
+    def ready(daemon):
+
+        sys.stdout.write("Giraffe export daemon listening on port " + str(daemon.port) + "\n")
+        sys.stdout.flush()
+
+    daemon.serve(args.port, ready = ready)
+
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
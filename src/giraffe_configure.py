@@ -1,2 +1,80 @@
 tolerance = 0.1
-operating_system = "mac"
\ No newline at end of file
+operating_system = "mac"
+
+# re-export automatically whenever structural input changes; run the script again to stop
+live_sync = False
+live_sync_delay = 0.5
+
+# live sync through a running export daemon (python exportdaemon.py) listening on export_daemon_port: the daemon keeps the model in
+# memory and rebuilds only what changed
+export_daemon = False
+export_daemon_port = 47015
+
+# keep element numbers between runs (stored next to the output file)
+stable_numbering = False
+
+# also write the built model as _system.gmb (see binarymodel), e.g. for fast reloading by other tools
+binary_export = False
+
+# write the export on a background thread once the model is built, so that Rhino returns immediately; a new export supersedes
+# the one still being written
+background_export = False
+
+# write coordinates in meters (conversion factor applied) instead of as multiples of #cf, without empty property fields; smaller
+# files that sofimsha reads faster, with the same values
+compact_export = False
+
+# write runs of nodes and elements with consecutive numbers and constant coordinate increments (e.g. regular grids) as CADINP loops;
+# smaller files that sofimsha reads faster, defining the same elements with the same values
+loop_export = False
+
+# number elements on layers of group g from g * gdiv (e.g. beams of group 2 from 2000, as SOFiSTiK derives groups from numbers), so that
+# every group is numbered independently of the others; groups running out of numbers are reported in the export
+group_blocks = False
+
+# divide polylines and curves on beam, truss and cable layers into line elements: polylines at their vertices, curves so that the
+# elements are within curve_tolerance (in meters) of the curve; a single element from start to end if False. 'seg n' in the property of
+# a layer (e.g. 'input::cables::1 [seg 20 ncs 2]') divides every line, polyline segment or curve on the layer into n elements, either way
+divide_curves = False
+curve_tolerance = 0.01
+
+# 'mesh nxm' in the property of a quad layer (e.g. 'input::quads::1 [mesh 10x20 ncs 1]') meshes every surface on the layer into a grid
+# of n by m quads instead of a single quad
+
+# split beams, trusses and cables where they cross (within tolerance) so that they share a node; applied when the model is built
+split_intersections = False
+
+# split beams, trusses and cables at nodes on them (within tolerance): user-specified nodes and the ends of other lines (T-junctions)
+split_at_nodes = False
+
+# renumber nodes and elements without a number set in Rhino in Reverse Cuthill-McKee order, reducing the bandwidth of the stiffness
+# matrix for the solver; numbers stay within their group (and block), bandwidth and profile before and after are noted in the export
+bandwidth_renumbering = False
+
+# close the gaps between the numbers of nodes and elements without a number set in Rhino, e.g. left by deleted objects or numbering
+# conflicts: numbers become contiguous per group (and block) in their previous order, strict numbers are kept; the numbers changed are
+# written to _system.renumber.csv (list, grp, old, new) to remap load definitions referring to them
+compact_numbering = False
+
+# export only part of the model: objects on the layer partial_layer and its sublayers (e.g. "input::trusses::2"), on layers of groups
+# partial_groups (e.g. [100, 199]) and/or selected objects (partial_selection); the rest of the model is taken from the last full export
+# (_system.gmb), the part is written to _system.partial.dat or merged into _system.dat (partial_merge)
+partial_layer = None
+partial_groups = None
+partial_selection = False
+partial_merge = False
+
+# formats written next to the export in the same pass, besides the sofimsha input: "jsonl" (_system.jsonl), "csv" (_system.csv),
+# "takeoff" (_system.takeoff.csv, lengths, areas and weights per group and property); see writers
+export_formats = []
+
+# keep elements in a SQLite file next to the export (_system.*.sqlite, removed once written) instead of memory while building very large models; requires sqlite3, not supported by live sync
+out_of_core = False
+
+# SOFiSTiK input file next to the Rhino model defining the sections and materials properties refer to (e.g. "model.dat");
+# references (e.g. ncs 5, mno 1) are validated during export if the file exists; not validated if None
+catalog_file = None
+
+# expand block instances on structural layers into the elements of the objects of their definition; the instance name sets group and
+# number offsets (e.g. "grp 10 no 1000"), see blocks
+expand_blocks = False
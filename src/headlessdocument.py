@@ -0,0 +1,511 @@
+##
+# HeadlessDocument module.
+# In-memory document implementing the part of the rhinoscriptsyntax API used by Giraffe, so that models can be built and exported
+# outside of Rhino (batch exports, tests). Documents are read from json model inputs:
+#
+# {
+#   "unit_system": 4,
+#   "objects": [
+#     { "layer": "input::nodes", "type": "Point", "name": "1 [fix pp]", "points": [[0, 0, 0]] },
+#     { "layer": "input::beams::1 [ncs 1] {columns}", "type": "Curve", "points": [[0, 0, 0], [0, 0, 3]] },
+#     { "layer": "input::quads", "type": "Surface", "points": [[0, 0, 0], [0, 1, 0], [1, 0, 0], [1, 1, 0]] },
+#     { "layer": "input::beams", "type": "Block", "block": "frame", "xform": [[1, 0, 0, 5], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]] }
+#   ],
+#   "blocks": {
+#     "frame": [
+#       { "layer": "default", "type": "Curve", "points": [[0, 0, 0], [0, 0, 3]] }
+#     ]
+#   }
+# }
+#
+# - unit_system = Rhino unit system code (2 mm, 3 cm, 4 m, 8 in, 9 ft); meters if not set
+# - type = object type name as in giraffe_setup.object_types
+# - points = point coordinates, curve points from start to end, or surface control points in the order returned by rs.SurfacePoints;
+#   curves with two points are lines, curves with more points polylines through them; surfaces are bilinear
+# - arc = true for a circular arc through the three points of a curve: start, any point on the arc, end (optional)
+# - selected = true for objects selected in the document (optional)
+# - id = object id, e.g. the Guid of the object in Rhino (optional)
+# - block, xform = block definition and 4x4 transformation matrix of a block instance (identity if not set); instances have no points
+# - blocks = block definitions by name, objects in definition coordinates; they are not part of the document (e.g. not on their layers)
+# The export is written next to the input file, the same way it is written next to the Rhino model.
+##
+
+import json
+import math
+import os
+
+import giraffe_setup as gs
+
+
+class HeadlessDocument():
+
+
+    def __init__(self, path, unit_system = 4):
+
+        """Constructor.
+        Parameters:
+          path = path of the model input; exports are written to its directory
+          unit_system = Rhino unit system code
+        """
+
+        self.path = os.path.abspath(path)
+        self.unit_system = unit_system
+
+        # layer names in order of creation, objects by id in order of creation
+        self.layers = []
+        self.locked = set()
+        self.current_layer = None
+        self.objects = {}
+        self.order = []
+        self.selected = []
+
+        # object ids of block definitions by name
+        self.blocks = {}
+
+        self.counter = 0
+
+
+    @classmethod
+    def load(self, path):
+
+        """Reads a json model input.
+        Returns:
+          HeadlessDocument
+        """
+
+        f = open(path, "r")
+        data = json.load(f)
+        f.close()
+
+        return HeadlessDocument.from_data(data, path)
+
+
+    @classmethod
+    def from_data(self, data, path):
+
+        """Creates a document from the contents of a json model input.
+        Parameters:
+          data = model input as read from json
+          path = path of the model input; exports are written to its directory
+        Returns:
+          HeadlessDocument
+        """
+
+        doc = HeadlessDocument(path, data.get("unit_system", 4))
+
+        for layer in data.get("layers", []):
+
+            doc.AddLayer(layer)
+
+        for name in data.get("blocks", {}):
+
+            doc.add_block(name, [doc.load_object(obj) for obj in data["blocks"][name]])
+
+        for obj in data.get("objects", []):
+
+            added = doc.load_object(obj)
+
+            if obj.get("selected"):
+
+                doc.selected.append(added)
+
+        return doc
+
+
+    def load_object(self, obj):
+
+        """Adds an object read from a json model input.
+        Returns:
+          object id
+        """
+
+        if obj["type"] == "Block":
+
+            return self.add_block_instance(obj["layer"], obj["block"], obj.get("xform"), obj.get("name", ""), obj.get("id"))
+
+        return self.add_object(gs.object_types[obj["type"]], obj["layer"], obj["points"], obj.get("name", ""), obj.get("arc", False), obj.get("id"))
+
+
+    def add_block(self, name, objects):
+
+        """Adds a block definition from objects already added; they are taken out of the document."""
+
+        for obj in objects:
+
+            self.order.remove(obj)
+
+        self.blocks[name] = objects
+
+
+    def add_block_instance(self, layer, block, xform = None, name = "", guid = None):
+
+        """Adds a block instance to a layer.
+        Parameters:
+          layer = full layer name
+          block = block definition name
+          xform = rows of the 4x4 transformation matrix; identity if not set
+          name = object name
+          guid = object id; numbered by the document if not set
+        Returns:
+          object id
+        """
+
+        obj = self.add_object(gs.object_types["Block"], layer, [], name, guid = guid)
+
+        self.objects[obj]["block"] = block
+        self.objects[obj]["xform"] = xform or [[float(i == j) for j in range(4)] for i in range(4)]
+
+        return obj
+
+
+    def add_object(self, typ, layer, points, name = "", arc = False, guid = None):
+
+        """Adds an object to a layer, creating the layer if needed.
+        Parameters:
+          typ = object type code (see giraffe_setup.object_types)
+          layer = full layer name
+          points = list of coordinate triples
+          name = object name
+          arc = True for a circular arc through three points (start, point on the arc, end)
+          guid = object id (e.g. the Guid of the object in Rhino); numbered by the document if not set
+        Returns:
+          object id
+        """
+
+        self.AddLayer(layer)
+
+        self.counter += 1
+
+        obj = guid or ("obj-" + str(self.counter))
+
+        self.objects[obj] = {
+            "type": typ,
+            "layer": layer,
+            "name": name,
+            "points": [[float(c) for c in pt] for pt in points],
+            "arc": arc
+        }
+
+        self.order.append(obj)
+
+        return obj
+
+
+    def get_arc(self, obj):
+
+        """Returns (center, radius, first axis, second axis, sweep angle) of an arc object; the axes span the plane of the arc, the first
+        pointing to the start point.
+        """
+
+        p0, p1, p2 = self.objects[obj]["points"]
+
+        def sub(a, b):
+
+            return [a[k] - b[k] for k in range(3)]
+
+        def dot(a, b):
+
+            return sum([a[k] * b[k] for k in range(3)])
+
+        def cross(a, b):
+
+            return [a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]]
+
+        u = sub(p1, p0)
+        v = sub(p2, p0)
+        w = cross(u, v)
+
+        ww = dot(w, w)
+
+        a = cross(v, w)
+        b = cross(w, u)
+
+        center = [p0[k] + (dot(u, u) * a[k] + dot(v, v) * b[k]) / (2 * ww) for k in range(3)]
+
+        radius = dot(sub(p0, center), sub(p0, center)) ** 0.5
+
+        e1 = [c / radius for c in sub(p0, center)]
+        e2 = [c / ww ** 0.5 for c in cross(w, e1)]
+
+        r = sub(p2, center)
+
+        sweep = math.atan2(dot(r, e2), dot(r, e1)) % (2 * math.pi)
+
+        return center, radius, e1, e2, sweep
+
+
+    def get_polyline_point(self, obj, t):
+
+        """Returns point at parameter t of a polyline object; vertex i is at t = i."""
+
+        points = self.objects[obj]["points"]
+
+        i = min(int(math.floor(t)), len(points) - 2)
+
+        return [points[i][k] + (points[i + 1][k] - points[i][k]) * (t - i) for k in range(3)]
+
+
+    # rhinoscriptsyntax subset, names as in rhinoscriptsyntax
+
+    def DocumentPath(self):
+
+        return self.path
+
+
+    def DocumentName(self):
+
+        return os.path.basename(self.path)
+
+
+    def UnitSystem(self):
+
+        return self.unit_system
+
+
+    def LayerNames(self):
+
+        return list(self.layers)
+
+
+    def IsLayer(self, name):
+
+        return name in self.layers
+
+
+    def AddLayer(self, name, color = None, visible = True, locked = False, parent = None):
+
+        """Adds layer and its ancestors. Like rs.AddLayer, name is relative to parent if a parent is given."""
+
+        if parent:
+
+            name = parent + "::" + name
+
+        path = name.split("::")
+
+        for i in range(len(path)):
+
+            ancestor = "::".join(path[:i + 1])
+
+            if ancestor not in self.layers:
+
+                self.layers.append(ancestor)
+
+        return name
+
+
+    def LayerColor(self, name, color = None):
+
+        return color
+
+
+    def LayerLocked(self, name, locked = None):
+
+        if locked is None:
+
+            return name in self.locked
+
+        if locked:
+
+            self.locked.add(name)
+
+        else:
+
+            self.locked.discard(name)
+
+        return locked
+
+
+    def CurrentLayer(self, name = None):
+
+        if name is not None:
+
+            self.AddLayer(name)
+            self.current_layer = name
+
+        return self.current_layer
+
+
+    def IsObject(self, obj):
+
+        return obj in self.objects
+
+
+    def ObjectsByLayer(self, name):
+
+        return [obj for obj in self.order if self.objects[obj]["layer"] == name]
+
+
+    def ObjectLayer(self, obj):
+
+        return self.objects[obj]["layer"]
+
+
+    def ObjectType(self, obj):
+
+        return self.objects[obj]["type"]
+
+
+    def ObjectName(self, obj):
+
+        return self.objects[obj]["name"]
+
+
+    def DeleteObject(self, obj):
+
+        if obj not in self.objects:
+
+            return False
+
+        del self.objects[obj]
+        self.order.remove(obj)
+
+        if obj in self.selected:
+
+            self.selected.remove(obj)
+
+        return True
+
+
+    def SelectedObjects(self):
+
+        return list(self.selected)
+
+
+    def PointCoordinates(self, obj):
+
+        return self.objects[obj]["points"][0]
+
+
+    def CurveStartPoint(self, obj):
+
+        return self.objects[obj]["points"][0]
+
+
+    def CurveEndPoint(self, obj):
+
+        return self.objects[obj]["points"][-1]
+
+
+    def IsLine(self, obj):
+
+        return (len(self.objects[obj]["points"]) == 2) and not self.objects[obj]["arc"]
+
+
+    def IsArc(self, obj):
+
+        return self.objects[obj]["arc"]
+
+
+    def IsPolyline(self, obj):
+
+        return (len(self.objects[obj]["points"]) > 2) and not self.objects[obj]["arc"]
+
+
+    def PolylineVertices(self, obj):
+
+        return self.objects[obj]["points"]
+
+
+    def CurveDomain(self, obj):
+
+        if self.objects[obj]["arc"]:
+
+            return [0.0, 1.0]
+
+        return [0.0, float(len(self.objects[obj]["points"]) - 1)]
+
+
+    def EvaluateCurve(self, obj, t):
+
+        if not self.objects[obj]["arc"]:
+
+            return self.get_polyline_point(obj, t)
+
+        center, radius, e1, e2, sweep = self.get_arc(obj)
+
+        angle = t * sweep
+
+        return [center[k] + radius * (math.cos(angle) * e1[k] + math.sin(angle) * e2[k]) for k in range(3)]
+
+
+    def DivideCurve(self, obj, segments, create_points = False, return_points = True):
+
+        if self.objects[obj]["arc"]:
+
+            return [self.EvaluateCurve(obj, i / float(segments)) for i in range(segments + 1)]
+
+        # equal lengths along the polyline
+        points = self.objects[obj]["points"]
+
+        lengths = [sum([(b[k] - a[k]) ** 2 for k in range(3)]) ** 0.5 for a, b in zip(points[:-1], points[1:])]
+
+        divided = []
+
+        for i in range(segments + 1):
+
+            target = sum(lengths) * i / float(segments)
+
+            j = 0
+
+            while (j < len(lengths) - 1) and (target > lengths[j]):
+
+                target -= lengths[j]
+                j += 1
+
+            divided.append(self.get_polyline_point(obj, j + (target / lengths[j] if lengths[j] else 0.0)))
+
+        return divided
+
+
+    def SurfacePoints(self, obj):
+
+        return self.objects[obj]["points"]
+
+
+    def SurfaceDomain(self, obj, direction):
+
+        return [0.0, 1.0]
+
+
+    def EvaluateSurface(self, obj, u, v):
+
+        # bilinear surface through the four points
+        p0, p1, p2, p3 = self.objects[obj]["points"]
+
+        return [(1 - u) * (1 - v) * p0[k] + (1 - u) * v * p1[k] + u * (1 - v) * p2[k] + u * v * p3[k] for k in range(3)]
+
+
+    def BlockInstanceName(self, obj):
+
+        return self.objects[obj]["block"]
+
+
+    def BlockInstanceXform(self, obj):
+
+        return Transform(self.objects[obj]["xform"])
+
+
+    def BlockObjects(self, name):
+
+        return list(self.blocks[name])
+
+
+    def AddPoint(self, point):
+
+        return self.add_object(gs.object_types["Point"], self.current_layer, [point])
+
+
+
+class Transform():
+
+    """Transformation matrix indexed like Rhino.Geometry.Transform (e.g. xform[0, 3])."""
+
+
+    def __init__(self, rows):
+
+        self.rows = rows
+
+
+    def __getitem__(self, index):
+
+        return self.rows[index[0]][index[1]]
@@ -0,0 +1,468 @@
+##
+# LiveSync module.
+# Keeps an exported model in sync with the Rhino document while the user keeps on modelling.
+# - document events (add, delete, replace, modify attributes) come from an EventSource
+# - events outside of the structural input layers are ignored
+# - events are coalesced per object and handed to the sync target once the document has been quiet for a while (debounce)
+# The Rhino event source is only one implementation; a RecordedEventSource replays a stored event stream outside of Rhino.
+##
+
+import time
+
+
+ADD = "add"
+DELETE = "delete"
+REPLACE = "replace"
+MODIFY = "modify"
+IDLE = "idle"
+
+# coalesced change kinds passed on to the sync target
+UPDATE = "update"
+
+
+class DocumentEvent():
+
+
+    def __init__(self, kind, guid, layer = "", old_layer = "", time = 0.0):
+
+        """Constructor.
+        Parameters:
+          kind = event kind (add, delete, replace, modify)
+          guid = Guid of the object concerned
+          layer = full layer name of the object after the event
+          old_layer = full layer name of the object before the event (attribute modifications only)
+          time = time of the event in seconds
+        """
+
+        self.kind = kind
+        self.guid = guid
+        self.layer = layer
+        self.old_layer = old_layer
+        self.time = time
+
+
+    def to_string(self):
+
+        """Returns a single line representation as used in recorded event streams."""
+
+        return str(self.time) + " " + self.kind + " " + str(self.guid) + " " + self.layer + " | " + self.old_layer
+
+
+    @classmethod
+    def from_string(self, s):
+
+        """Parses a single line of a recorded event stream (see to_string). Idle ticks are written as '<time> idle'."""
+
+        parts = s.strip().split(" ", 3)
+
+        t = float(parts[0])
+
+        if parts[1] == IDLE:
+
+            return DocumentEvent(IDLE, None, time = t)
+
+        layers = (parts[3] if len(parts) > 3 else "").split("|")
+
+        layer = layers[0].strip()
+        old_layer = layers[1].strip() if len(layers) > 1 else ""
+
+        return DocumentEvent(parts[1], parts[2], layer, old_layer, t)
+
+
+
+class EventSource():
+
+
+    def __init__(self):
+
+        """Constructor."""
+
+        self.listeners = []
+        self.idle_handlers = []
+
+
+    def subscribe(self, listener, idle_handler = None):
+
+        """Registers a listener called with every DocumentEvent and an optional handler called with the current time when the document is idle.
+        Returns:
+          self
+        """
+
+        self.listeners.append(listener)
+
+        if idle_handler:
+
+            self.idle_handlers.append(idle_handler)
+
+        return self
+
+
+    def unsubscribe(self, listener, idle_handler = None):
+
+        """Removes a listener (and idle handler) registered through subscribe.
+        Returns:
+          self
+        """
+
+        if listener in self.listeners:
+
+            self.listeners.remove(listener)
+
+        if idle_handler in self.idle_handlers:
+
+            self.idle_handlers.remove(idle_handler)
+
+        return self
+
+
+    def emit(self, event):
+
+        """Passes an event on to all listeners."""
+
+        for listener in self.listeners:
+
+            listener(event)
+
+
+    def idle(self, t):
+
+        """Notifies all idle handlers."""
+
+        for handler in self.idle_handlers:
+
+            handler(t)
+
+
+    def start(self):
+
+        """Starts listening to the document. Implemented by subclasses."""
+
+        return self
+
+
+    def stop(self):
+
+        """Stops listening to the document. Implemented by subclasses."""
+
+        return self
+
+
+
+class RecordedEventSource(EventSource):
+
+
+    def __init__(self, events):
+
+        """Constructor.
+        Parameters:
+          events = list of DocumentEvent objects, idle ticks included, in chronological order
+        """
+
+        EventSource.__init__(self)
+
+        self.events = events
+
+
+    @classmethod
+    def from_file(self, path):
+
+        """Reads a recorded event stream, one event per line. Empty lines and lines starting with '$' are skipped."""
+
+        events = []
+
+        f = open(path, "r")
+
+        for line in f:
+
+            if line.strip() == "" or line.strip().startswith("$"):
+
+                continue
+
+            events.append(DocumentEvent.from_string(line))
+
+        f.close()
+
+        return RecordedEventSource(events)
+
+
+    def start(self):
+
+        """Replays all recorded events.
+        Returns:
+          self
+        """
+
+        for event in self.events:
+
+            if event.kind == IDLE:
+
+                self.idle(event.time)
+
+            else:
+
+                self.emit(event)
+
+        return self
+
+
+
+class RhinoEventSource(EventSource):
+
+
+    def __init__(self):
+
+        """Constructor. Rhino is only imported once the source is started."""
+
+        EventSource.__init__(self)
+
+        self.handlers = []
+
+
+    def get_layer_name(self, rhino_object):
+
+        """Returns full layer name of a Rhino object."""
+
+        return self.get_layer_name_from_attributes(rhino_object.Document, rhino_object.Attributes)
+
+
+    def get_layer_name_from_attributes(self, doc, attributes):
+
+        """Returns full layer name from object attributes."""
+
+        return doc.Layers[attributes.LayerIndex].FullPath
+
+
+    def on_add(self, sender, e):
+
+        self.emit(DocumentEvent(ADD, e.ObjectId, self.get_layer_name(e.TheObject), "", time.time()))
+
+
+    def on_delete(self, sender, e):
+
+        self.emit(DocumentEvent(DELETE, e.ObjectId, self.get_layer_name(e.TheObject), "", time.time()))
+
+
+    def on_replace(self, sender, e):
+
+        self.emit(DocumentEvent(REPLACE, e.ObjectId, self.get_layer_name(e.NewRhinoObject), "", time.time()))
+
+
+    def on_modify(self, sender, e):
+
+        doc = e.Document
+
+        layer = self.get_layer_name_from_attributes(doc, e.NewAttributes)
+        old_layer = self.get_layer_name_from_attributes(doc, e.OldAttributes)
+
+        self.emit(DocumentEvent(MODIFY, e.RhinoObject.Id, layer, old_layer, time.time()))
+
+
+    def on_idle(self, sender, e):
+
+        self.idle(time.time())
+
+
+    def start(self):
+
+        """Subscribes to Rhino document and application events.
+        Returns:
+          self
+        """
+
+        import Rhino
+
+        self.handlers = [
+            (Rhino.RhinoDoc.AddRhinoObject, self.on_add),
+            (Rhino.RhinoDoc.DeleteRhinoObject, self.on_delete),
+            (Rhino.RhinoDoc.ReplaceRhinoObject, self.on_replace),
+            (Rhino.RhinoDoc.ModifyObjectAttributes, self.on_modify),
+            (Rhino.RhinoApp.Idle, self.on_idle)
+        ]
+
+        for event, handler in self.handlers:
+
+            event += handler
+
+        return self
+
+
+    def stop(self):
+
+        """Unsubscribes from all Rhino events.
+        Returns:
+          self
+        """
+
+        for event, handler in self.handlers:
+
+            event -= handler
+
+        self.handlers = []
+
+        return self
+
+
+
+class LiveSync():
+
+
+    def __init__(self, source, target, write, delay = 0.5, prefix = "input::"):
+
+        """Constructor.
+        Parameters:
+          source = EventSource
+          target = object implementing apply_changes(changes), changes being a list of (kind, guid) tuples
+          write = function called after the changes have been applied (e.g. rewriting the export file)
+          delay = quiet time in seconds before pending changes are applied
+          prefix = layer prefix of relevant objects
+        """
+
+        self.source = source
+        self.target = target
+        self.write = write
+        self.delay = delay
+        self.prefix = prefix
+
+        self.pending = {}
+        self.order = []
+        self.deadline = None
+
+        self.exports = 0
+        self._errors = []
+
+
+    def start(self):
+
+        """Subscribes to the event source and starts it.
+        Returns:
+          self
+        """
+
+        self.source.subscribe(self.on_event, self.on_idle)
+        self.source.start()
+
+        return self
+
+
+    def stop(self):
+
+        """Stops the event source and unsubscribes.
+        Returns:
+          self
+        """
+
+        self.source.stop()
+        self.source.unsubscribe(self.on_event, self.on_idle)
+
+        return self
+
+
+    def is_relevant(self, event):
+
+        """Returns True if the object is, or was, on a structural input layer."""
+
+        return event.layer.startswith(self.prefix) or event.old_layer.startswith(self.prefix)
+
+
+    def coalesce(self, previous, kind):
+
+        """Returns the pending change resulting from a new event following a pending change; None if they cancel out.
+        Parameters:
+          previous = pending change kind (add, delete, update) or None
+          kind = event kind
+        """
+
+        if kind == DELETE:
+
+            # an object added and deleted within the same batch never reaches the model
+            return None if previous == ADD else DELETE
+
+        if kind == ADD:
+
+            # deleted and added again (e.g. undo) -> rebuild
+            return ADD if previous is None else UPDATE
+
+        # replace and modify
+        if previous == ADD:
+
+            return ADD
+
+        return UPDATE
+
+
+    def on_event(self, event):
+
+        """Collects a document event."""
+
+        if not self.is_relevant(event):
+
+            return
+
+        previous = self.pending.get(event.guid)
+
+        if (previous is None) and (event.guid not in self.pending):
+
+            self.order.append(event.guid)
+
+        self.pending[event.guid] = self.coalesce(previous, event.kind)
+
+        self.deadline = event.time + self.delay
+
+
+    def on_idle(self, t):
+
+        """Applies pending changes if the document has been quiet long enough."""
+
+        if (self.deadline is not None) and (t >= self.deadline):
+
+            self.flush()
+
+
+    def get_changes(self):
+
+        """Returns pending changes as a list of (kind, guid) tuples in the order the objects were first touched."""
+
+        changes = []
+
+        for guid in self.order:
+
+            kind = self.pending[guid]
+
+            if kind is not None:
+
+                changes.append((kind, guid))
+
+        return changes
+
+
+    def flush(self):
+
+        """Applies pending changes to the target and writes the export. Failures are collected and reported on the command line; live
+        sync keeps running.
+        Returns:
+          self
+        """
+
+        changes = self.get_changes()
+
+        self.pending = {}
+        self.order = []
+        self.deadline = None
+
+        if changes == []:
+
+            return self
+
+        try:
+
+            self.target.apply_changes(changes)
+            self.write()
+            self.exports += 1
+
+        except Exception as e:
+
+            self._errors.append("Live sync failed: " + str(e))
+
+            print("Giraffe: " + self._errors[-1])
+
+        return self
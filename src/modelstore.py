@@ -0,0 +1,307 @@
+##
+# ModelStore module.
+# Out-of-core storage for element lists: elements are kept in a local SQLite file instead of Python lists, so that very large models
+# do not have to fit in memory. One table holds all element lists; indexes support the lookups done while building the model:
+# - (list, grp, no) for numbering
+# - (list, cx, cy, cz) grid cell for node dedupe within tolerance
+# - (list, topo) topology key for element dedupe
+# - (list, layer) for exports grouped by layer
+# Exports read the lists back in insertion order through cursors, in batches.
+# sqlite3 is not available in every Python distribution (e.g. IronPython), it is only imported when a store is created.
+##
+
+import math
+
+
+COLUMNS = [
+    ("list", "TEXT"),
+    ("typ", "TEXT"),
+    ("no", "INTEGER"),
+    ("grp", "INTEGER"),
+    ("strict", "INTEGER"),
+    ("x", "REAL"),
+    ("y", "REAL"),
+    ("z", "REAL"),
+    ("cx", "INTEGER"),
+    ("cy", "INTEGER"),
+    ("cz", "INTEGER"),
+    ("dx", "REAL"),
+    ("dy", "REAL"),
+    ("dz", "REAL"),
+    ("n", "INTEGER"),
+    ("n1", "INTEGER"),
+    ("n2", "INTEGER"),
+    ("n3", "INTEGER"),
+    ("n4", "INTEGER"),
+    ("topo", "TEXT"),
+    ("prop", "TEXT"),
+    ("name", "TEXT"),
+    ("layer", "TEXT"),
+    ("geo", "TEXT"),
+    ("marker", "TEXT")
+]
+
+NODE_REFERENCES = ["n", "n1", "n2", "n3", "n4"]
+
+
+class SQLiteStore():
+
+
+    def __init__(self, path = ":memory:", cell_size = 0.1, batch_size = 1000, background = False):
+
+        """Constructor. The store only lives as long as the build: it is kept in a new file named after the path (e.g. _system.sqlite
+        gives _system.k2x9.sqlite), removed on close. Stores of earlier exports still being written in the background are not touched.
+        Parameters:
+          path = SQLite file path the store file is named after; ":memory:" keeps the store in memory
+          cell_size = edge length of the grid cells used for node dedupe, at least the dedupe tolerance
+          batch_size = number of rows fetched at a time when iterating
+          background = True if the store is handed off to a background writer thread once built (see backgroundexport)
+        """
+
+        import os
+        import sqlite3
+        import tempfile
+
+        if path != ":memory:":
+
+            name, extension = os.path.splitext(os.path.basename(path))
+
+            handle, path = tempfile.mkstemp(extension, name + ".", os.path.dirname(os.path.abspath(path)))
+
+            os.close(handle)
+
+        self.path = path
+        self.cell_size = cell_size
+        self.batch_size = batch_size
+
+        # handed off, not shared: only one thread uses the connection at a time
+        self.connection = sqlite3.connect(path, check_same_thread = not background)
+        self.connection.row_factory = sqlite3.Row
+
+        # scratch data: no journal, no syncing to disk
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+
+        # row ids identify stored elements (see Giraffe.get_identity), ids of removed rows are not reused
+        self.connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY AUTOINCREMENT, " + ", ".join([name + " " + typ for name, typ in COLUMNS]) + ")")
+        self.connection.execute("CREATE INDEX items_number ON items (list, grp, no)")
+        self.connection.execute("CREATE INDEX items_cell ON items (list, cx, cy, cz)")
+        self.connection.execute("CREATE INDEX items_topo ON items (list, topo)")
+        self.connection.execute("CREATE INDEX items_geo ON items (list, geo)")
+        self.connection.execute("CREATE INDEX items_layer ON items (list, layer, id)")
+
+        self.insert_query = "INSERT INTO items (" + ", ".join([name for name, typ in COLUMNS]) + ") VALUES (" + ", ".join(["?"] * len(COLUMNS)) + ")"
+
+
+    def get_cell(self, x, y, z):
+
+        """Returns grid cell of a point."""
+
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)), int(math.floor(z / self.cell_size)))
+
+
+    def insert(self, list_name, record):
+
+        """Adds a record to a list.
+        Parameters:
+          list_name = element list name
+          record = dictionary of column values; missing columns are NULL, grid cells are computed from x, y, z
+        Returns:
+          id of the new row
+        """
+
+        record = dict(record)
+        record["list"] = list_name
+
+        if record.get("x") is not None:
+
+            record["cx"], record["cy"], record["cz"] = self.get_cell(record["x"], record["y"], record["z"])
+
+        cursor = self.connection.execute(self.insert_query, [record.get(name) for name, typ in COLUMNS])
+
+        return cursor.lastrowid
+
+
+    def set_number(self, row_id, no):
+
+        """Changes the number of a row."""
+
+        self.connection.execute("UPDATE items SET no = ? WHERE id = ?", (no, row_id))
+
+
+    def replace_references(self, list_name, replacements):
+
+        """Points the rows of a list referencing replaced nodes to their replacements, in a single pass; topology keys follow.
+        Parameters:
+          list_name = element list name
+          replacements = dictionary of new node row ids by old node row id
+        """
+
+        updates = []
+
+        for row in self.connection.execute("SELECT id, topo, " + ", ".join(NODE_REFERENCES) + " FROM items WHERE list = ?", (list_name,)):
+
+            refs = [row[ref] for ref in NODE_REFERENCES]
+
+            if not [ref for ref in refs if ref in replacements]:
+
+                continue
+
+            # topology keys start with the referenced nodes (see StoredElementList.get_topology_key)
+            used = [ref for ref in refs if ref is not None]
+            tokens = (row["topo"] or "").split()
+
+            topo = " ".join([str(replacements.get(ref, ref)) for ref in used] + tokens[len(used):])
+
+            updates.append([replacements.get(ref, ref) for ref in refs] + [topo, row["id"]])
+
+        self.connection.executemany("UPDATE items SET " + ", ".join([ref + " = ?" for ref in NODE_REFERENCES]) + ", topo = ? WHERE id = ?", updates)
+
+
+    def remove(self, row_id):
+
+        """Removes a row."""
+
+        self.connection.execute("DELETE FROM items WHERE id = ?", (row_id,))
+
+
+    def get(self, row_id):
+
+        """Returns row by id; None if it does not exist."""
+
+        return self.connection.execute("SELECT * FROM items WHERE id = ?", (row_id,)).fetchone()
+
+
+    def is_taken_number(self, list_name, no, grp = -1):
+
+        """Returns True if a number is taken in a given group of a list."""
+
+        return self.get_by_number(list_name, no, grp) is not None
+
+
+    def get_by_number(self, list_name, no, grp = -1):
+
+        """Returns first row of a list with a given number and group; None if there is none."""
+
+        return self.connection.execute("SELECT * FROM items WHERE list = ? AND grp = ? AND no = ? ORDER BY id LIMIT 1", (list_name, grp, no)).fetchone()
+
+
+    def get_near(self, list_name, x, y, z, tolerance):
+
+        """Returns rows of a list closer to a point than the tolerance, in insertion order."""
+
+        cx, cy, cz = self.get_cell(x, y, z)
+
+        reach = int(math.ceil(tolerance / self.cell_size))
+
+        rows = self.connection.execute(
+            "SELECT * FROM items WHERE list = ? AND cx BETWEEN ? AND ? AND cy BETWEEN ? AND ? AND cz BETWEEN ? AND ? ORDER BY id",
+            (list_name, cx - reach, cx + reach, cy - reach, cy + reach, cz - reach, cz + reach)
+        )
+
+        near = []
+
+        for row in rows:
+
+            if ((row["x"] - x) ** 2 + (row["y"] - y) ** 2 + (row["z"] - z) ** 2) ** 0.5 < tolerance:
+
+                near.append(row)
+
+        return near
+
+
+    def get_by_topology(self, list_name, topo):
+
+        """Returns first row of a list with a given topology key; None if there is none."""
+
+        return self.connection.execute("SELECT * FROM items WHERE list = ? AND topo = ? ORDER BY id LIMIT 1", (list_name, topo)).fetchone()
+
+
+    def get_by_geometry(self, list_name, geo):
+
+        """Returns rows of a list created from a given Guid (as string; None for elements without one)."""
+
+        if geo is None:
+
+            return self.connection.execute("SELECT * FROM items WHERE list = ? AND geo IS NULL ORDER BY id", (list_name,)).fetchall()
+
+        return self.connection.execute("SELECT * FROM items WHERE list = ? AND geo = ? ORDER BY id", (list_name, geo)).fetchall()
+
+
+    def count(self, list_name):
+
+        """Returns number of rows in a list."""
+
+        return self.connection.execute("SELECT COUNT(*) FROM items WHERE list = ?", (list_name,)).fetchone()[0]
+
+
+    def select(self, where, parameters):
+
+        """Yields rows matching a condition in insertion order. Referenced nodes are joined: their number and coordinates are available as
+        e.g. n1_no, n1_x, n1_y, n1_z. Rows are fetched in batches, so memory use does not depend on the number of rows.
+        """
+
+        columns = ["items.*"]
+        joins = []
+
+        for ref in NODE_REFERENCES:
+
+            columns += [ref + ".no AS " + ref + "_no", ref + ".x AS " + ref + "_x", ref + ".y AS " + ref + "_y", ref + ".z AS " + ref + "_z"]
+            joins.append("LEFT JOIN items AS " + ref + " ON " + ref + ".id = items." + ref)
+
+        cursor = self.connection.execute("SELECT " + ", ".join(columns) + " FROM items " + " ".join(joins) + " WHERE " + where + " ORDER BY items.id", parameters)
+
+        while True:
+
+            rows = cursor.fetchmany(self.batch_size)
+
+            if not rows:
+
+                break
+
+            for row in rows:
+
+                yield row
+
+
+    def iterate(self, list_name):
+
+        """Yields rows of a list in insertion order, with referenced nodes joined (see select)."""
+
+        return self.select("items.list = ?", (list_name,))
+
+
+    def iterate_layer(self, list_name, layer):
+
+        """Yields rows of a list on a given layer (None for rows without layer) in insertion order, with referenced nodes joined (see select)."""
+
+        return self.select("items.list = ? AND items.layer IS ?", (list_name, layer))
+
+
+    def get_layers(self, list_name):
+
+        """Returns layers of a list in order of first appearance; None stands for rows without layer."""
+
+        rows = self.connection.execute("SELECT layer, MIN(id) AS first FROM items WHERE list = ? GROUP BY layer ORDER BY first", (list_name,))
+
+        return [row["layer"] for row in rows]
+
+
+    def commit(self):
+
+        """Commits pending changes."""
+
+        self.connection.commit()
+
+
+    def close(self):
+
+        """Closes the store and removes its file."""
+
+        import os
+
+        self.connection.close()
+
+        if self.path != ":memory:":
+
+            os.remove(self.path)
@@ -0,0 +1,137 @@
+##
+# NumberMap module.
+# Remembers the number and group assigned to every element between runs, so that automatically numbered elements keep their numbers
+# when the model changes. Elements are identified by a key: the Rhino Guid, or the coordinates for nodes created by Giraffe.
+# The map is stored in a sidecar json file next to the export, one section per element list; json is only imported to read and write it.
+##
+
+
+class NumberMap():
+
+
+    def __init__(self, numbers = None):
+
+        """Constructor.
+        Parameters:
+          numbers = dictionary mapping keys to [no, grp] pairs
+        """
+
+        self._numbers = {}
+        self._reserved = set()
+
+        if numbers:
+
+            for key in numbers:
+
+                self.set(key, numbers[key][0], numbers[key][1])
+
+
+    def get(self, key, grp = -1):
+
+        """Returns number remembered for a key within a given group; -1 if none."""
+
+        if key in self._numbers:
+
+            no, previous_grp = self._numbers[key]
+
+            if previous_grp == grp:
+
+                return no
+
+        return -1
+
+
+    def set(self, key, no, grp = -1):
+
+        """Remembers number and group for a key.
+        Returns:
+          self
+        """
+
+        if key is None:
+
+            return self
+
+        if key in self._numbers:
+
+            self._reserved.discard((self._numbers[key][1], self._numbers[key][0]))
+
+        self._numbers[key] = (no, grp)
+        self._reserved.add((grp, no))
+
+        return self
+
+
+    def is_reserved(self, number, grp = -1):
+
+        """Returns True if a number is remembered for some key in a given group."""
+
+        return (grp, number) in self._reserved
+
+
+    def to_dict(self):
+
+        """Returns the map as a json-serializable dictionary."""
+
+        numbers = {}
+
+        for key in self._numbers:
+
+            numbers[key] = list(self._numbers[key])
+
+        return numbers
+
+
+    def __len__(self):
+
+        return len(self._numbers)
+
+
+
+def load(path):
+
+    """Reads number maps from a sidecar file.
+    Returns:
+      dictionary of NumberMap objects by element list name; empty if the file does not exist or cannot be read
+    """
+
+    import json
+
+    try:
+
+        f = open(path, "r")
+        data = json.load(f)
+        f.close()
+
+    except (IOError, OSError, ValueError):
+
+        return {}
+
+    maps = {}
+
+    for name in data:
+
+        maps[name] = NumberMap(data[name])
+
+    return maps
+
+
+def save(path, maps):
+
+    """Writes number maps to a sidecar file.
+    Parameters:
+      path = file path
+      maps = dictionary of NumberMap objects by element list name
+    """
+
+    import json
+
+    data = {}
+
+    for name in maps:
+
+        data[name] = maps[name].to_dict()
+
+    f = open(path, "w")
+    json.dump(data, f, sort_keys = True)
+    f.close()
@@ -0,0 +1,292 @@
+##
+# Query module.
+# Finds the nodes and elements of a built model by location and by attribute without scanning the element lists (see
+# StructuralModel.get_query):
+# - location: nodes are read from the node index of the model, also used for node dedupe (splitting.NodeIndex, kept up to date as
+#   nodes are added, see ElementList.get_node_index), elements from a uniform grid of their bounding boxes (the grid of the splitting
+#   module); box and radius queries only visit the cells the query covers, nearest node queries boxes around the point, each twice as
+#   large as the one before, until the box holds a node closer than its half size
+# - attributes: hash indexes by group (the group of the layer, as exported), property items (of the property of the layer merged with
+#   the property of the element, as exported, see rhinoinput.merge_props) and layer name
+# Element and attribute indexes are built on first use and describe the model at that time: a model changed afterwards needs a new
+# query (the model drops its query whenever objects are added or removed).
+##
+
+import rhinoinput as ri
+import splitting as sp
+
+
+def get_bounds(points):
+
+    """Returns (low, high) corners of the bounding box of points."""
+
+    return [min([p[k] for p in points]) for k in range(3)], [max([p[k] for p in points]) for k in range(3)]
+
+
+def get_point(node):
+
+    """Returns the coordinates of a node as a tuple."""
+
+    return (node.x, node.y, node.z)
+
+
+def get_cells(grid, low, high):
+
+    """Returns the item lists of the occupied cells of a grid covered by a box, looked up by index, or found among the occupied cells for
+    boxes covering more cells than are occupied.
+    """
+
+    first, last = grid.get_range(low, high)
+
+    count = (last[0] - first[0] + 1) * (last[1] - first[1] + 1) * (last[2] - first[2] + 1)
+
+    if count > len(grid.cells):
+
+        return [items for cell, items in grid.cells.items() if all([first[k] <= cell[k] <= last[k] for k in range(3)])]
+
+    cells = []
+
+    for i in range(first[0], last[0] + 1):
+
+        for j in range(first[1], last[1] + 1):
+
+            for k in range(first[2], last[2] + 1):
+
+                if (i, j, k) in grid.cells:
+
+                    cells.append(grid.cells[(i, j, k)])
+
+    return cells
+
+
+def get_items(prop):
+
+    """Returns the 'keyword value' items of a property, in lower case (e.g. ['ncs 1', 'ahin mymz'] for 'ncs 1 AHIN mymz')."""
+
+    tokens = prop.lower().split()
+
+    return [" ".join(tokens[i:i + 2]) for i in range(0, len(tokens), 2)]
+
+
+def is_inside(point, low, high):
+
+    """Returns True if a point is within a box, boundary included."""
+
+    return (low[0] <= point[0] <= high[0]) and (low[1] <= point[1] <= high[1]) and (low[2] <= point[2] <= high[2])
+
+
+
+class ModelQuery():
+
+
+    def __init__(self, model):
+
+        """Constructor.
+        Parameters:
+          model = built StructuralModel
+        """
+
+        self.model = model
+
+        self.node_grid = None
+        self.element_grid = None
+
+        # (first, last) indices of the occupied cells of the node index
+        self.node_range = None
+
+        # lists of elements by value, by index name ('grp', 'prop' for property items, 'layer')
+        self.indexes = None
+
+        # element list name by element id
+        self.lists = {}
+
+
+    def get_node_grid(self):
+
+        """Returns the node index of the model."""
+
+        if self.node_grid is None:
+
+            self.node_grid = self.model.nodes.get_node_index()
+
+        return self.node_grid
+
+
+    def get_element_grid(self):
+
+        """Returns the grid of the bounding boxes of the elements referencing nodes, built on first use."""
+
+        if self.element_grid is not None:
+
+            return self.element_grid
+
+        elements = []
+        bounds = []
+
+        for element_list in self.model.get_element_lists():
+
+            for element in element_list.iterate():
+
+                elements.append(element)
+                bounds.append(get_bounds([get_point(getattr(element, attr)) for attr in element.get_node_attributes()]))
+
+        extents = [max([b - a for a, b in zip(low, high)]) for low, high in bounds]
+
+        # cells about as large as the average element, so that an element covers few cells
+        size = max(sum(extents) / len(extents), self.get_node_grid().size) if extents else 1.0
+
+        origin = [min([low[k] for low, high in bounds]) for k in range(3)] if bounds else (0.0, 0.0, 0.0)
+
+        self.element_grid = sp.Grid(size, origin)
+
+        for element, (low, high) in zip(elements, bounds):
+
+            self.element_grid.insert(element, low, high)
+
+        return self.element_grid
+
+
+    def get_indexes(self):
+
+        """Returns the attribute indexes, built on first use."""
+
+        if self.indexes is not None:
+
+            return self.indexes
+
+        self.indexes = {"grp": {}, "prop": {}, "layer": {}}
+
+        for element_list in self.model.get_all_element_lists():
+
+            for item in element_list.iterate():
+
+                self.lists[id(item)] = element_list.name
+
+                layer = item.layer
+
+                self.indexes["grp"].setdefault(layer.get_grp() if layer else item.grp, []).append(item)
+
+                for value in set(get_items(ri.merge_props(layer.get_prop() if layer else "", item.prop))) or [""]:
+
+                    self.indexes["prop"].setdefault(value, []).append(item)
+
+                self.indexes["layer"].setdefault(layer.name if layer else None, []).append(item)
+
+        return self.indexes
+
+
+    def get_by(self, index, value, element_list = None):
+
+        """Returns the elements with a value in an attribute index, in list order.
+        Parameters:
+          index = 'grp', 'prop' or 'layer'
+          value = value looked up; for 'prop' a property the elements have all items of (e.g. 'ncs 1' for 'ncs 1 ahin mymz'), '' for
+            elements without property
+          element_list = name of the element list the elements are taken from (e.g. 'line elements'); all lists if not set
+        """
+
+        indexes = self.get_indexes()
+
+        if index == "prop":
+
+            lists = sorted([indexes["prop"].get(item, []) for item in get_items(value)] or [indexes["prop"].get("", [])], key = len)
+
+            others = [set([id(item) for item in items]) for items in lists[1:]]
+
+            items = [item for item in lists[0] if all([id(item) in ids for ids in others])]
+
+        else:
+
+            items = indexes[index].get(value, [])
+
+        if element_list is None:
+
+            return list(items)
+
+        return [item for item in items if self.lists[id(item)] == element_list]
+
+
+    def get_nodes_in_box(self, low, high):
+
+        """Returns the nodes within a box, boundary included.
+        Parameters:
+          low, high = corners of the box
+        """
+
+        return [node for items in get_cells(self.get_node_grid(), low, high) for node in items if is_inside(get_point(node), low, high)]
+
+
+    def get_nodes_in_radius(self, center, radius):
+
+        """Returns the nodes within a distance of a point, in order of distance."""
+
+        low = [v - radius for v in center]
+        high = [v + radius for v in center]
+
+        found = [(sp.distance(center, get_point(node)), node) for node in self.get_nodes_in_box(low, high)]
+
+        return [node for d, node in sorted(found, key = lambda pair: pair[0]) if d <= radius]
+
+
+    def get_nearest_node(self, point):
+
+        """Returns the node closest to a point; None for a model without nodes."""
+
+        grid = self.get_node_grid()
+
+        if not grid.cells:
+
+            return None
+
+        if self.node_range is None:
+
+            cells = list(grid.cells.keys())
+
+            self.node_range = ([min([cell[k] for cell in cells]) for k in range(3)], [max([cell[k] for cell in cells]) for k in range(3)])
+
+        first, last = self.node_range
+
+        center = grid.get_cell(point)
+
+        # the box around the point holding all occupied cells, searched last
+        reach = max([max(abs(first[k] - center[k]), abs(last[k] - center[k])) for k in range(3)]) + 1
+
+        # starting from the occupied cells nearest to a point outside of them
+        half = max([max(first[k] - center[k], center[k] - last[k], 1) for k in range(3)]) * grid.size
+
+        while True:
+
+            low = [v - half for v in point]
+            high = [v + half for v in point]
+
+            found = [(sp.distance(point, get_point(node)), node) for items in get_cells(grid, low, high) for node in items]
+
+            best = min(found, key = lambda pair: pair[0]) if found else None
+
+            # nodes outside of the box are further than its half size
+            if (best is not None) and ((best[0] <= half) or (half >= reach * grid.size)):
+
+                return best[1]
+
+            half *= 2
+
+
+    def get_elements_in_box(self, low, high):
+
+        """Returns the elements referencing nodes (springs, line and area elements) with all their nodes within a box."""
+
+        found = {}
+
+        for items in get_cells(self.get_element_grid(), low, high):
+
+            for element in items:
+
+                if id(element) in found:
+
+                    continue
+
+                if all([is_inside(get_point(getattr(element, attr)), low, high) for attr in element.get_node_attributes()]):
+
+                    found[id(element)] = element
+
+        return list(found.values())
@@ -0,0 +1,186 @@
+##
+# Renumbering module.
+# Reduces the bandwidth and profile of the stiffness matrix by renumbering nodes in Reverse Cuthill-McKee order of the node adjacency
+# graph (nodes are adjacent if an element connects them). Elements are then numbered in the order of their nodes.
+# Only the order changes, not the numbers in use: every (group, number block) keeps its set of numbers and the non-strict elements in it
+# exchange them, so that strict numbers, group blocks and numbers reserved for other elements are respected.
+# Bandwidth = largest number difference between adjacent nodes; profile = sum over nodes of the difference to their lowest adjacent node.
+##
+
+from collections import deque
+
+
+def get_adjacency(model):
+
+    """Returns adjacent nodes of every node as a dictionary of sets of node ids by node id."""
+
+    adjacency = dict([(id(node), set()) for node in model.nodes.iterate()])
+
+    for element_list in model.get_element_lists():
+
+        for element in element_list.iterate():
+
+            ids = [id(getattr(element, attr)) for attr in element.get_node_attributes()]
+
+            for a in ids:
+
+                for b in ids:
+
+                    if a != b:
+
+                        adjacency[a].add(b)
+
+    return adjacency
+
+
+def measure(nodes, adjacency):
+
+    """Returns (bandwidth, profile) of the node numbering."""
+
+    numbers = dict([(id(node), node.no) for node in nodes])
+
+    bandwidth = 0
+    profile = 0
+
+    for node in nodes:
+
+        lowest = node.no
+
+        for neighbour in adjacency[id(node)]:
+
+            bandwidth = max(bandwidth, abs(node.no - numbers[neighbour]))
+            lowest = min(lowest, numbers[neighbour])
+
+        profile += node.no - lowest
+
+    return (bandwidth, profile)
+
+
+def get_levels(start, adjacency):
+
+    """Returns breadth-first levels from a node as a list of lists of node ids."""
+
+    levels = [[start]]
+    visited = set([start])
+
+    while True:
+
+        level = []
+
+        for a in levels[-1]:
+
+            for b in adjacency[a]:
+
+                if b not in visited:
+
+                    visited.add(b)
+                    level.append(b)
+
+        if not level:
+
+            return levels
+
+        levels.append(level)
+
+
+def get_peripheral_node(start, adjacency, degree):
+
+    """Returns a node far from the others in the component of a node (George-Liu pseudo-peripheral node).
+    Parameters:
+      start = node id
+      adjacency = dictionary of adjacent node ids by node id (see get_adjacency)
+      degree = function returning the sort key of a node id, lowest degree first
+    """
+
+    levels = get_levels(start, adjacency)
+
+    while True:
+
+        candidate = min(levels[-1], key = degree)
+
+        candidate_levels = get_levels(candidate, adjacency)
+
+        if len(candidate_levels) <= len(levels):
+
+            return start
+
+        start, levels = candidate, candidate_levels
+
+
+def reverse_cuthill_mckee(nodes, adjacency):
+
+    """Returns node ids in Reverse Cuthill-McKee order, component by component.
+    Parameters:
+      nodes = nodes in list order, which breaks ties
+      adjacency = dictionary of adjacent node ids by node id (see get_adjacency)
+    """
+
+    position = dict([(id(node), i) for i, node in enumerate(nodes)])
+
+    def degree(a):
+
+        return (len(adjacency[a]), position[a])
+
+    visited = set()
+    order = []
+
+    # components start from their node of lowest degree
+    for start in sorted(position, key = degree):
+
+        if start in visited:
+
+            continue
+
+        start = get_peripheral_node(start, adjacency, degree)
+
+        component = []
+        queue = deque([start])
+        visited.add(start)
+
+        while queue:
+
+            a = queue.popleft()
+
+            component.append(a)
+
+            for b in sorted([b for b in adjacency[a] if b not in visited], key = degree):
+
+                visited.add(b)
+                queue.append(b)
+
+        order += reversed(component)
+
+    return order
+
+
+def renumber(model):
+
+    """Renumbers the non-strict nodes and elements of a model to reduce bandwidth and profile.
+    Returns:
+      dictionary with the (before, after) values of 'bandwidth' and 'profile'
+    """
+
+    nodes = list(model.nodes.iterate())
+
+    adjacency = get_adjacency(model)
+
+    before = measure(nodes, adjacency)
+
+    by_id = dict([(id(node), node) for node in nodes])
+
+    model.nodes.renumber([by_id[a] for a in reverse_cuthill_mckee(nodes, adjacency)])
+
+    # elements follow their nodes
+    for element_list in model.get_element_lists():
+
+        def key(element):
+
+            numbers = [getattr(element, attr).no for attr in element.get_node_attributes()]
+
+            return (min(numbers), max(numbers))
+
+        element_list.renumber(sorted(element_list.iterate(), key = key))
+
+    after = measure(nodes, adjacency)
+
+    return {"bandwidth": (before[0], after[0]), "profile": (before[1], after[1])}
@@ -4,6 +4,8 @@
 # - format 1: *number* [ *property* ] { *name* }
 # - format 2: *property* { *name* }
 # Format 2 should be used if no number is present - Rhino will not allow layer names to start with a square bracket.
+# Properties are lists of 'keyword value' items; the property of a layer is exported as the defaults of its elements ('beam prop ...'),
+# which the property of an element adds to (see merge_props).
 ##
 
 class RhinoInput():
@@ -101,4 +103,32 @@ class RhinoInput():
 
         """Returns name."""
 
-        return self.get_between("{", "}").strip()
\ No newline at end of file
+        return self.get_between("{", "}").strip()
+
+
+
+def merge_props(defaults, prop):
+
+    """Returns the property an element is exported with: its own items, and the items of the defaults (the property of its layer) it
+    does not set itself, e.g. 'ncs 2 ahin mymz' for defaults 'ncs 2' and prop 'ahin mymz', 'ncs 3' for 'ncs 2' and 'ncs 3'.
+    """
+
+    own = prop.split()
+
+    if not own:
+
+        return defaults.strip()
+
+    tokens = defaults.split()
+
+    keywords = set([keyword.lower() for keyword in own[::2]])
+
+    kept = []
+
+    for i in range(0, len(tokens), 2):
+
+        if tokens[i].lower() not in keywords:
+
+            kept += tokens[i:i + 2]
+
+    return " ".join(kept + own)
\ No newline at end of file
@@ -0,0 +1,385 @@
+##
+# Splitting module.
+# Connects line elements that cross or touch without sharing a node:
+# - intersections: lines intersecting within tolerance are split at the intersection and the pieces share a new node (or an existing
+#   node there); lines touching at an endpoint already share that node, parallel (e.g. overlapping) lines are not split
+# - T-junctions: lines are split at nodes (user-specified nodes or the ends of other lines) within tolerance of their interior
+# Candidates come from a uniform grid of segment bounding boxes (broadphase), so that only lines close to each other, or to a node, are
+# compared. Pieces of a split line keep its layer, property and name; the first piece keeps its number, the others are numbered by Giraffe.
+##
+
+import math
+
+
+class Grid():
+
+    """Uniform grid of axis-aligned bounding boxes."""
+
+
+    def __init__(self, size, origin = (0.0, 0.0, 0.0)):
+
+        """Constructor.
+        Parameters:
+          size = cell size
+          origin = corner of the first cell; the low corner of all boxes, so that a flat model is a single layer of cells
+        """
+
+        self.size = float(size)
+        self.origin = origin
+        self.cells = {}
+
+
+    def get_cell(self, point):
+
+        """Returns indices of the cell holding a point."""
+
+        return tuple([int(math.floor((v - o) / self.size)) for v, o in zip(point, self.origin)])
+
+
+    def get_range(self, low, high):
+
+        """Returns (first, last) cell indices covered by a bounding box."""
+
+        return self.get_cell(low), self.get_cell(high)
+
+
+    def insert(self, item, low, high):
+
+        """Adds an item to all cells its bounding box covers."""
+
+        first, last = self.get_range(low, high)
+
+        for i in range(first[0], last[0] + 1):
+
+            for j in range(first[1], last[1] + 1):
+
+                for k in range(first[2], last[2] + 1):
+
+                    self.cells.setdefault((i, j, k), []).append(item)
+
+
+
+class NodeIndex(Grid):
+
+    """Finds nodes by location: nodes closer than tolerance are identical (see Node.identical_to). Kept up to date as nodes are added
+    and removed, so that a node list is indexed once (see ElementList.get_node_index); location queries read its cells (see query).
+    """
+
+
+    def __init__(self, nodes, tolerance):
+
+        """Constructor.
+        Parameters:
+          nodes = nodes to index
+          tolerance = distance below which nodes are identical
+        """
+
+        # cells twice the tolerance: nodes identical to a point are in its cell or the neighbouring cells on the nearer side, 8 cells
+        Grid.__init__(self, 2.0 * tolerance)
+
+        self.tolerance = tolerance
+
+        for node in nodes:
+
+            self.add(node)
+
+
+    def add(self, node):
+
+        """Indexes a node."""
+
+        self.cells.setdefault(self.get_cell((node.x, node.y, node.z)), []).append(node)
+
+
+    def remove(self, node):
+
+        """Removes a node from the index."""
+
+        key = self.get_cell((node.x, node.y, node.z))
+
+        items = [item for item in self.cells.get(key, []) if item is not node]
+
+        if items:
+
+            self.cells[key] = items
+
+        elif key in self.cells:
+
+            del self.cells[key]
+
+
+    def get(self, point):
+
+        """Returns an indexed node identical to a point; None if there is none."""
+
+        candidates = []
+
+        for v in point:
+
+            c = v / self.size
+            i = int(math.floor(c))
+
+            candidates.append((i, i - 1 if c - i < 0.5 else i + 1))
+
+        for i in candidates[0]:
+
+            for j in candidates[1]:
+
+                for k in candidates[2]:
+
+                    for node in self.cells.get((i, j, k), []):
+
+                        if distance(point, (node.x, node.y, node.z)) < self.tolerance:
+
+                            return node
+
+        return None
+
+
+
+def distance(p, q):
+
+    """Returns distance between two points."""
+
+    return ((p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2 + (p[2] - q[2]) ** 2) ** 0.5
+
+
+def get_points(element):
+
+    """Returns start and end point of a line element."""
+
+    return (element.n1.x, element.n1.y, element.n1.z), (element.n2.x, element.n2.y, element.n2.z)
+
+
+def get_bounds(p, q, margin = 0.0):
+
+    """Returns (low, high) corners of the bounding box of a segment, enlarged by a margin."""
+
+    return [min(a, b) - margin for a, b in zip(p, q)], [max(a, b) + margin for a, b in zip(p, q)]
+
+
+def closest_points(p1, q1, p2, q2):
+
+    """Returns parameters (s, t) of the closest points of two segments, between 0 (start) and 1 (end); None for parallel segments."""
+
+    d1x, d1y, d1z = q1[0] - p1[0], q1[1] - p1[1], q1[2] - p1[2]
+    d2x, d2y, d2z = q2[0] - p2[0], q2[1] - p2[1], q2[2] - p2[2]
+    rx, ry, rz = p1[0] - p2[0], p1[1] - p2[1], p1[2] - p2[2]
+
+    a = d1x * d1x + d1y * d1y + d1z * d1z
+    e = d2x * d2x + d2y * d2y + d2z * d2z
+    b = d1x * d2x + d1y * d2y + d1z * d2z
+    c = d1x * rx + d1y * ry + d1z * rz
+    f = d2x * rx + d2y * ry + d2z * rz
+
+    denominator = a * e - b * b
+
+    if (a == 0) or (e == 0) or (denominator <= 1e-12 * a * e):
+
+        return None
+
+    s = min(max((b * f - c * e) / denominator, 0.0), 1.0)
+    t = (b * s + f) / e
+
+    # the closest point on the second segment is beyond an end, the closest point on the first is recomputed for that end
+    if (t < 0) or (t > 1):
+
+        t = min(max(t, 0.0), 1.0)
+        s = min(max((b * t - c) / a, 0.0), 1.0)
+
+    return s, t
+
+
+def point_at(p, q, s):
+
+    """Returns the point at parameter s of a segment."""
+
+    return (p[0] + (q[0] - p[0]) * s, p[1] + (q[1] - p[1]) * s, p[2] + (q[2] - p[2]) * s)
+
+
+def is_interior(s, length, tolerance):
+
+    """Returns True if the point at parameter s is further than tolerance from both ends of a segment."""
+
+    return (s * length >= tolerance) and ((1 - s) * length >= tolerance)
+
+
+def index_segments(elements, tolerance):
+
+    """Indexes line elements in a grid by their bounding boxes, enlarged by tolerance.
+    Returns:
+      (segments, lengths, bounds, ranges, grid): lists of (start, end) points, lengths, (low, high) corners and (first, last) cells by
+      index of the element, and the Grid holding the indices
+    """
+
+    segments = [get_points(element) for element in elements]
+
+    lengths = [distance(p, q) for p, q in segments]
+
+    bounds = [get_bounds(p, q, tolerance) for p, q in segments]
+
+    origin = [min([low[k] for low, high in bounds]) for k in range(3)]
+
+    # cells about as large as the average line, so that a line covers few cells and a cell holds few lines
+    grid = Grid(max(sum(lengths) / len(lengths), 4 * tolerance), origin)
+
+    ranges = []
+
+    for i in range(len(segments)):
+
+        ranges.append(grid.get_range(bounds[i][0], bounds[i][1]))
+
+        grid.insert(i, bounds[i][0], bounds[i][1])
+
+    return segments, lengths, bounds, ranges, grid
+
+
+def find_intersections(elements, tolerance):
+
+    """Finds the points where line elements intersect within tolerance, away from the ends of both.
+    Returns:
+      dictionary of lists of (parameter, point) tuples by id of the element
+    """
+
+    if not elements:
+
+        return {}
+
+    segments, lengths, bounds, ranges, grid = index_segments(elements, tolerance)
+
+    splits = {}
+
+    for cell in grid.cells:
+
+        items = grid.cells[cell]
+
+        for x in range(len(items) - 1):
+
+            i = items[x]
+
+            low_i, high_i = bounds[i]
+            first_i = ranges[i][0]
+
+            for j in items[x + 1:]:
+
+                low_j, high_j = bounds[j]
+
+                if (low_i[0] > high_j[0]) or (low_j[0] > high_i[0]) or (low_i[1] > high_j[1]) or (low_j[1] > high_i[1]) or \
+                   (low_i[2] > high_j[2]) or (low_j[2] > high_i[2]):
+
+                    continue
+
+                # pairs sharing several cells are only tested in the cell holding the low corner of the overlap of their bounds
+                first_j = ranges[j][0]
+
+                if (max(first_i[0], first_j[0]), max(first_i[1], first_j[1]), max(first_i[2], first_j[2])) != cell:
+
+                    continue
+
+                found = closest_points(segments[i][0], segments[i][1], segments[j][0], segments[j][1])
+
+                if found is None:
+
+                    continue
+
+                s, t = found
+
+                a = point_at(segments[i][0], segments[i][1], s)
+                b = point_at(segments[j][0], segments[j][1], t)
+
+                if (distance(a, b) > tolerance) or not (is_interior(s, lengths[i], tolerance) and is_interior(t, lengths[j], tolerance)):
+
+                    continue
+
+                point = tuple([(u + v) / 2 for u, v in zip(a, b)])
+
+                splits.setdefault(id(elements[i]), []).append((s, point))
+                splits.setdefault(id(elements[j]), []).append((t, point))
+
+    return splits
+
+
+def find_nodes_on_lines(elements, nodes, tolerance):
+
+    """Finds the nodes within tolerance of line elements, away from their ends.
+    Returns:
+      dictionary of lists of (parameter, point) tuples by id of the element, the points being the locations of the nodes
+    """
+
+    if not elements:
+
+        return {}
+
+    segments, lengths, bounds, ranges, grid = index_segments(elements, tolerance)
+
+    splits = {}
+
+    for node in nodes:
+
+        point = (node.x, node.y, node.z)
+
+        # bounds are enlarged by tolerance: lines close to a node cover the cell of the node
+        for i in grid.cells.get(grid.get_cell(point), []):
+
+            low, high = bounds[i]
+
+            if (point[0] < low[0]) or (point[0] > high[0]) or (point[1] < low[1]) or (point[1] > high[1]) or \
+               (point[2] < low[2]) or (point[2] > high[2]):
+
+                continue
+
+            p, q = segments[i]
+
+            if lengths[i] == 0:
+
+                continue
+
+            s = ((point[0] - p[0]) * (q[0] - p[0]) + (point[1] - p[1]) * (q[1] - p[1]) + (point[2] - p[2]) * (q[2] - p[2])) / (lengths[i] ** 2)
+
+            if (not is_interior(s, lengths[i], tolerance)) or (distance(point, point_at(p, q, s)) > tolerance):
+
+                continue
+
+            splits.setdefault(id(elements[i]), []).append((s, point))
+
+    return splits
+
+
+def split_at_nodes(model, tolerance):
+
+    """Splits the line elements of a model at nodes on their interior.
+    Returns:
+      number of line elements split
+    """
+
+    nodes = list(model.nodes.iterate())
+
+    splits = find_nodes_on_lines(list(model.line_elements.iterate()), nodes, tolerance)
+
+    if not splits:
+
+        return 0
+
+    model.split_line_elements(splits)
+
+    return len(splits)
+
+
+def split_intersections(model, tolerance):
+
+    """Splits the line elements of a model where they intersect.
+    Returns:
+      number of line elements split
+    """
+
+    elements = list(model.line_elements.iterate())
+
+    splits = find_intersections(elements, tolerance)
+
+    if not splits:
+
+        return 0
+
+    model.split_line_elements(splits)
+
+    return len(splits)
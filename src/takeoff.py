@@ -0,0 +1,200 @@
+##
+# Takeoff module.
+# Quantities of a built model per element list, group and property: number of elements, total length of line elements and total area
+# of area elements, and their weight where the catalog resolves it (see catalog.Catalog.get_area, get_unit_weight):
+# - line elements: length * area of the section (ncs) * unit weight of the material (mno of the property, or of the section)
+# - area elements: area * thickness (t, in mm) * unit weight of the material (mno)
+# Group and property as in queries (see query): the group of the layer, the property of the layer merged with the property of the
+# element, as exported (see rhinoinput.merge_props).
+# Node coordinates are collected in columns per element list, group and property, and measured column-wise once all elements are in,
+# a single pass over each column set. Lengths in m, areas in m2, weights in kN, masses in t.
+##
+
+import rhinoinput as ri
+
+
+# standard gravity, kN to t
+GRAVITY = 9.81
+
+COLUMNS = ["list", "grp", "prop", "count", "length", "area", "weight", "mass"]
+
+
+def get_value(prop, keyword):
+
+    """Returns the number following a keyword in a property (e.g. 1 for 'ncs' in 'ncs 1 div 4'); None if not set or not a number."""
+
+    tokens = prop.lower().split()
+
+    for i in range(len(tokens) - 1):
+
+        if tokens[i] == keyword:
+
+            try:
+
+                value = float(tokens[i + 1])
+
+            except ValueError:
+
+                return None
+
+            return int(value) if value == int(value) else value
+
+    return None
+
+
+def get_lengths(x1, y1, z1, x2, y2, z2):
+
+    """Returns the lengths of segments given by coordinate columns of their ends."""
+
+    return [((b - a) ** 2 + (d - c) ** 2 + (f - e) ** 2) ** 0.5 for a, b, c, d, e, f in zip(x1, x2, y1, y2, z1, z2)]
+
+
+def get_areas(x1, y1, z1, x2, y2, z2, x3, y3, z3, x4, y4, z4):
+
+    """Returns the areas of quads given by coordinate columns of their corners: half the cross product of the diagonals, exact for flat
+    quads.
+    """
+
+    areas = []
+
+    for a in zip(x3, x1, y3, y1, z3, z1, x4, x2, y4, y2, z4, z2):
+
+        ux, uy, uz = a[0] - a[1], a[2] - a[3], a[4] - a[5]
+        vx, vy, vz = a[6] - a[7], a[8] - a[9], a[10] - a[11]
+
+        areas.append(0.5 * ((uy * vz - uz * vy) ** 2 + (uz * vx - ux * vz) ** 2 + (ux * vy - uy * vx) ** 2) ** 0.5)
+
+    return areas
+
+
+
+class Takeoff():
+
+
+    def __init__(self, catalog = None, cf = 1.0):
+
+        """Constructor.
+        Parameters:
+          catalog = catalog.Catalog weights are resolved against; no weights if not set
+          cf = conversion factor of the model to meters
+        """
+
+        self.catalog = catalog
+        self.cf = cf
+
+        # coordinate columns (x, y, z of every node of the elements) by (element list name, group, property)
+        self.columns = {}
+
+        # (group, property) of every layer by name, parsed once
+        self.layers = {}
+
+
+    def add(self, item, list_name):
+
+        """Adds a line or area element; other elements are not measured."""
+
+        attrs = item.get_node_attributes()
+
+        if len(attrs) not in [2, 4]:
+
+            return
+
+        layer = item.layer
+
+        if layer is None:
+
+            grp, prop = item.grp, ""
+
+        else:
+
+            if layer.name not in self.layers:
+
+                self.layers[layer.name] = (layer.get_grp(), layer.get_prop())
+
+            grp, prop = self.layers[layer.name]
+
+        key = (list_name, grp, ri.merge_props(prop, item.prop))
+
+        if key not in self.columns:
+
+            self.columns[key] = [[] for i in range(3 * len(attrs))]
+
+        columns = self.columns[key]
+
+        for i, attr in enumerate(attrs):
+
+            node = getattr(item, attr)
+
+            columns[3 * i].append(node.x)
+            columns[3 * i + 1].append(node.y)
+            columns[3 * i + 2].append(node.z)
+
+
+    def get_weight(self, prop, length, area):
+
+        """Returns the weight in kN of line elements of a total length, or of area elements of a total area; None if unresolved."""
+
+        if self.catalog is None:
+
+            return None
+
+        mno = get_value(prop, "mno")
+
+        if length is not None:
+
+            ncs = get_value(prop, "ncs")
+
+            section = self.catalog.get_area(ncs)
+
+            if mno is None:
+
+                mno = self.catalog.get_section_material(ncs)
+
+            gam = self.catalog.get_unit_weight(mno)
+
+            return None if (section is None) or (gam is None) else length * section * gam
+
+        t = get_value(prop, "t")
+
+        gam = self.catalog.get_unit_weight(mno)
+
+        return None if (t is None) or (gam is None) else area * t * 0.001 * gam
+
+
+    def get_rows(self):
+
+        """Returns quantities as a list of dictionaries with the keys in COLUMNS, sorted by element list, group and property; length, area,
+        weight and mass are None where they do not apply or are unresolved.
+        """
+
+        rows = []
+
+        for key in sorted(self.columns):
+
+            columns = self.columns[key]
+
+            length = None
+            area = None
+
+            if len(columns) == 6:
+
+                length = sum(get_lengths(*columns)) * self.cf
+
+            else:
+
+                area = sum(get_areas(*columns)) * self.cf ** 2
+
+            weight = self.get_weight(key[2], length, area)
+
+            rows.append({
+                "list": key[0],
+                "grp": key[1],
+                "prop": key[2],
+                "count": len(columns[0]),
+                "length": length,
+                "area": area,
+                "weight": weight,
+                "mass": None if weight is None else weight / GRAVITY
+            })
+
+        return rows
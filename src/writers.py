@@ -0,0 +1,475 @@
+##
+# Writers module.
+# Output formats of a built model. A model is traversed once (see StructuralModel.traverse) and every writer is handed the same
+# sequence of calls, so that several formats are written from a single build and a single pass over the elements:
+#   begin(model), then per element list: begin_list(element_list), then per layer: begin_layer(layer, element_list),
+#   element(item, element_list) for every element; finally end(model)
+# Lists and layers without elements are skipped. Every call returns the text to append to the writer's output ('' for none).
+# Formats:
+# - sofimsha: SOFiSTiK input, the regular export
+# - jsonl: one json object per line, for the model, every error and every element
+# - csv: a single table with one row per element
+# - takeoff: a table of quantities per element list, group and property (see takeoff)
+# Coordinates are written in meters in the jsonl and csv formats.
+# The sofimsha input can be written loop-compressed (LoopWriter): runs of records whose numbers and coordinates change by constant
+# increments are written as a CADINP loop, e.g.
+#   let#gl0 1
+#   let#gl1 0.0
+#   loop 10
+#   node no #gl0 x #gl1*#cf y 0.0*#cf z 0.0*#cf
+#   let#gl0 #gl0+1
+#   let#gl1 #gl1+500.0
+#   endloop
+##
+
+# shortest run of records written as a loop
+LOOP_MIN = 4
+
+
+def to_record(item, element_list, cf):
+
+    """Returns the attributes of an element as a dictionary: coordinates in meters, referenced nodes by number, group as exported
+    (the group of the layer).
+    """
+
+    data = {
+        "list": element_list.name,
+        "typ": item.typ,
+        "no": item.no,
+        "grp": item.layer.get_grp() if item.layer else item.grp,
+        "layer": item.layer.name if item.layer else None,
+        "prop": item.prop,
+        "name": item.name
+    }
+
+    for attr in ["x", "y", "z"]:
+
+        if hasattr(item, attr):
+
+            data[attr] = getattr(item, attr) * cf
+
+    for attr in ["dx", "dy", "dz"]:
+
+        if hasattr(item, attr):
+
+            data[attr] = getattr(item, attr)
+
+    for attr in item.get_node_attributes():
+
+        data[attr] = getattr(item, attr).no
+
+    return data
+
+
+def parse_number(text):
+
+    """Returns the value of a number written to the sofimsha input: int if written as an integer, float otherwise; None if not a number."""
+
+    try:
+
+        return int(text)
+
+    except ValueError:
+
+        pass
+
+    try:
+
+        return float(text)
+
+    except ValueError:
+
+        return None
+
+
+def split_record(line, suffix):
+
+    """Splits a record of the sofimsha input (e.g. 'node no 1 x 0.0*#cf y 0.0*#cf z 0.0*#cf ') into its fields.
+    Parameters:
+      line = record
+      suffix = end of the record that is not split: property and name (see StructuralElement.export_end)
+    Returns:
+      (head, values, texts): head = (type, keywords, units, suffix) shared by the records of a run; values and texts of the fields,
+      units being '*#cf' for coordinates written as multiples of #cf and '' otherwise; None if the record cannot be split
+    """
+
+    if not line.endswith(suffix):
+
+        return None
+
+    tokens = line[:len(line) - len(suffix)].split(" ")
+
+    if len(tokens) % 2 != 1:
+
+        return None
+
+    keywords = []
+    units = []
+    values = []
+    texts = []
+
+    for keyword, text in zip(tokens[1::2], tokens[2::2]):
+
+        unit = "*#cf" if text.endswith("*#cf") else ""
+
+        text = text[:len(text) - len(unit)]
+
+        value = parse_number(text)
+
+        if value is None:
+
+            return None
+
+        keywords.append(keyword)
+        units.append(unit)
+        values.append(value)
+        texts.append(text)
+
+    return (tokens[0], tuple(keywords), tuple(units), suffix), values, texts
+
+
+def find_runs(rows):
+
+    """Finds runs of records with fields changing by constant increments, in one pass.
+    Parameters:
+      rows = split records (see split_record), None for records that cannot be split
+    Returns:
+      list of (first, count, steps) tuples covering all rows in order; steps = increments of the fields, None for single records
+    """
+
+    runs = []
+
+    i = 0
+
+    while i < len(rows):
+
+        count = 1
+        steps = None
+
+        if (rows[i] is not None) and (i + 1 < len(rows)) and (rows[i + 1] is not None) and (rows[i + 1][0] == rows[i][0]):
+
+            steps = [b - a for a, b in zip(rows[i][1], rows[i + 1][1])]
+
+            # the loop adds the increments: values must come out exactly, as accumulated in floating point
+            while (i + count < len(rows)) and (rows[i + count] is not None) and (rows[i + count][0] == rows[i][0]) and \
+                  all([a + step == b for a, b, step in zip(rows[i + count - 1][1], rows[i + count][1], steps)]):
+
+                count += 1
+
+        runs.append((i, count, steps if count > 1 else None))
+
+        i += count
+
+    return runs
+
+
+def format_loop(row, count, steps):
+
+    """Returns a run of records as a CADINP loop: fields changing are loop variables (#gl0, #gl1, ...), incremented on every pass.
+    Parameters:
+      row = first record of the run (see split_record)
+      count = number of records
+      steps = increments of the fields
+    """
+
+    (typ, keywords, units, suffix), values, texts = row
+
+    lets = ""
+    fields = ""
+    increments = ""
+
+    for i, keyword in enumerate(keywords):
+
+        if steps[i] == 0:
+
+            fields += " " + keyword + " " + texts[i] + units[i]
+
+            continue
+
+        variable = "#gl" + str(i)
+
+        step = str(steps[i]) if isinstance(steps[i], int) else repr(float(steps[i]))
+
+        lets += "let" + variable + " " + texts[i] + "\n"
+        fields += " " + keyword + " " + variable + units[i]
+        increments += "let" + variable + " " + variable + ("" if step.startswith("-") else "+") + step + "\n"
+
+    return lets + "loop " + str(count) + "\n" + typ + fields + suffix + "\n" + increments + "endloop\n"
+
+
+
+class Writer():
+
+    """Base class of writers: writes nothing."""
+
+
+    def begin(self, model):
+
+        return ""
+
+
+    def begin_list(self, element_list):
+
+        return ""
+
+
+    def begin_layer(self, layer, element_list):
+
+        return ""
+
+
+    def element(self, item, element_list):
+
+        return ""
+
+
+    def end(self, model):
+
+        return ""
+
+
+
+class SofimshaWriter(Writer):
+
+
+    def __init__(self, cf = None):
+
+        """Constructor.
+        Parameters:
+          cf = conversion factor for a compact export (see Node.export); regular export if not set
+        """
+
+        self.cf = cf
+
+
+    def begin(self, model):
+
+        return model.get_export_header()
+
+
+    def begin_list(self, element_list):
+
+        return "\n\n" + "!*!Label *** " + element_list.name.upper() + " ***\n" + element_list.export_errors()
+
+
+    def begin_layer(self, layer, element_list):
+
+        if layer:
+
+            return layer.export(self.cf is not None)
+
+        # special case for the endpoints of structural elements that do not have a Guid in Rhino
+        return "\n!*!Label nodes .. .. added and numbered by Giraffe" + "\n"
+
+
+    def element(self, item, element_list):
+
+        return item.export(self.cf) + "\n"
+
+
+    def end(self, model):
+
+        return "\n\nend"
+
+
+
+class LoopWriter(SofimshaWriter):
+
+    """Loop-compressed sofimsha input: the records of every layer are sorted by number and runs of at least LOOP_MIN records with
+    constant increments are written as loops (see find_runs, format_loop); other records as in the regular export. The loops define the
+    same elements, numbers and coordinates: increments are only used where adding them reproduces every value exactly.
+    """
+
+
+    def __init__(self, cf = None):
+
+        """Constructor.
+        Parameters:
+          cf = conversion factor for a compact export (see SofimshaWriter)
+        """
+
+        SofimshaWriter.__init__(self, cf)
+
+        # elements of the current layer, written once the layer is complete
+        self.pending = []
+
+
+    def flush(self):
+
+        """Returns the records of the current layer, runs written as loops."""
+
+        items = sorted(self.pending, key = lambda item: item.no)
+
+        self.pending = []
+
+        lines = [item.export(self.cf) for item in items]
+
+        rows = [split_record(line, item.export_end("", self.cf is not None)) for line, item in zip(lines, items)]
+
+        output = ""
+
+        for first, count, steps in find_runs(rows):
+
+            if count >= LOOP_MIN:
+
+                output += format_loop(rows[first], count, steps)
+
+            else:
+
+                output += "".join([line + "\n" for line in lines[first:first + count]])
+
+        return output
+
+
+    def begin_list(self, element_list):
+
+        return self.flush() + SofimshaWriter.begin_list(self, element_list)
+
+
+    def begin_layer(self, layer, element_list):
+
+        return self.flush() + SofimshaWriter.begin_layer(self, layer, element_list)
+
+
+    def element(self, item, element_list):
+
+        self.pending.append(item)
+
+        return ""
+
+
+    def end(self, model):
+
+        return self.flush() + SofimshaWriter.end(self, model)
+
+
+
+class JsonLinesWriter(Writer):
+
+
+    def __init__(self):
+
+        """Constructor."""
+
+        # json is only imported when the format is used
+        import json
+
+        self.json = json
+
+        self.cf = 1.0
+
+
+    def dump(self, data):
+
+        return self.json.dumps(data, sort_keys = True) + "\n"
+
+
+    def begin(self, model):
+
+        self.cf = model.conversion_factor
+
+        return self.dump({"model": model.name, "gdiv": model.gdiv})
+
+
+    def begin_list(self, element_list):
+
+        return "".join([self.dump({"list": element_list.name, "error": error}) for error in element_list._errors])
+
+
+    def element(self, item, element_list):
+
+        return self.dump(to_record(item, element_list, self.cf))
+
+
+
+class CsvWriter(Writer):
+
+
+    COLUMNS = ["list", "typ", "no", "grp", "layer", "prop", "name", "x", "y", "z", "dx", "dy", "dz", "n", "n1", "n2", "n3", "n4"]
+
+
+    def __init__(self):
+
+        """Constructor."""
+
+        self.cf = 1.0
+
+
+    def quote(self, value):
+
+        """Returns a field value, quoted if needed."""
+
+        if value is None:
+
+            return ""
+
+        if isinstance(value, float):
+
+            value = repr(value)
+
+        value = str(value)
+
+        if ("," in value) or ('"' in value) or ("\n" in value):
+
+            return '"' + value.replace('"', '""') + '"'
+
+        return value
+
+
+    def begin(self, model):
+
+        self.cf = model.conversion_factor
+
+        return ",".join(self.COLUMNS) + "\n"
+
+
+    def element(self, item, element_list):
+
+        data = to_record(item, element_list, self.cf)
+
+        return ",".join([self.quote(data.get(column)) for column in self.COLUMNS]) + "\n"
+
+
+
+class TakeoffWriter(CsvWriter):
+
+
+    def __init__(self):
+
+        """Constructor."""
+
+        # takeoff is only imported when the format is used
+        import takeoff as tk
+
+        self.tk = tk
+
+        self.takeoff = None
+
+
+    def begin(self, model):
+
+        self.takeoff = self.tk.Takeoff(model.catalog, model.conversion_factor)
+
+        return ",".join(self.tk.COLUMNS) + "\n"
+
+
+    def element(self, item, element_list):
+
+        self.takeoff.add(item, element_list.name)
+
+        return ""
+
+
+    def end(self, model):
+
+        return "".join([",".join([self.quote(row[column]) for column in self.tk.COLUMNS]) + "\n" for row in self.takeoff.get_rows()])
+
+
+
+# writer class and file extension by format name
+FORMATS = {
+    "sofimsha": (SofimshaWriter, ".dat"),
+    "jsonl": (JsonLinesWriter, ".jsonl"),
+    "csv": (CsvWriter, ".csv"),
+    "takeoff": (TakeoffWriter, ".takeoff.csv")
+}
@@ -0,0 +1,110 @@
+# base imports
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import backgroundexport as bx
+
+class FakeModel():
+
+	def __init__(self, chunks, gate = None):
+
+		self.chunks = chunks
+		self.gate = gate
+		self.store = None
+
+	def iter_export(self):
+
+		for chunk in self.chunks:
+			if self.gate:
+				self.gate.wait()
+			yield chunk
+
+	def make_file(self, path, cancelled = None):
+
+		bx.write_replacing(path, self.iter_export(), cancelled)
+		return self
+
+class BackgroundExportTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, "_system.dat")
+		self.statuses = []
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+	def read(self):
+
+		f = open(self.path)
+		text = f.read()
+		f.close()
+		return text
+
+	def callback(self, job):
+
+		self.statuses.append((job, job.status))
+
+	def test_done(self):
+
+		job = bx.submit(FakeModel(["a", "b"]), self.path, self.callback)
+		self.assertTrue(job.wait(5))
+		self.assertEqual([status for j, status in self.statuses], [bx.STARTED, bx.DONE])
+		self.assertEqual(self.read(), "ab")
+		self.assertFalse(os.path.exists(self.path + ".part"))
+
+	def test_failed(self):
+
+		model = FakeModel(["a"])
+		model.iter_export = None
+		job = bx.submit(model, self.path, self.callback)
+		job.wait(5)
+		self.assertEqual(job.status, bx.FAILED)
+		self.assertTrue(job.error)
+
+	def test_superseded(self):
+
+		gate = threading.Event()
+		first = bx.submit(FakeModel(["old"] * 100, gate), self.path, self.callback)
+		second = bx.submit(FakeModel(["new"]), self.path, self.callback)
+		gate.set()
+		self.assertTrue(second.wait(5))
+		self.assertEqual(first.status, bx.CANCELLED)
+		self.assertEqual(second.status, bx.DONE)
+		self.assertEqual(bx.get_current(), second)
+		self.assertEqual(self.read(), "new")
+
+	def test_cancelled_keeps_previous_export(self):
+
+		f = open(self.path, "w")
+		f.write("previous")
+		f.close()
+		self.assertRaises(bx.Cancelled, bx.write_replacing, self.path, ["a", "b"], lambda: True)
+		self.assertEqual(self.read(), "previous")
+		self.assertFalse(os.path.exists(self.path + ".part"))
+
+	def test_several_files(self):
+
+		other = os.path.join(self.directory, "_system.csv")
+		bx.write_replacing([self.path, other], [(0, "a"), (1, "b"), (0, "c")])
+		self.assertEqual(self.read(), "ac")
+		f = open(other)
+		self.assertEqual(f.read(), "b")
+		f.close()
+		self.assertRaises(bx.Cancelled, bx.write_replacing, [self.path, other], [(1, "d")], lambda: True)
+		self.assertEqual(self.read(), "ac")
+		self.assertEqual(sorted(os.listdir(self.directory)), ["_system.csv", "_system.dat"])
+
+
+
+if __name__ == '__main__':
+
+	unittest.main()
@@ -0,0 +1,94 @@
+# base imports
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import batchexport as be
+
+try:
+	from StringIO import StringIO
+except ImportError:
+	from io import StringIO
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), '..', 'examples', 'moment-frame', 'system.giraffe.json')
+
+class BatchExportTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+	def add_model(self, name, content = None):
+
+		os.mkdir(os.path.join(self.directory, name))
+		path = os.path.join(self.directory, name, "system.giraffe.json")
+		if content is None:
+			shutil.copy(EXAMPLE, path)
+		else:
+			f = open(path, "w")
+			f.write(content)
+			f.close()
+		return path
+
+	def read_export(self, name):
+
+		f = open(os.path.join(self.directory, name, "_system.dat"))
+		output = f.read()
+		f.close()
+		return output
+
+	def test_find_inputs(self):
+
+		a = self.add_model("a")
+		b = self.add_model("b")
+		self.assertEqual(be.find_inputs([self.directory, a]), [a, b])
+
+	def test_export(self):
+
+		self.add_model("frame")
+		self.assertEqual(be.main(["-j", "1", self.directory]), 0)
+		output = self.read_export("frame")
+		self.assertTrue("node no 2 x 5.0*#cf y 0.0*#cf z 0.0*#cf fix pp" in output)
+		self.assertTrue("beam no 3 na 4 ne 3 ahin mymz" in output)
+		self.assertTrue("spri no 2 na 4 dx 0.0 dy 0.0 dz 1.0" in output)
+
+	def test_pool(self):
+
+		for name in ["a", "b", "c"]:
+			self.add_model(name)
+		results = be.run(be.find_inputs([self.directory]), jobs = 2, out = StringIO())
+		self.assertEqual(len(results), 3)
+		self.assertEqual([result[2] for result in results], [None, None, None])
+		self.assertEqual(self.read_export("a"), self.read_export("c"))
+
+	def test_failure(self):
+
+		self.add_model("good")
+		bad = self.add_model("bad", "{ not json")
+		out = StringIO()
+		results = be.run(be.find_inputs([self.directory]), jobs = 1, out = out)
+		self.assertEqual([result[0] for result in results if result[2]], [bad])
+		self.assertTrue("1 exported, 1 failed" in out.getvalue())
+
+	def test_exit_code_on_failure(self):
+
+		self.add_model("bad", json.dumps({"objects": [{"layer": "input::nodes", "type": "Unknown", "points": [[0, 0, 0]]}]}))
+		self.assertEqual(be.main(["-j", "1", self.directory]), 1)
+
+	def test_no_inputs(self):
+
+		self.assertEqual(be.main([self.directory]), 2)
+
+
+if __name__ == '__main__':
+
+	unittest.main()
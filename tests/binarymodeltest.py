@@ -0,0 +1,96 @@
+# base imports
+import sys
+import os
+import array
+import shutil
+import tempfile
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import binarymodel as bm
+
+class StringTableTest(unittest.TestCase):
+
+	def test_intern(self):
+
+		strings = bm.StringTable()
+		self.assertEqual(strings.intern("ncs 1"), 0)
+		self.assertEqual(strings.intern("ncs 2"), 1)
+		self.assertEqual(strings.intern("ncs 1"), 0)
+		self.assertEqual(strings.intern(None), -1)
+
+	def test_columns(self):
+
+		strings = bm.StringTable(["", "beam", "fix pp"])
+		offsets, data = strings.to_columns()
+		self.assertEqual(bm.StringTable.from_columns(offsets, data).strings, ["", "beam", "fix pp"])
+
+
+class FileTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, "_system.gmb")
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+	def write(self):
+
+		strings = bm.StringTable()
+		columns = {
+			"node.x": array.array("d", [0.0, 1.5, -2.25]),
+			"node.no": array.array("i", [1, 2, 3]),
+			"node.prop": array.array("i", [strings.intern("fix pp"), -1, strings.intern("fix pp")]),
+			"line.n1": array.array("i", [0, 1]),
+			"model.name": array.array("i", [strings.intern("structure")])
+		}
+		bm.write(self.path, columns, strings)
+
+	def test_mapped(self):
+
+		self.write()
+		data = bm.read_mapped(self.path)
+		self.assertEqual(list(data.get("node.x")), [0.0, 1.5, -2.25])
+		self.assertEqual(list(data.get("node.no")), [1, 2, 3])
+		self.assertEqual(data.get_strings("node.prop"), ["fix pp", None, "fix pp"])
+		self.assertEqual(data.get_string(data.get("model.name")[0]), "structure")
+		data.close()
+
+	def test_copied(self):
+
+		self.write()
+		data = bm.read_copied(self.path)
+		self.assertEqual(list(data.get("line.n1")), [0, 1])
+		self.assertEqual(list(data.get("node.x")), [0.0, 1.5, -2.25])
+
+	def test_missing_column(self):
+
+		self.write()
+		data = bm.read(self.path)
+		self.assertEqual(len(data.get("quad.n1")), 0)
+		data.close()
+
+	def test_aligned(self):
+
+		self.write()
+		f = open(self.path, "rb")
+		directory = bm.read_directory(f.read())
+		f.close()
+		for name, typecode, length, offset in directory:
+			self.assertEqual(offset % 8, 0)
+
+	def test_not_a_binary_model(self):
+
+		f = open(self.path, "wb")
+		f.write(b"$ generated by Giraffe for Rhino\n")
+		f.close()
+		self.assertRaises(ValueError, bm.read, self.path)
+
+
+if __name__ == '__main__':
+
+	unittest.main()
@@ -0,0 +1,44 @@
+# base imports
+import sys
+import os
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import blocks as bl
+
+class TransformTest(unittest.TestCase):
+
+	def test_affine(self):
+
+		rotation = [[0, -1, 0, 10], [1, 0, 0, 0], [0, 0, 1, 2], [0, 0, 0, 1]]
+		self.assertEqual(bl.transform(rotation, [[1, 0, 0], [0, 2, 0]]), [[10, 1, 2], [8, 0, 2]])
+
+	def test_projective(self):
+
+		scale = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 2.0]]
+		self.assertEqual(bl.transform(scale, [[2, 4, 6]]), [[1, 2, 3]])
+
+	def test_matrix(self):
+
+		class Xform():
+			def __getitem__(self, index):
+				return index[0] * 4 + index[1]
+
+		self.assertEqual(bl.get_matrix(Xform())[1], [4, 5, 6, 7])
+
+
+class OffsetsTest(unittest.TestCase):
+
+	def test_offsets(self):
+
+		self.assertEqual(bl.get_offsets("grp 10 no 1000"), (10, 1000))
+		self.assertEqual(bl.get_offsets("[no 50] {left}"), (0, 50))
+		self.assertEqual(bl.get_offsets(""), (0, 0))
+		self.assertEqual(bl.get_offsets(None), (0, 0))
+		self.assertEqual(bl.get_offsets("grp x"), (0, 0))
+
+
+if __name__ == '__main__':
+
+	unittest.main()
@@ -0,0 +1,48 @@
+# base imports
+import sys
+import os
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import buildfilter as bf
+import Giraffe
+
+class BuildFilterTest(unittest.TestCase):
+
+	def test_layer_subtree(self):
+
+		f = bf.BuildFilter(layer = "input::beams::2")
+		self.assertTrue(f.accepts_layer(Giraffe.GiraffeLayer("input::beams::2")))
+		self.assertTrue(f.accepts_layer(Giraffe.GiraffeLayer("input::beams::2::deck")))
+		self.assertFalse(f.accepts_layer(Giraffe.GiraffeLayer("input::beams::20")))
+
+	def test_groups(self):
+
+		f = bf.BuildFilter(groups = [100, 199])
+		self.assertTrue(f.accepts_layer(Giraffe.GiraffeLayer("input::beams::150 [ncs 1]")))
+		self.assertFalse(f.accepts_layer(Giraffe.GiraffeLayer("input::beams::2")))
+		self.assertFalse(f.accepts_layer(Giraffe.GiraffeLayer("input::beams")))
+
+	def test_objects(self):
+
+		f = bf.BuildFilter(objects = ["a"])
+		self.assertTrue(f.accepts_object("a"))
+		self.assertFalse(f.accepts_object("b"))
+
+	def test_pieces(self):
+
+		f = bf.BuildFilter(objects = ["a"])
+		piece = Giraffe.LineElement(None, "beam")
+		piece.layer = Giraffe.GiraffeLayer("input::beams::2")
+		piece.geo, piece.segment, piece.member = "a", 2, 1
+		self.assertTrue(f.accepts_element(piece))
+
+	def test_no_layer(self):
+
+		self.assertFalse(bf.BuildFilter().accepts_layer(None))
+
+
+if __name__ == '__main__':
+
+	unittest.main()
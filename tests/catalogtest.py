@@ -0,0 +1,193 @@
+# base imports
+import sys
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import catalog as cat
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+class ParseTest(unittest.TestCase):
+
+	def parse(self, text):
+
+		return cat.Catalog().parse_lines(text.splitlines(), ".")
+
+	def test_records(self):
+
+		catalog = self.parse("+prog aqua\nstee no 1 fy 50000[psi]\nmate 500 e 70000\nCABL 301 TYPE PG-5 MNO 301\ntube no  1  d 200[mm]\nend")
+		self.assertEqual(sorted(catalog.sections), [1, 301])
+		self.assertEqual(sorted(catalog.materials), [1, 500])
+
+	def test_variables(self):
+
+		catalog = self.parse("let#ncs 10\nlet#mno #ncs+1\nsect #ncs mno #mno\nstee no #mno")
+		self.assertEqual(sorted(catalog.sections), [10])
+		self.assertEqual(sorted(catalog.materials), [11])
+
+	def test_expressions(self):
+
+		catalog = self.parse("INtoMM = 25.4\nlet#h 8*$(INtoMM) $ height\nlet#b 3[mm]")
+		self.assertAlmostEqual(catalog.variables["h"], 203.2)
+		self.assertEqual(catalog.variables["b"], 3)
+
+	def test_calculate(self):
+
+		self.assertEqual(cat.calculate("2**3**2"), 512)
+		self.assertEqual(cat.calculate("-2**2"), -4)
+		self.assertEqual(cat.calculate("(1+2)*3/2"), 4.5)
+		self.assertAlmostEqual(cat.calculate("sqrt(2)*cos(45)"), 1.0)
+		self.assertRaises(ValueError, cat.calculate, "2 3")
+		self.assertRaises(ValueError, cat.calculate, "(1")
+
+	def test_unsafe_expressions(self):
+
+		# neither hangs nor raises: values that cannot be calculated are kept as text
+		catalog = self.parse("let#a 9**9**9\nlet#b 1e308*10\nlet#c 10**400\nsect 2")
+		self.assertEqual(catalog.variables["a"], "9**9**9")
+		self.assertEqual(catalog.variables["b"], "1e308*10")
+		self.assertEqual(catalog.variables["c"], "10**400")
+		self.assertEqual(sorted(catalog.sections), [2])
+
+	def test_macros(self):
+
+		catalog = self.parse("#define box\nsect #ncs mno 1\n#enddef\nlet#ncs 5\n#include box\nlet#ncs 6\n#include box")
+		self.assertEqual(sorted(catalog.sections), [5, 6])
+
+	def test_other_programs_are_skipped(self):
+
+		catalog = self.parse("+prog sofimsha\ncabl no 267 na 1 ne 2\nend")
+		self.assertEqual(catalog.sections, {})
+
+	def test_comments(self):
+
+		catalog = self.parse("$ sect 3\n!*!Label sect 4\nsect 5 $ sect 6")
+		self.assertEqual(sorted(catalog.sections), [5])
+
+
+class AreaTest(unittest.TestCase):
+
+	def parse(self, text):
+
+		return cat.Catalog().parse_lines(text.splitlines(), ".")
+
+	def test_plates(self):
+
+		catalog = self.parse("let#t 10\nsect 1 mno 2 titl 'plates t 5'\nplat 101 yb -50[mm] zb 0 ye 50[mm] ze 0 t #t[mm]\n 102 ye 50 ze 100 t 5\nstee 2 gam 78.5")
+		self.assertAlmostEqual(catalog.get_area(1), (100 * 10 + 100 * 5) * 1e-6)
+		self.assertEqual(catalog.get_section_material(1), 2)
+		self.assertEqual(catalog.get_unit_weight(2), 78.5)
+
+	def test_plate_rows(self):
+
+		catalog = self.parse("sect 1\nplat no yb zb ye ze t\n 1 0 0 100 0 10\n 2 0 0 0 2*sin(30)*100 10\nsect 2\nplat 1 yb 0 zb 0 ye #unknown ze 0 t 1")
+		self.assertAlmostEqual(catalog.get_area(1), 2000 * 1e-6)
+		self.assertEqual(catalog.get_area(2), None)
+
+	def test_records(self):
+
+		catalog = self.parse("srec 1 400 200\ntube 2 d 100 t 10\ncabl 3 TYPE PG-5 d 20 mno 301 titl 'D 8'\nsect 4\nmate 5 e 70000")
+		self.assertAlmostEqual(catalog.get_area(1), 0.08)
+		self.assertAlmostEqual(catalog.get_area(2), 3.14159265 * (100 ** 2 - 80 ** 2) / 4 * 1e-6)
+		self.assertAlmostEqual(catalog.get_area(3), 3.14159265 * 100 * 1e-6)
+		self.assertEqual(catalog.get_section_material(3), 301)
+		self.assertEqual(catalog.get_area(4), None)
+		self.assertEqual(catalog.get_area(6), None)
+		self.assertEqual(catalog.get_unit_weight(5), None)
+
+	def test_example(self):
+
+		catalog = cat.load(os.path.join(EXAMPLES, "hudson-yards", "model.dat"))
+		# rectangular HSS 8 x 4 x 0.33 in, along the center line of its walls
+		self.assertAlmostEqual(catalog.get_area(10), 2 * (203.2 + 101.6 - 2 * 0.33 * 25.4) * 0.33 * 25.4 * 1e-6)
+		self.assertEqual(catalog.get_unit_weight(catalog.get_section_material(10)), 78.5)
+
+
+class ValidateTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.catalog = cat.Catalog().parse_lines(["sect 1", "cabl 301", "stee 1"], ".")
+
+	def test_valid(self):
+
+		self.assertEqual(self.catalog.validate("ncs 1 div 4"), [])
+		self.assertEqual(self.catalog.validate("ncs 1 ncse 301 mno 1"), [])
+
+	def test_dangling(self):
+
+		self.assertEqual(self.catalog.validate("ncs 5 drot -90"), ["ncs 5 not found in catalog sections"])
+		self.assertEqual(self.catalog.validate("mno 2"), ["mno 2 not found in catalog materials"])
+
+	def test_unrelated_properties(self):
+
+		self.assertEqual(self.catalog.validate("fix pp"), [])
+		self.assertEqual(self.catalog.validate("ncs #ncs"), [])
+		self.assertEqual(self.catalog.validate(""), [])
+
+
+class FileTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+	def write(self, name, text):
+
+		f = open(os.path.join(self.directory, name), "w")
+		f.write(text)
+		f.close()
+		return os.path.join(self.directory, name)
+
+	def test_example(self):
+
+		catalog = cat.load(os.path.join(EXAMPLES, "hudson-yards", "model.dat"))
+		self.assertEqual([n for n in [1, 10, 500, 308, 375] if n in catalog.sections], [1, 10, 500, 308, 375])
+		self.assertEqual(sorted(catalog.materials), [1, 2, 301, 302, 500, 800])
+		self.assertEqual(catalog._errors, [])
+
+	def test_include(self):
+
+		self.write("sections.dat", "sect 7")
+		path = self.write("model.dat", "+prog aqua\n#include sections.dat\nend\n#include missing.dat")
+		catalog = cat.load(path)
+		self.assertEqual(sorted(catalog.sections), [7])
+		self.assertEqual(len(catalog._errors), 1)
+
+	def test_ignore(self):
+
+		self.write("system.dat", "sect 7")
+		path = self.write("model.dat", "#include system.dat")
+		self.assertEqual(cat.load(path, [os.path.join(self.directory, "system.dat")]).sections, {})
+
+	def test_cache_ignore(self):
+
+		system = self.write("system.dat", "sect 7")
+		path = self.write("model.dat", "#include system.dat")
+		self.assertEqual(sorted(cat.load(path).sections), [7])
+		self.assertEqual(cat.load(path, [system]).sections, {})
+		self.assertEqual(sorted(cat.load(path).sections), [7])
+
+	def test_cache(self):
+
+		included = self.write("sections.dat", "sect 7")
+		path = self.write("model.dat", "#include sections.dat")
+		catalog = cat.load(path)
+		self.assertTrue(cat.load(path) is catalog)
+		self.write("sections.dat", "sect 8")
+		os.utime(included, (time.time() + 10, time.time() + 10))
+		self.assertEqual(sorted(cat.load(path).sections), [8])
+
+
+if __name__ == '__main__':
+
+	unittest.main()
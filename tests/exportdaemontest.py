@@ -0,0 +1,185 @@
+# base imports
+import sys
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import exportdaemon as ed
+import headlessdocument as hd
+import Giraffe
+import giraffe_configure as gc
+
+DOCUMENT = {
+	"objects": [
+		{"layer": "input::nodes", "type": "Point", "points": [[0, 0, 0]], "name": "1 [fix pp]", "id": "n1"},
+		{"layer": "input::beams::1 [ncs 1]", "type": "Curve", "points": [[0, 0, 0], [0, 0, 3]], "id": "b1"}
+	]
+}
+
+class DaemonTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, "system.giraffe.json")
+		self.daemon = ed.Daemon()
+		started = threading.Event()
+		self.thread = threading.Thread(target = self.daemon.serve, kwargs = {"port": 0, "ready": lambda daemon: started.set()})
+		self.thread.daemon = True
+		self.thread.start()
+		started.wait(5)
+
+	def tearDown(self):
+
+		if not self.daemon.stopped:
+			ed.send([{"op": "shutdown"}], self.daemon.port)
+		self.thread.join(5)
+		shutil.rmtree(self.directory)
+
+	def test_changes(self):
+
+		load, changes, status = ed.send([
+			{"op": "load", "path": self.path, "document": DOCUMENT},
+			{"op": "changes", "changes": [
+				{"kind": "update", "id": "b1", "object": {"layer": "input::beams::1 [ncs 1]", "type": "Curve", "points": [[0, 0, 0], [0, 0, 4]]}},
+				{"kind": "add", "id": "b2", "object": {"layer": "input::beams::1 [ncs 1]", "type": "Curve", "points": [[0, 0, 4], [5, 0, 4]]}}
+			]},
+			{"op": "status"}
+		], self.daemon.port)
+		self.assertTrue(load["ok"])
+		self.assertTrue("node no 1 x 0.0*#cf y 0.0*#cf z 0.0*#cf fix pp" in load["added"])
+		self.assertEqual(load["removed"], [])
+		self.assertTrue(changes["ok"])
+		self.assertTrue("node no 2 x 0.0*#cf y 0.0*#cf z 3.0*#cf " in changes["removed"])
+		self.assertEqual(len([line for line in changes["added"] if line.startswith("beam")]), 1)
+		self.assertEqual(status["elements"], {"nodes": 3, "single node springs": 0, "line elements": 2, "area elements": 0})
+		f = open(os.path.join(self.directory, "_system.dat"))
+		self.assertTrue("z 4.0*#cf" in f.read())
+		f.close()
+
+	def test_changed_records(self):
+
+		node = {"layer": "input::nodes", "type": "Point", "points": [[5, 0, 0]], "name": "2"}
+		load, changes = ed.send([
+			{"op": "load", "path": self.path, "document": DOCUMENT},
+			{"op": "changes", "changes": [{"kind": "add", "id": "n2", "object": node}], "write": False}
+		], self.daemon.port)
+		self.assertEqual(len(load["added"]), 3)
+		# the endpoint node makes way for the new node 2, the beam referencing it is exported again
+		self.assertEqual(changes["added"], ["beam no 1 na 1 ne 3 ", "node no 2 x 5.0*#cf y 0.0*#cf z 0.0*#cf ", "node no 3 x 0.0*#cf y 0.0*#cf z 3.0*#cf "])
+		self.assertEqual(changes["removed"], ["beam no 1 na 1 ne 2 ", "node no 2 x 0.0*#cf y 0.0*#cf z 3.0*#cf "])
+		f = open(os.path.join(self.directory, "_system.dat"))
+		self.assertFalse("node no 3" in f.read())
+		f.close()
+		self.assertEqual(ed.send([{"op": "export"}], self.daemon.port)[0]["added"], [])
+		f = open(os.path.join(self.directory, "_system.dat"))
+		self.assertTrue("beam no 1 na 1 ne 3" in f.read())
+		f.close()
+
+	def test_clients_served_concurrently(self):
+
+		# a client keeping its connection open does not hold up the others
+		idle = socket.create_connection(("127.0.0.1", self.daemon.port), 5)
+		try:
+			self.assertEqual(ed.send([{"op": "status"}], self.daemon.port, timeout = 5), [{"ok": False, "error": "No model loaded."}])
+		finally:
+			idle.close()
+
+	def test_invalid_changes(self):
+
+		beam = {"layer": "input::beams::1 [ncs 1]", "type": "Curve", "points": [[0, 0, 0], [0, 0, 4]]}
+		load, first, second, status = ed.send([
+			{"op": "load", "path": self.path, "document": DOCUMENT},
+			{"op": "changes", "changes": [{"kind": "delete", "id": "n1"}, {"kind": "update", "id": "b1"}]},
+			{"op": "changes", "changes": [{"kind": "update", "id": "b1", "object": beam}, {"kind": "add", "id": "b2", "object": {"type": "Curve"}}]},
+			{"op": "status"}
+		], self.daemon.port)
+		self.assertFalse(first["ok"])
+		self.assertFalse(second["ok"])
+		self.assertEqual(status["elements"], {"nodes": 2, "single node springs": 0, "line elements": 1, "area elements": 0})
+		self.assertTrue("n1" in self.daemon.document.objects)
+		self.assertFalse("b2" in self.daemon.document.objects)
+		self.assertEqual(self.daemon.document.objects["b1"]["points"][1], [0, 0, 3])
+
+	def test_block_instances(self):
+
+		ed.send([{"op": "load", "path": self.path, "document": DOCUMENT}], self.daemon.port)
+		doc = hd.HeadlessDocument("system.giraffe.json")
+		Giraffe.use_document(doc)
+		doc.add_block("frame", [doc.add_object(4, "frame", [[0, 0, 0], [0, 0, 1]])])
+		instance = doc.add_block_instance("input::beams::1 [ncs 1]", "frame", [[1, 0, 0, 5], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]])
+		beam = doc.add_object(4, "input::beams::1 [ncs 1]", [[0, 0, 3], [5, 0, 3]])
+		gc.expand_blocks = True
+		try:
+			client = ed.DaemonClient(self.daemon.port).apply_changes([("add", instance), ("add", beam)])
+			# the daemon runs in this process: give it its document back
+			Giraffe.use_document(self.daemon.document)
+			client()
+		finally:
+			gc.expand_blocks = False
+		self.assertEqual(client.changes, [])
+		self.assertEqual(self.daemon.members[instance], [[1, "input::beams::1 [ncs 1]", "", [[5, 0, 0], [5, 0, 1]], 0]])
+		status = ed.send([{"op": "status"}], self.daemon.port)[0]
+		self.assertEqual(status["elements"]["line elements"], 3)
+
+	def test_same_as_export(self):
+
+		# divided and meshed on the Rhino side, sent with the points of their elements
+		gc.divide_curves = True
+		gc.expand_blocks = True
+		doc = hd.HeadlessDocument.from_data({"blocks": {"frame": [{"layer": "frame", "type": "Curve", "points": [[0, 0, 0], [0, 0, 1]]}]}, "objects": [
+			{"layer": "input::beams::1 [seg 3]", "type": "Curve", "points": [[0, 0, 0], [2, 1, 0], [4, 0, 0]], "id": "n"},
+			{"layer": "input::beams::2", "type": "Curve", "points": [[0, 0, 0], [5, 5, 0], [10, 0, 0]], "arc": True, "id": "a"},
+			{"layer": "input::quads::1 [mesh 2x2]", "type": "Surface", "points": [[0, 0, 0], [0, 3, 0], [2, 0, 0], [2, 3, 1]], "id": "s"},
+			{"layer": "input::beams::3", "type": "Block", "block": "frame", "xform": [[1, 0, 0, 7], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]], "id": "b"}
+		]}, self.path)
+		# a curve that is neither line, polyline nor arc, divided at other points than its vertices
+		doc.IsPolyline = lambda obj: False
+		doc.DivideCurve = lambda obj, segments, create_points = False, return_points = True: [[0.0, 0.0, 0.0], [1.0, 0.8, 0.0], [3.0, 0.8, 0.0], [4.0, 0.0, 0.0]]
+		Giraffe.use_document(doc)
+		try:
+			expected = Giraffe.Export().export()
+			ed.DaemonClient(self.daemon.port).load()
+			f = open(os.path.join(self.directory, "_system.dat"))
+			output = f.read()
+			f.close()
+		finally:
+			gc.divide_curves = False
+			gc.expand_blocks = False
+		self.assertEqual(output, expected)
+		self.assertTrue("x 3.0*#cf y 0.8*#cf" in output)
+		self.assertTrue("quad no 4" in output)
+
+	def test_errors(self):
+
+		responses = ed.send([{"op": "export"}, {"op": "load", "path": os.path.join(self.directory, "missing.json")}, {"op": "shutdown"}], self.daemon.port)
+		self.assertEqual(responses[0], {"ok": False, "error": "No model loaded."})
+		self.assertFalse(responses[1]["ok"])
+		self.assertEqual(responses[2], {"ok": True})
+
+
+class DescribeObjectTest(unittest.TestCase):
+
+	def test_describe(self):
+
+		doc = hd.HeadlessDocument("system.giraffe.json")
+		Giraffe.use_document(doc)
+		arc = doc.add_object(4, "input::beams", [[1, 0, 0], [0, 1, 0], [-1, 0, 0]], "[ncs 1]", True)
+		data = ed.describe_object(arc, Giraffe.StructuralModel("structure"))
+		self.assertEqual((data["type"], data["name"], data["id"], data["arc"]), ("Curve", "[ncs 1]", arc, True))
+		self.assertEqual(data["points"][0], [1, 0, 0])
+		self.assertAlmostEqual(data["points"][1][1], 1.0, 4)
+		self.assertFalse("members" in data)
+		surface = doc.add_object(8, "input::quads::1 [mesh 1x2]", [[0, 0, 0], [0, 2, 0], [1, 0, 0], [1, 2, 0]])
+		data = ed.describe_object(surface, Giraffe.StructuralModel("structure"))
+		self.assertEqual(data["members"], [[0, "input::quads::1 [mesh 1x2]", "", [[0, 0, 0], [0, 1, 0], [0, 2, 0], [1, 0, 0], [1, 1, 0], [1, 2, 0]], 0]])
+
+
+if __name__ == '__main__':
+
+	unittest.main()
@@ -0,0 +1,872 @@
+# base imports
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import Giraffe
+import headlessdocument as hd
+import modelstore as ms
+import backgroundexport as bx
+import giraffe_configure as gc
+import buildfilter as bf
+
+class ModelTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+	def write(self, name, text):
+
+		f = open(os.path.join(self.directory, name), "w")
+		f.write(text)
+		f.close()
+		return os.path.join(self.directory, name)
+
+	def export(self, objects, callback = None, wait = False, unit_system = None, blocks = None):
+
+		document = {"objects": objects}
+		if blocks is not None:
+			document["blocks"] = blocks
+		if unit_system is not None:
+			document["unit_system"] = unit_system
+		path = self.write("system.giraffe.json", json.dumps(document))
+		Giraffe.use_document(hd.HeadlessDocument.load(path))
+		Giraffe.Export(callback = callback)
+		if wait:
+			bx.get_current().wait(5)
+		f = open(os.path.join(self.directory, "_system.dat"))
+		output = f.read()
+		f.close()
+		return output
+
+
+class CatalogTest(ModelTest):
+
+	def test_dangling_references(self):
+
+		self.write("model.dat", "+prog aqua\nsect 1\nstee 1\nend\n#include _system.dat")
+		gc.catalog_file = "model.dat"
+		try:
+			output = self.export([
+				{"layer": "input::beams::1 [ncs 1]", "type": "Curve", "points": [[0, 0, 0], [1, 0, 0]]},
+				{"layer": "input::beams::2 [ncs 2]", "type": "Curve", "points": [[1, 0, 0], [2, 0, 0]], "name": "[mno 3]"}
+			])
+		finally:
+			gc.catalog_file = None
+		self.assertTrue("$ Unknown reference in layer input::beams::2 [ncs 2]: ncs 2 not found in catalog sections.\n" in output)
+		self.assertTrue("$ Unknown reference in beam 2: mno 3 not found in catalog materials.\n" in output)
+		self.assertFalse("layer input::beams::1" in output)
+
+	def test_without_catalog(self):
+
+		gc.catalog_file = "model.dat"
+		try:
+			output = self.export([{"layer": "input::beams::2 [ncs 2]", "type": "Curve", "points": [[1, 0, 0], [2, 0, 0]]}])
+		finally:
+			gc.catalog_file = None
+		self.assertFalse("Unknown reference" in output)
+
+	def test_off_by_default(self):
+
+		self.write("model.dat", "+prog aqua\nsect 1\nend")
+		output = self.export([{"layer": "input::beams::2 [ncs 2]", "type": "Curve", "points": [[1, 0, 0], [2, 0, 0]]}])
+		self.assertFalse("Unknown reference" in output)
+
+
+class LayerExportTest(ModelTest):
+
+	def build(self, store = None):
+
+		doc = hd.HeadlessDocument(os.path.join(self.directory, "system.giraffe.json"))
+		doc.add_object(1, "input::nodes", [[0, 0, 0]], "1")
+		doc.add_object(4, "input::beams", [[1, 0, 0], [2, 0, 0]])
+		Giraffe.use_document(doc)
+		Giraffe.GiraffeLayer.setup()
+		model = Giraffe.StructuralModel("structure", store = store).build()
+		# node added after the line endpoints, elements of the two node layers are interleaved
+		model.apply_changes([("add", doc.add_object(1, "input::nodes", [[5, 0, 0]], "5"))])
+		return model
+
+	def check(self, model):
+
+		output = "".join(model.nodes.iter_export())
+		self.assertEqual(output.count("!*!Label nodes"), 2)
+		self.assertEqual(output.count("added and numbered by Giraffe"), 1)
+		self.assertTrue(output.index("node no 5") < output.index("added and numbered by Giraffe"))
+
+	def test_single_header_per_layer(self):
+
+		self.check(self.build())
+
+	def test_single_header_per_layer_stored(self):
+
+		store = ms.SQLiteStore()
+		self.check(self.build(store))
+		store.close()
+
+	def test_header_computed_once(self):
+
+		layer = Giraffe.GiraffeLayer("input::beams::2 [ncs 1]")
+		self.assertTrue(layer.export() is layer.export())
+
+
+class BackgroundExportTest(ModelTest):
+
+	def test_same_as_foreground(self):
+
+		objects = [{"layer": "input::beams", "type": "Curve", "points": [[0, 0, 0], [1, 0, 0]]}]
+		expected = self.export(objects)
+		gc.background_export = True
+		try:
+			statuses = []
+			output = self.export(objects, lambda job: statuses.append(job.status), wait = True)
+		finally:
+			gc.background_export = False
+		self.assertEqual(output, expected)
+		self.assertEqual(statuses, [bx.STARTED, bx.DONE])
+
+	def test_out_of_core(self):
+
+		objects = [{"layer": "input::beams", "type": "Curve", "points": [[0, 0, 0], [1, 0, 0]]}]
+		expected = self.export(objects)
+		gc.background_export = True
+		gc.out_of_core = True
+		try:
+			output = self.export(objects, wait = True)
+		finally:
+			gc.background_export = False
+			gc.out_of_core = False
+		self.assertEqual(output, expected)
+		# the store file is removed once written
+		self.assertEqual([name for name in os.listdir(self.directory) if name.endswith(".sqlite")], [])
+
+
+class CompactExportTest(ModelTest):
+
+	def test_format_number(self):
+
+		self.assertEqual(Giraffe.format_number(2.0), "2")
+		self.assertEqual(Giraffe.format_number(-0.0), "0")
+		self.assertEqual(Giraffe.format_number(0.1 * 3), repr(0.1 * 3))
+
+	def test_same_values(self):
+
+		objects = [{"layer": "input::beams", "type": "Curve", "points": [[136.14255, 0, 0], [1000, 3.1, -2]], "name": "{b}"}]
+		self.write("system.giraffe.json", json.dumps({"unit_system": 2, "objects": objects}))
+		Giraffe.use_document(hd.HeadlessDocument.load(os.path.join(self.directory, "system.giraffe.json")))
+		expected = Giraffe.Export().export()
+		gc.compact_export = True
+		try:
+			output = Giraffe.Export().export()
+		finally:
+			gc.compact_export = False
+		self.assertFalse("*#cf" in output)
+		self.assertFalse(" \n" in output)
+		self.assertTrue("beam no 1 na 1 ne 2 $ b\n" in output)
+		nodes = [line.split() for line in expected.splitlines() if line.startswith("node")]
+		compact = [line.split() for line in output.splitlines() if line.startswith("node")]
+		for a, b in zip(nodes, compact):
+			for i in [4, 6, 8]:
+				self.assertEqual(float(a[i][:-len("*#cf")]) * 0.001, float(b[i]))
+
+
+class ExportFormatsTest(ModelTest):
+
+	def read(self, name):
+
+		f = open(os.path.join(self.directory, name))
+		text = f.read()
+		f.close()
+		return text
+
+	def test_single_pass(self):
+
+		objects = [
+			{"layer": "input::beams::1 [ncs 1]", "type": "Curve", "points": [[0, 0, 0], [1000, 0, 0]], "name": "{b, c}"},
+			{"layer": "input::nodes", "type": "Point", "points": [[0, 0, 0]], "name": "[fix pp]"}
+		]
+		expected = self.export(objects, unit_system = 2)
+		gc.export_formats = ["jsonl", "csv"]
+		try:
+			output = self.export(objects, unit_system = 2)
+		finally:
+			gc.export_formats = []
+		self.assertEqual(output, expected)
+		records = [json.loads(line) for line in self.read("_system.jsonl").splitlines()]
+		self.assertEqual(records[0]["gdiv"], 1000)
+		beams = [record for record in records if record.get("list") == "line elements"]
+		self.assertEqual(len(beams), 1)
+		self.assertEqual((beams[0]["grp"], beams[0]["n1"], beams[0]["n2"], beams[0]["name"]), (1, 1, 2, "b, c"))
+		nodes = [record for record in records if record.get("list") == "nodes"]
+		self.assertEqual(sorted([node["x"] for node in nodes]), [0.0, 1.0])
+		rows = self.read("_system.csv").splitlines()
+		self.assertTrue(rows[0].startswith("list,typ,no,grp,layer,prop,name,x,y,z"))
+		self.assertEqual(len(rows), 1 + len(nodes) + len(beams))
+		self.assertTrue('"b, c"' in rows[-1])
+
+
+class RenumberingTest(ModelTest):
+
+	def chain(self):
+
+		# a chain of beams drawn in an order unrelated to the connections
+		xs = [0, 5000, 1000, 4000, 2000, 3000]
+		objects = [{"layer": "input::beams::2", "type": "Curve", "points": [[min(a, b), 0, 0], [max(a, b), 0, 0]]} for a, b in zip(xs, xs[1:])]
+		objects.append({"layer": "input::nodes", "type": "Point", "points": [[0, 0, 0]], "name": "7"})
+		return objects
+
+	def test_renumber(self):
+
+		gc.bandwidth_renumbering = True
+		try:
+			output = self.export(self.chain())
+		finally:
+			gc.bandwidth_renumbering = False
+		self.assertTrue("$ node bandwidth 2 (6 before renumbering)\n" in output)
+		nodes = dict([(float(line.split()[4][:-len("*#cf")]), int(line.split()[2])) for line in output.splitlines() if line.startswith("node")])
+		self.assertEqual(nodes[0.0], 7)
+		self.assertEqual(sorted(nodes.values()), [1, 2, 3, 4, 5, 7])
+		# nodes connected in a chain have consecutive numbers
+		self.assertEqual([nodes[x] for x in [5000.0, 1000.0, 4000.0, 2000.0, 3000.0]], [5, 4, 3, 2, 1])
+		beams = [line.split() for line in output.splitlines() if line.startswith("beam")]
+		self.assertEqual(sorted([int(beam[2]) for beam in beams]), [1, 2, 3, 4, 5])
+		for beam in beams:
+			self.assertEqual(max(int(beam[4]), int(beam[6])) == 7 or abs(int(beam[4]) - int(beam[6])) == 1, True)
+
+	def test_group_blocks(self):
+
+		gc.bandwidth_renumbering = True
+		gc.group_blocks = True
+		try:
+			output = self.export(self.chain())
+		finally:
+			gc.bandwidth_renumbering = False
+			gc.group_blocks = False
+		beams = [int(line.split()[2]) for line in output.splitlines() if line.startswith("beam")]
+		self.assertEqual(sorted(beams), [2000, 2001, 2002, 2003, 2004])
+
+
+class CompactNumberingTest(unittest.TestCase):
+
+	def add_node(self, element_list, no, strict = False):
+
+		node = Giraffe.Node(None, [len(element_list._list), 0, 0])
+		node.no = no
+		node.strict_naming = strict
+		return element_list.add(node)
+
+	def test_compact(self):
+
+		element_list = Giraffe.ElementList("nodes")
+		nodes = [self.add_node(element_list, no, no == 2) for no in [9, 2, 40, 5]]
+		self.assertEqual(element_list.compact(), [(-1, 5, 1), (-1, 9, 3), (-1, 40, 4)])
+		self.assertEqual([node.no for node in nodes], [3, 2, 4, 1])
+		self.assertTrue(element_list.is_registered(nodes[2]))
+		self.assertFalse(element_list.is_taken_number(40))
+		self.assertEqual(element_list.get_available_number(), 5)
+
+	def test_blocks(self):
+
+		element_list = Giraffe.ElementList("nodes")
+		element_list.block_size = 10
+		node = self.add_node(element_list, 17)
+		node.layer = Giraffe.GiraffeLayer("input::nodes::1")
+		self.assertEqual(element_list.compact(), [(-1, 17, 10)])
+
+
+class CompactNumberingExportTest(ModelTest):
+
+	def test_export(self):
+
+		# numbers are kept between runs: removing the first beam leaves a gap
+		beams = [{"layer": "input::beams::1", "type": "Curve", "points": [[1000 * i, 0, 0], [1000 * (i + 1), 0, 0]]} for i in range(3)]
+		strict = {"layer": "input::nodes", "type": "Point", "points": [[0, 5000, 0]], "name": "3"}
+		nodes = lambda text: sorted([int(line.split()[2]) for line in text.splitlines() if line.startswith("node")])
+		gc.stable_numbering = True
+		try:
+			self.export(beams + [strict])
+			self.assertEqual(nodes(self.export(beams[1:] + [strict])), [2, 3, 4, 5])
+			gc.compact_numbering = True
+			output = self.export(beams[1:] + [strict])
+		finally:
+			gc.stable_numbering = False
+			gc.compact_numbering = False
+		self.assertEqual(nodes(output), [1, 2, 3, 4])
+		f = open(os.path.join(self.directory, "_system.renumber.csv"))
+		rows = f.read().splitlines()
+		f.close()
+		self.assertEqual(rows, ["list,grp,old,new", "nodes,-1,2,1", "nodes,-1,4,2", "nodes,-1,5,4"])
+		self.assertTrue("$ numbers compacted, 3 changed (see .renumber.csv)\n" in output)
+
+
+class LoopExportTest(ModelTest):
+
+	def expand(self, output):
+
+		# runs the loops of the export, as sofimsha would
+		lines = []
+		variables = {}
+		body = None
+		for line in output.splitlines():
+			if line.startswith("let#gl") and body is None:
+				name, expression = line[len("let"):].split(" ")
+				variables[name] = float(expression)
+			elif line.startswith("loop "):
+				count, body = int(line.split()[1]), []
+			elif line == "endloop":
+				for i in range(count):
+					for record in body:
+						if record.startswith("let#gl"):
+							name, expression = record[len("let"):].split(" ")
+							variables[name] += float(expression[len(name):])
+						else:
+							lines.append(" ".join([self.substitute(token, variables) for token in record.split(" ")]))
+				body = None
+			elif body is not None:
+				body.append(line)
+			else:
+				lines.append(line)
+		return lines
+
+	def substitute(self, token, variables):
+
+		name = token.split("*")[0]
+		if name in variables:
+			return token.replace(name, repr(variables[name]))
+		return token
+
+	def values(self, lines):
+
+		# records with numbers read as floats, in any order
+		records = []
+		for line in lines:
+			if line.split(" ")[0] in ["node", "beam", "quad"]:
+				records.append(tuple([float(token.split("*")[0]) if token[:1].isdigit() or token[:1] == "-" else token for token in line.split(" ")]))
+		return sorted(records)
+
+	def test_grid(self):
+
+		objects = [{"layer": "input::beams::2", "type": "Curve", "points": [[0, 0, 100 * i] for i in range(30)]}]
+		objects += [{"layer": "input::nodes", "type": "Point", "points": [[2000, 250.5 * i, 0]]} for i in range(8)]
+		gc.divide_curves = True
+		try:
+			expected = self.export(objects)
+			gc.loop_export = True
+			output = self.export(objects)
+		finally:
+			gc.divide_curves = False
+			gc.loop_export = False
+		self.assertTrue("loop 8\nnode no #gl0 x 2000.0*#cf y #gl2*#cf z 0.0*#cf \n" in output)
+		self.assertTrue(len(output) < len(expected) / 2)
+		self.assertEqual(self.values(self.expand(output)), self.values(expected.splitlines()))
+
+
+class SplitIntersectionsTest(ModelTest):
+
+	def test_crossing_beams(self):
+
+		objects = [
+			{"layer": "input::beams::1", "type": "Curve", "points": [[0, 0, 0], [2000, 0, 0]], "name": "5 [ncs 1] {b}"},
+			{"layer": "input::beams::1", "type": "Curve", "points": [[1000, -1000, 0], [1000, 1000, 0]]},
+			{"layer": "input::cables", "type": "Curve", "points": [[500, -1000, 0], [500, 1000, 0]]}
+		]
+		gc.split_intersections = True
+		try:
+			output = self.export(objects)
+		finally:
+			gc.split_intersections = False
+		nodes = [line.split() for line in output.splitlines() if line.startswith("node")]
+		self.assertEqual(len(nodes), 8)
+		beams = [line for line in output.splitlines() if line.startswith("beam")]
+		self.assertEqual(len(beams), 5)
+		self.assertTrue(beams[0].startswith("beam no 5 "))
+		self.assertEqual(len([beam for beam in beams if beam.endswith("ncs 1$ b")]), 3)
+		self.assertEqual(len([line for line in output.splitlines() if line.startswith("cabl")]), 2)
+
+	def test_off(self):
+
+		output = self.export([
+			{"layer": "input::beams", "type": "Curve", "points": [[0, 0, 0], [2000, 0, 0]]},
+			{"layer": "input::beams", "type": "Curve", "points": [[1000, -1000, 0], [1000, 1000, 0]]}
+		])
+		self.assertEqual(len([line for line in output.splitlines() if line.startswith("beam")]), 2)
+
+
+class SplitAtNodesTest(ModelTest):
+
+	def test_t_junctions(self):
+
+		objects = [
+			{"layer": "input::beams", "type": "Curve", "points": [[0, 0, 0], [3000, 0, 0]]},
+			{"layer": "input::beams", "type": "Curve", "points": [[1000, 0, 0], [1000, 1000, 0]]},
+			{"layer": "input::nodes", "type": "Point", "points": [[2000, 0.01, 0]], "name": "20 [fix pp]"}
+		]
+		gc.split_at_nodes = True
+		try:
+			output = self.export(objects)
+		finally:
+			gc.split_at_nodes = False
+		self.assertEqual(len([line for line in output.splitlines() if line.startswith("node")]), 5)
+		beams = [line.split() for line in output.splitlines() if line.startswith("beam")]
+		self.assertEqual(len(beams), 4)
+		self.assertTrue(["beam", "no", "3", "na", "3", "ne", "20"] in [beam[:7] for beam in beams])
+
+
+class CurveTest(ModelTest):
+
+	def setUp(self):
+
+		ModelTest.setUp(self)
+		gc.divide_curves = True
+
+	def tearDown(self):
+
+		gc.divide_curves = False
+		ModelTest.tearDown(self)
+
+	def elements(self, output, typ):
+
+		return [line.split() for line in output.splitlines() if line.startswith(typ + " no")]
+
+	def test_arc(self):
+
+		output = self.export([{"layer": "input::cables", "type": "Curve", "points": [[0, 0, 0], [5, 5, 0], [10, 0, 0]], "arc": True}])
+		cables = self.elements(output, "cabl")
+		# sagitta within 0.01 m for a radius of 5 m: at least 25 chords, halved down to 32
+		self.assertEqual(len(cables), 32)
+		self.assertEqual([cable[4] for cable in cables[1:]], [cable[6] for cable in cables[:-1]])
+		nodes = dict([(line[2], [float(line[i][:-len("*#cf")]) for i in [4, 6, 8]]) for line in self.elements(output, "node")])
+		for node in nodes.values():
+			self.assertAlmostEqual(((node[0] - 5) ** 2 + node[1] ** 2) ** 0.5, 5.0, 4)
+
+	def test_segments(self):
+
+		output = self.export([
+			{"layer": "input::beams::1 [seg 4 ncs 1]", "type": "Curve", "points": [[0, 0, 0], [0, 0, 4], [4, 0, 4]], "name": "3"},
+			{"layer": "input::beams::2 [seg 2]", "type": "Curve", "points": [[0, 0, 0], [5, 5, 0], [10, 0, 0]], "arc": True}
+		])
+		self.assertTrue("beam prop ncs 1\n" in output)
+		self.assertFalse("seg" in output)
+		beams = self.elements(output, "beam")
+		self.assertEqual(len(beams), 10)
+		self.assertEqual(beams[0][2], "3")
+		self.assertTrue(" x 5.0*#cf y 5.0*#cf z 0.0*#cf " in output)
+
+	def test_polyline(self):
+
+		output = self.export([
+			{"layer": "input::trusses", "type": "Curve", "points": [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 0, 0]]},
+			{"layer": "input::trusses", "type": "Curve", "points": [[1, 1, 0], [1, 2, 0]]}
+		])
+		trusses = self.elements(output, "trus")
+		self.assertEqual([truss[4:7:2] for truss in trusses], [["1", "2"], ["2", "3"], ["3", "1"], ["3", "4"]])
+
+
+class UndividedCurveTest(ModelTest):
+
+	def test_default(self):
+
+		# without divide_curves, every curve is a single element from start to end, as before curves were divided
+		path = self.write("system.giraffe.json", json.dumps({"objects": [
+			{"layer": "input::cables", "type": "Curve", "points": [[0, 0, 0], [5, 5, 0], [10, 0, 0]], "arc": True},
+			{"layer": "input::beams", "type": "Curve", "points": [[0, 0, 5], [1, 0, 5], [1, 1, 5]]},
+			{"layer": "input::beams", "type": "Curve", "points": [[0, 0, 9], [3, 2, 9], [6, 0, 9]], "id": "n"}
+		]}))
+		doc = hd.HeadlessDocument.load(path)
+		# neither a line, nor a polyline, nor an arc, as NURBS curves in Rhino
+		is_polyline = doc.IsPolyline
+		doc.IsPolyline = lambda obj: (obj != "n") and is_polyline(obj)
+		Giraffe.use_document(doc)
+		output = Giraffe.Export().export()
+		nodes = dict([(line.split()[2], tuple([float(line.split()[i][:-len("*#cf")]) for i in [4, 6, 8]])) for line in output.splitlines() if line.startswith("node")])
+		elements = [line.split() for line in output.splitlines() if line.startswith("cabl no") or line.startswith("beam no")]
+		self.assertEqual(len(nodes), 6)
+		self.assertEqual(sorted([(element[0], nodes[element[4]], nodes[element[6]]) for element in elements]), [
+			("beam", (0.0, 0.0, 5.0), (1.0, 1.0, 5.0)),
+			("beam", (0.0, 0.0, 9.0), (6.0, 0.0, 9.0)),
+			("cabl", (0.0, 0.0, 0.0), (10.0, 0.0, 0.0))
+		])
+
+
+class MeshTest(ModelTest):
+
+	def test_mesh(self):
+
+		output = self.export([
+			{"layer": "input::quads::1 [mesh 2x3 ncs 1]", "type": "Surface", "points": [[0, 0, 0], [0, 3, 0], [2, 0, 0], [2, 3, 0]], "name": "7"},
+			{"layer": "input::quads", "type": "Surface", "points": [[2, 0, 0], [2, 3, 0], [3, 0, 0], [3, 3, 0]]}
+		])
+		self.assertTrue("quad prop ncs 1\n" in output)
+		self.assertFalse("mesh" in output)
+		nodes = dict([(tuple([float(line.split()[i][:-len("*#cf")]) for i in [4, 6]]), line.split()[2]) for line in output.splitlines() if line.startswith("node")])
+		self.assertEqual(len(nodes), 12 + 2)
+		quads = [line.split() for line in output.splitlines() if line.startswith("quad no")]
+		self.assertEqual(len(quads), 7)
+		quads = dict([(quad[2], quad[4:12:2]) for quad in quads])
+		corners = [(0, 0), (0, 1), (1, 1), (1, 0)]
+		self.assertEqual(quads["7"], [nodes[(float(x), float(y))] for x, y in corners])
+		# the single quad shares the edge of the mesh
+		single = [quad for quad in quads.values() if nodes[(3.0, 0.0)] in quad][0]
+		self.assertEqual(single, [nodes[(2.0, 0.0)], nodes[(2.0, 3.0)], nodes[(3.0, 3.0)], nodes[(3.0, 0.0)]])
+
+
+class TakeoffExportTest(ModelTest):
+
+	def test_takeoff(self):
+
+		self.write("model.dat", "+prog aqua\nstee 1 gam 78.5\nsrec 1 h 100 b 100 mno 1\nend\n#include _system.dat")
+		gc.export_formats = ["takeoff"]
+		gc.catalog_file = "model.dat"
+		try:
+			self.export([
+				{"layer": "input::beams::1 [ncs 1]", "type": "Curve", "points": [[0, 0, 0], [2000, 0, 0]]},
+				{"layer": "input::beams::1 [ncs 1]", "type": "Curve", "points": [[2000, 0, 0], [2000, 3000, 0]]},
+				{"layer": "input::nodes", "type": "Point", "points": [[0, 0, 0]], "name": "[fix pp]"}
+			], unit_system = 2)
+		finally:
+			gc.export_formats = []
+			gc.catalog_file = None
+		f = open(os.path.join(self.directory, "_system.takeoff.csv"))
+		rows = f.read().splitlines()
+		f.close()
+		self.assertEqual(rows[0], "list,grp,prop,count,length,area,weight,mass")
+		self.assertEqual(len(rows), 2)
+		row = rows[1].split(",")
+		self.assertEqual(row[:4], ["line elements", "1", "ncs 1", "2"])
+		self.assertAlmostEqual(float(row[4]), 5.0)
+		self.assertAlmostEqual(float(row[6]), 5.0 * 0.01 * 78.5)
+
+
+class BlocksTest(ModelTest):
+
+	blocks = {
+		"frame": [
+			{"layer": "default", "type": "Curve", "points": [[0, 0, 0], [0, 0, 3]], "name": "[ncs 2]"},
+			{"layer": "input::nodes", "type": "Point", "points": [[0, 0, 0]], "name": "5 [fix pp]"},
+			{"layer": "default", "type": "Point", "points": [[0, 0, 3]]}
+		]
+	}
+
+	def translation(self, x):
+
+		return [[1, 0, 0, x], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+	def test_expand(self):
+
+		objects = [
+			{"layer": "input::beams::1", "type": "Block", "block": "frame", "xform": self.translation(0)},
+			{"layer": "input::beams::1", "type": "Block", "block": "frame", "xform": self.translation(5), "name": "grp 2 no 100"}
+		]
+		gc.expand_blocks = True
+		try:
+			output = self.export(objects, blocks = self.blocks)
+		finally:
+			gc.expand_blocks = False
+		nodes = [line.split() for line in output.splitlines() if line.startswith("node no")]
+		self.assertEqual(sorted([(node[2], node[4], node[8]) for node in nodes if node[2] in ["5", "105"]]), [("105", "5.0*#cf", "0.0*#cf"), ("5", "0.0*#cf", "0.0*#cf")])
+		# the point of the definition on a layer that is not structural takes the layer of the instance, where points are not allowed
+		self.assertEqual(len(nodes), 4)
+		beams = [line.split() for line in output.splitlines() if line.startswith("beam no")]
+		self.assertEqual(len(beams), 2)
+		self.assertTrue(all([beam[-2:] == ["ncs", "2"] for beam in beams]))
+		# the group offset applies to objects on their own structural layer too
+		self.assertTrue("grp 3\nbeam no 2 na 105 ne 3 ncs 2" in output)
+		self.assertTrue("grp 2\nnode no 105" in output)
+
+	def test_not_expanded(self):
+
+		output = self.export([{"layer": "input::beams", "type": "Block", "block": "frame"}], blocks = self.blocks)
+		self.assertFalse("beam no" in output)
+
+	def test_definition_read_once(self):
+
+		doc = hd.HeadlessDocument(os.path.join(self.directory, "system.giraffe.json"))
+		doc.add_block("frame", [doc.add_object(4, "default", [[0, 0, 0], [1, 0, 0]])])
+		for x in range(3):
+			doc.add_block_instance("input::beams", "frame", self.translation(x))
+		reads = []
+		block_objects = doc.BlockObjects
+		doc.BlockObjects = lambda name: reads.append(name) or block_objects(name)
+		Giraffe.use_document(doc)
+		gc.expand_blocks = True
+		try:
+			model = Giraffe.StructuralModel("test", 1.0)
+			model.add_objects_from_layer(model.get_layer("input::beams"))
+		finally:
+			gc.expand_blocks = False
+		self.assertEqual(reads, ["frame"])
+		self.assertEqual(len(list(model.line_elements.iterate())), 3)
+		self.assertEqual(sorted([n.x for n in model.nodes.iterate()]), [0, 1, 2, 3])
+
+
+class GroupBlockTest(unittest.TestCase):
+
+	def add_nodes(self, element_list, count, grp):
+
+		nodes = []
+		for i in range(count):
+			node = Giraffe.Node(None, [len(element_list._list), grp, 0])
+			node.layer = Giraffe.GiraffeLayer("input::nodes::" + str(grp)) if grp != -1 else None
+			nodes.append(element_list.add(node))
+		return nodes
+
+	def test_numbers_in_block(self):
+
+		element_list = Giraffe.ElementList("nodes")
+		element_list.block_size = 10
+		self.assertEqual([node.no for node in self.add_nodes(element_list, 3, -1)], [1, 2, 3])
+		self.assertEqual([node.no for node in self.add_nodes(element_list, 2, 2)], [20, 21])
+		self.assertEqual([node.no for node in self.add_nodes(element_list, 2, 1)], [10, 11])
+		self.assertEqual(element_list._errors, [])
+
+	def test_overflow(self):
+
+		element_list = Giraffe.ElementList("nodes")
+		element_list.block_size = 10
+		self.assertEqual(self.add_nodes(element_list, 11, 1)[-1].no, 20)
+		self.add_nodes(element_list, 1, 1)
+		self.assertEqual(element_list._errors, ["Number block of group 1 (10 to 19) full, nodes numbered beyond 19 belong to group 2 in SOFiSTiK."])
+
+	def test_conflict(self):
+
+		element_list = Giraffe.ElementList("nodes")
+		nodes = self.add_nodes(element_list, 2, -1)
+		strict = Giraffe.Node(None, [5, 0, 0])
+		strict.no = 2
+		strict.strict_naming = True
+		element_list.add(strict)
+		self.assertEqual([node.no for node in nodes + [strict]], [1, 3, 2])
+		self.assertTrue(element_list.is_registered(nodes[1]))
+		self.assertEqual(element_list.get_available_number(), 4)
+
+	def test_not_blocked(self):
+
+		element_list = Giraffe.ElementList("nodes")
+		self.assertEqual([node.no for node in self.add_nodes(element_list, 2, 2)], [1, 2])
+
+
+class GroupBlockExportTest(ModelTest):
+
+	def test_export(self):
+
+		gc.group_blocks = True
+		try:
+			output = self.export([{"layer": "input::beams::3 {b}", "type": "Curve", "points": [[0, 0, 0], [1, 0, 0]]}])
+		finally:
+			gc.group_blocks = False
+		self.assertTrue("beam no 3000 na 1 ne 2" in output)
+		self.assertTrue("gdiv 1000\n" in output)
+
+
+class BinaryModelTest(ModelTest):
+
+	def test_round_trip(self):
+
+		objects = [{"layer": "input::beams::1", "type": "Curve", "points": [[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 1, 0]]}]
+		gc.binary_export = True
+		gc.divide_curves = True
+		try:
+			self.export(objects)
+		finally:
+			gc.binary_export = False
+			gc.divide_curves = False
+		model = Giraffe.StructuralModel.from_binary_file(os.path.join(self.directory, "_system.gmb"))
+		beams = list(model.line_elements.iterate())
+		self.assertEqual([beam.segment for beam in beams], [0, 1, 2])
+		self.assertEqual(len(set([beam.geo for beam in beams])), 1)
+		self.assertFalse(" " in beams[0].geo)
+		self.assertEqual(beams[2].get_key(), beams[0].geo + " 2")
+		self.assertEqual([node.geo for node in model.nodes.iterate()], [None] * 4)
+
+	def test_split_key(self):
+
+		self.assertEqual(Giraffe.split_key("a m3 2"), ("a", 2, 3))
+		self.assertEqual(Giraffe.split_key("a"), ("a", 0, 0))
+
+
+class PartialExportTest(ModelTest):
+
+	objects = [
+		{"layer": "input::nodes", "type": "Point", "points": [[0, 0, 0]], "name": "7 [fix f]"},
+		{"layer": "input::beams::1 [ncs 1] {columns}", "type": "Curve", "points": [[0, 0, 0], [0, 0, 3]]},
+		{"layer": "input::beams::1 [ncs 1] {columns}", "type": "Curve", "points": [[5, 0, 0], [5, 0, 3]]},
+		{"layer": "input::beams::2 [ncs 2] {deck}", "type": "Curve", "points": [[0, 0, 3], [5, 0, 3]], "selected": True}
+	]
+
+	changed = objects + [{"layer": "input::beams::2 [ncs 2] {deck}", "type": "Curve", "points": [[0, 0, 3], [2.5, 0, 4]], "selected": True}]
+
+	def load(self, objects):
+
+		path = self.write("system.giraffe.json", json.dumps({"objects": objects}))
+		Giraffe.use_document(hd.HeadlessDocument.load(path))
+
+	def read(self, name):
+
+		f = open(os.path.join(self.directory, name))
+		text = f.read()
+		f.close()
+		return text
+
+	def export_index(self):
+
+		self.load(self.objects)
+		gc.binary_export = True
+		try:
+			Giraffe.Export()
+		finally:
+			gc.binary_export = False
+
+	def test_include(self):
+
+		self.export_index()
+		full = self.read("_system.dat")
+		self.load(self.changed)
+		Giraffe.ExportPart(bf.BuildFilter(groups = [2, 2]))
+		part = self.read("_system.partial.dat")
+		self.assertEqual(self.read("_system.dat"), full)
+		self.assertFalse("grp 1" in part)
+		self.assertTrue("beam no 3 na 1 ne 3 \nbeam no 4 na 1 ne 4 \n" in part)
+		self.assertTrue("node no 4 x 2.5*#cf" in part)
+		self.assertFalse("node no 7" in part)
+
+	def test_merge_same_as_full_export(self):
+
+		self.export_index()
+		self.load(self.changed)
+		Giraffe.ExportPart(bf.BuildFilter(layer = "input::beams::2 [ncs 2] {deck}"), merge = True)
+		merged = self.read("_system.dat")
+		self.load(self.changed)
+		self.assertEqual(merged, Giraffe.Export().export())
+
+	def test_selection(self):
+
+		self.export_index()
+		self.load(self.changed)
+		gc.partial_selection = True
+		try:
+			Giraffe.Export()
+		finally:
+			gc.partial_selection = False
+		self.assertTrue("beam no 4 na 1 ne 4" in self.read("_system.partial.dat"))
+
+	def test_changed_polyline(self):
+
+		# every piece of the changed polyline is replaced, none of the old pieces stays in the merged export
+		polyline = {"layer": "input::beams::2", "type": "Curve", "points": [[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 0, 0]], "id": "p", "selected": True}
+		changed = dict(polyline, points = [[0, 0, 0], [1, 0, 1], [2, 0, 1], [3, 0, 0]])
+		self.objects = [polyline]
+		gc.divide_curves = True
+		try:
+			self.export_index()
+			self.load([changed])
+			gc.partial_selection = True
+			gc.partial_merge = True
+			gc.stable_numbering = True
+			Giraffe.Export()
+			merged = self.read("_system.dat")
+			self.load([changed])
+			full = Giraffe.Export().export()
+		finally:
+			gc.partial_selection = False
+			gc.partial_merge = False
+			gc.stable_numbering = False
+			gc.divide_curves = False
+		self.assertEqual(len([line for line in merged.splitlines() if line.startswith("beam")]), 3)
+		# nodes kept from the index come before the new ones
+		self.assertEqual(sorted(merged.splitlines()), sorted(full.splitlines()))
+
+	def build_part(self, store = None):
+
+		self.load(self.objects)
+		Giraffe.GiraffeLayer.setup()
+		model = Giraffe.StructuralModel("structure", store = store).build()
+		self.load(self.changed)
+		Giraffe.GiraffeLayer.setup()
+		try:
+			model.build_part(bf.BuildFilter(groups = [2, 2]))
+		finally:
+			Giraffe.GiraffeLayer.teardown()
+		return "".join(model.iter_export(model.part))
+
+	def test_part_stored(self):
+
+		store = ms.SQLiteStore()
+		try:
+			part = self.build_part(store)
+		finally:
+			store.close()
+		self.assertEqual(part, self.build_part())
+		self.assertTrue("beam no 4 na 1 ne 4" in part)
+		self.assertFalse("grp 1" in part)
+
+	def records(self, text):
+
+		# records in any order, without comments (renumbering notes differ between runs)
+		return sorted([line for line in text.splitlines() if line and not line.startswith("$")])
+
+	def test_merge_with_stages(self):
+
+		gc.bandwidth_renumbering = True
+		gc.compact_numbering = True
+		try:
+			self.export_index()
+			self.load(self.changed)
+			Giraffe.ExportPart(bf.BuildFilter(layer = "input::beams::2 [ncs 2] {deck}"), merge = True)
+			merged = self.read("_system.dat")
+			self.load(self.changed)
+			full = Giraffe.Export().export()
+		finally:
+			gc.bandwidth_renumbering = False
+			gc.compact_numbering = False
+		self.assertTrue("$ numbers compacted" in merged)
+		self.assertEqual(self.records(merged), self.records(full))
+
+	def test_merge_with_splitting(self):
+
+		# the changed deck crosses a column: the full model is built, as lines split in the index cannot be joined again
+		crossing = {"layer": "input::beams::1 [ncs 1] {columns}", "type": "Curve", "points": [[2.5, 0, 0], [2.5, 0, 5]]}
+		self.objects = self.objects + [crossing]
+		gc.split_intersections = True
+		try:
+			self.export_index()
+			self.load(self.changed + [crossing])
+			Giraffe.ExportPart(bf.BuildFilter(layer = "input::beams::2 [ncs 2] {deck}"), merge = True)
+			merged = self.read("_system.dat")
+			self.load(self.changed + [crossing])
+			full = Giraffe.Export().export()
+		finally:
+			gc.split_intersections = False
+		self.assertEqual(merged, full)
+
+	def test_part_with_stages(self):
+
+		self.export_index()
+		self.load(self.changed)
+		gc.bandwidth_renumbering = True
+		try:
+			Giraffe.ExportPart(bf.BuildFilter(groups = [2, 2]))
+		finally:
+			gc.bandwidth_renumbering = False
+		self.assertTrue("merge the part (partial_merge)" in self.read("_system.partial.dat"))
+
+	def test_without_index(self):
+
+		self.load(self.objects)
+		Giraffe.ExportPart(bf.BuildFilter(groups = [2, 2]))
+		self.assertTrue("grp 1" in self.read("_system.dat"))
+		self.assertTrue(os.path.isfile(os.path.join(self.directory, "_system.gmb")))
+
+
+if __name__ == '__main__':
+
+	unittest.main()
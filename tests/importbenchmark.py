@@ -0,0 +1,86 @@
+##
+# Import-time benchmark.
+# Measures how long importing the Giraffe engine takes in a fresh interpreter (cold start, as for every run of the script in Rhino)
+# and which modules the import loads. Importing the engine must not touch the document nor load the modules that only some exports
+# need; the check fails if any of the DEFERRED modules is loaded by the import.
+#
+# usage: python importbenchmark.py [--check] [-n RUNS]
+# - --check = exit with code 1 if a deferred module is loaded at import
+##
+
+# base imports
+import sys
+import os
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# modules only imported when used
+DEFERRED = ["rhinoscriptsyntax", "scriptcontext", "livesync", "catalog", "binarymodel", "backgroundexport", "renumbering", "splitting", "blocks", "exportdaemon", "socket", "query", "takeoff", "sqlite3", "threading", "json", "re"]
+
+CHILD = """
+import sys
+import time
+sys.path.insert(0, %r)
+before = set(sys.modules)
+start = time.time()
+import Giraffe
+duration = time.time() - start
+print(repr(duration))
+print(" ".join(sorted(set(sys.modules) - before)))
+"""
+
+
+def measure(runs = 10):
+
+	"""Imports the engine in fresh interpreters.
+	Returns:
+	  (list of import durations in seconds, list of modules loaded by the import)
+	"""
+
+	durations = []
+	modules = []
+
+	for i in range(runs):
+
+		output = subprocess.check_output([sys.executable, "-c", CHILD % SRC]).decode("utf-8").splitlines()
+
+		durations.append(float(output[0]))
+		modules = output[1].split() if len(output) > 1 else []
+
+	return durations, modules
+
+
+def main(argv):
+
+	"""Command line entry point.
+	Returns:
+	  exit code
+	"""
+
+	runs = int(argv[argv.index("-n") + 1]) if "-n" in argv else 10
+
+	durations, modules = measure(runs)
+
+	durations.sort()
+
+	print("runs:             %d" % runs)
+	print("import time:      %.1f ms (best), %.1f ms (median)" % (1000 * durations[0], 1000 * durations[len(durations) // 2]))
+	print("modules loaded:   %d (%s)" % (len(modules), " ".join(modules)))
+
+	loaded = [name for name in DEFERRED if name in modules]
+
+	if loaded:
+
+		print("deferred modules loaded at import: " + " ".join(loaded))
+
+		if "--check" in argv:
+
+			return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,247 @@
+# base imports
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import livesync as ls
+import Giraffe
+import headlessdocument as hd
+import giraffe_setup as gs
+import giraffe_configure as gc
+import modelstore as ms
+
+class RecordingTarget():
+
+	def __init__(self):
+
+		self.batches = []
+		self.writes = 0
+
+	def apply_changes(self, changes):
+
+		self.batches.append(changes)
+
+	def write(self):
+
+		self.writes += 1
+
+
+def sync(lines, delay = 0.5):
+
+	target = RecordingTarget()
+	source = ls.RecordedEventSource([ls.DocumentEvent.from_string(line) for line in lines])
+	live = ls.LiveSync(source, target, target.write, delay).start()
+
+	return live, target
+
+
+class DocumentEventTest(unittest.TestCase):
+
+	def test_from_string(self):
+
+		event = ls.DocumentEvent.from_string("1.5 modify abc input::beams::1 [ncs 1] | output::startpoints")
+		self.assertEqual(event.time, 1.5)
+		self.assertEqual(event.kind, ls.MODIFY)
+		self.assertEqual(event.guid, "abc")
+		self.assertEqual(event.layer, "input::beams::1 [ncs 1]")
+		self.assertEqual(event.old_layer, "output::startpoints")
+
+	def test_round_trip(self):
+
+		event = ls.DocumentEvent(ls.ADD, "abc", "input::nodes", "", 2.0)
+		parsed = ls.DocumentEvent.from_string(event.to_string())
+		self.assertEqual((parsed.kind, parsed.guid, parsed.layer, parsed.time), (ls.ADD, "abc", "input::nodes", 2.0))
+
+	def test_idle(self):
+
+		event = ls.DocumentEvent.from_string("3 idle")
+		self.assertEqual(event.kind, ls.IDLE)
+		self.assertEqual(event.time, 3.0)
+
+
+class LiveSyncTest(unittest.TestCase):
+
+	def test_debounce(self):
+
+		live, target = sync([
+			"0.0 add a input::beams",
+			"0.2 idle",
+			"0.3 add b input::beams",
+			"0.7 idle",
+			"0.9 idle"
+		])
+		self.assertEqual(target.batches, [[(ls.ADD, "a"), (ls.ADD, "b")]])
+		self.assertEqual(target.writes, 1)
+
+	def test_ignores_other_layers(self):
+
+		live, target = sync([
+			"0.0 add a output::startpoints",
+			"0.0 add b giraffe-dummy",
+			"1.0 idle"
+		])
+		self.assertEqual(target.batches, [])
+
+	def test_moved_out_of_input_layer(self):
+
+		live, target = sync([
+			"0.0 modify a some-layer | input::beams",
+			"1.0 idle"
+		])
+		self.assertEqual(target.batches, [[(ls.UPDATE, "a")]])
+
+	def test_add_then_delete_cancels(self):
+
+		live, target = sync([
+			"0.0 add a input::beams",
+			"0.1 delete a input::beams",
+			"1.0 idle"
+		])
+		self.assertEqual(target.batches, [])
+		self.assertEqual(target.writes, 0)
+
+	def test_replace_coalesces(self):
+
+		live, target = sync([
+			"0.0 delete a input::beams",
+			"0.0 add a input::beams",
+			"0.0 replace a input::beams",
+			"0.1 modify a input::beams | input::beams",
+			"1.0 idle"
+		])
+		self.assertEqual(target.batches, [[(ls.UPDATE, "a")]])
+
+	def test_separate_batches(self):
+
+		live, target = sync([
+			"0.0 add a input::nodes",
+			"1.0 idle",
+			"2.0 delete a input::nodes",
+			"3.0 idle"
+		])
+		self.assertEqual(target.batches, [[(ls.ADD, "a")], [(ls.DELETE, "a")]])
+		self.assertEqual(live.exports, 2)
+
+	def test_failure_is_reported(self):
+
+		class FailingTarget(RecordingTarget):
+
+			def apply_changes(self, changes):
+
+				raise ValueError("broken")
+
+		class Output():
+
+			text = ""
+
+			def write(self, text):
+
+				self.text += text
+
+		target = FailingTarget()
+		source = ls.RecordedEventSource([ls.DocumentEvent(ls.ADD, "a", "input::nodes"), ls.DocumentEvent(ls.IDLE, None, time = 1.0)])
+		output, sys.stdout = sys.stdout, Output()
+		try:
+			live = ls.LiveSync(source, target, target.write).start()
+		finally:
+			output, sys.stdout = sys.stdout, output
+		self.assertEqual(live._errors, ["Live sync failed: broken"])
+		self.assertEqual(output.text, "Giraffe: Live sync failed: broken\n")
+		self.assertEqual(target.writes, 0)
+
+
+class ModelSyncTest(unittest.TestCase):
+
+	def get_store(self):
+
+		return None
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+		self.document = hd.HeadlessDocument(os.path.join(self.directory, "system.giraffe.json"))
+		Giraffe.use_document(self.document)
+		# the beam is built in two pieces
+		gc.divide_curves = True
+		self.beam = self.document.add_object(gs.object_types["Curve"], "input::beams::1", [[0, 0, 0], [1, 0, 0], [2, 0, 0]])
+		Giraffe.GiraffeLayer.setup()
+		self.store = self.get_store()
+		self.model = Giraffe.StructuralModel("structure", store = self.store).build()
+		Giraffe.GiraffeLayer.teardown()
+
+	def tearDown(self):
+
+		gc.divide_curves = False
+		if self.store is not None:
+			self.store.close()
+		shutil.rmtree(self.directory)
+
+	def sync(self, kind):
+
+		source = ls.RecordedEventSource([ls.DocumentEvent(kind, self.beam, "input::beams::1"), ls.DocumentEvent(ls.IDLE, None, time = 1.0)])
+		return ls.LiveSync(source, self.model, lambda: None).start()
+
+	def markers(self):
+
+		return self.document.ObjectsByLayer("output::startpoints")
+
+	def test_update(self):
+
+		self.assertEqual(len(self.markers()), 1)
+		self.sync(ls.MODIFY)
+		self.assertEqual(len(self.markers()), 1)
+		self.assertEqual(len(list(self.model.line_elements.iterate())), 2)
+		self.assertTrue(self.document.LayerLocked("output::startpoints"))
+
+	def test_markers_on_unlocked_layer(self):
+
+		# the output layer is unlocked while markers are drawn, also if it was not set up in this session
+		locked = []
+		add_point = self.document.AddPoint
+		def record(point):
+			locked.append(self.document.LayerLocked("output::startpoints"))
+			return add_point(point)
+		self.document.AddPoint = record
+		Giraffe.GiraffeLayer.endpoints = None
+		self.sync(ls.MODIFY)
+		self.assertEqual(locked, [False])
+		self.assertTrue(self.document.LayerLocked("output::startpoints"))
+		self.assertEqual(self.document.CurrentLayer(), "giraffe-dummy")
+
+	def test_delete(self):
+
+		self.document.DeleteObject(self.beam)
+		self.sync(ls.DELETE)
+		self.assertEqual(self.markers(), [])
+		self.assertEqual(list(self.model.line_elements.iterate()), [])
+		self.assertEqual(list(self.model.nodes.iterate()), [])
+
+	def test_replace_node(self):
+
+		node = self.document.add_object(gs.object_types["Point"], "input::nodes", [[1, 0, 0]], "7")
+		self.model.apply_changes([(ls.ADD, node)])
+		self.assertEqual(sorted([(item.n1.no, item.n2.no) for item in self.model.line_elements.iterate()]), [(1, 7), (7, 3)])
+		self.assertEqual(len(list(self.model.nodes.iterate())), 3)
+		# the node is replaced by an endpoint node again
+		self.document.DeleteObject(node)
+		self.model.apply_changes([(ls.DELETE, node)])
+		numbers = [(item.n1.no, item.n2.no) for item in self.model.line_elements.iterate()]
+		self.assertEqual(len(list(self.model.nodes.iterate())), 3)
+		self.assertFalse(7 in [no for pair in numbers for no in pair])
+		self.assertEqual(numbers[0][1], numbers[1][0])
+
+
+class StoredModelSyncTest(ModelSyncTest):
+
+	def get_store(self):
+
+		return ms.SQLiteStore()
+
+
+if __name__ == '__main__':
+
+	unittest.main()
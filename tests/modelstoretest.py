@@ -0,0 +1,136 @@
+# base imports
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import modelstore as ms
+
+class StoreTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.store = ms.SQLiteStore(cell_size = 0.1, batch_size = 2)
+
+	def tearDown(self):
+
+		self.store.close()
+
+	def add_node(self, no, x, y, z):
+
+		return self.store.insert("nodes", {"typ": "node", "no": no, "grp": -1, "x": x, "y": y, "z": z})
+
+	def test_numbering(self):
+
+		self.add_node(3, 0.0, 0.0, 0.0)
+		self.assertEqual(self.store.is_taken_number("nodes", 3), True)
+		self.assertEqual(self.store.is_taken_number("nodes", 3, 1), False)
+		self.assertEqual(self.store.is_taken_number("line elements", 3), False)
+
+	def test_set_number(self):
+
+		row_id = self.add_node(3, 0.0, 0.0, 0.0)
+		self.store.set_number(row_id, 4)
+		self.assertEqual(self.store.get(row_id)["no"], 4)
+		self.assertEqual(self.store.is_taken_number("nodes", 3), False)
+
+	def test_near(self):
+
+		first = self.add_node(1, 0.0, 0.0, 0.0)
+		self.add_node(2, 0.05, 0.0, 0.0)
+		self.add_node(3, 1.0, 0.0, 0.0)
+		near = self.store.get_near("nodes", 0.01, -0.01, 0.0, 0.1)
+		self.assertEqual([row["no"] for row in near], [1, 2])
+		self.assertEqual(near[0]["id"], first)
+
+	def test_near_across_cells(self):
+
+		self.add_node(1, 0.099, 0.0, 0.0)
+		self.assertEqual(len(self.store.get_near("nodes", 0.101, 0.0, 0.0, 0.1)), 1)
+		self.assertEqual(len(self.store.get_near("nodes", -0.001, 0.0, 0.0, 0.1)), 0)
+
+	def test_topology(self):
+
+		self.store.insert("line elements", {"typ": "beam", "no": 1, "grp": -1, "topo": "1 2"})
+		self.assertEqual(self.store.get_by_topology("line elements", "1 2")["no"], 1)
+		self.assertEqual(self.store.get_by_topology("line elements", "2 1"), None)
+
+	def test_geometry(self):
+
+		self.store.insert("line elements", {"typ": "beam", "no": 1, "geo": "abc"})
+		self.store.insert("line elements", {"typ": "beam", "no": 2})
+		self.assertEqual([row["no"] for row in self.store.get_by_geometry("line elements", "abc")], [1])
+		self.assertEqual([row["no"] for row in self.store.get_by_geometry("line elements", None)], [2])
+
+	def test_iterate_joins_nodes(self):
+
+		n1 = self.add_node(7, 0.0, 0.0, 0.0)
+		n2 = self.add_node(8, 1.0, 2.0, 3.0)
+		self.store.insert("line elements", {"typ": "beam", "no": 1, "n1": n1, "n2": n2})
+		self.store.insert("line elements", {"typ": "beam", "no": 2, "n1": n2, "n2": n1})
+		self.store.set_number(n1, 9)
+		rows = list(self.store.iterate("line elements"))
+		self.assertEqual([(row["no"], row["n1_no"], row["n2_no"]) for row in rows], [(1, 9, 8), (2, 8, 9)])
+		self.assertEqual((rows[0]["n2_x"], rows[0]["n2_y"], rows[0]["n2_z"]), (1.0, 2.0, 3.0))
+		self.assertEqual(rows[0]["n3_no"], None)
+
+	def test_iterate_in_insertion_order(self):
+
+		for i in range(5):
+			self.add_node(10 - i, float(i), 0.0, 0.0)
+		self.assertEqual([row["no"] for row in self.store.iterate("nodes")], [10, 9, 8, 7, 6])
+		self.assertEqual(self.store.count("nodes"), 5)
+
+	def test_replace_references(self):
+
+		n1 = self.add_node(1, 0.0, 0.0, 0.0)
+		n2 = self.add_node(2, 1.0, 0.0, 0.0)
+		n3 = self.add_node(3, 2.0, 0.0, 0.0)
+		self.store.insert("line elements", {"typ": "beam", "no": 1, "n1": n1, "n2": n2, "topo": "%d %d" % (n1, n2)})
+		self.store.insert("springs", {"typ": "spri", "no": 1, "n": n2, "topo": "%d 0.000 0.000 1.000" % n2})
+		self.store.replace_references("line elements", {n2: n3})
+		self.assertEqual(self.store.get_by_topology("line elements", "%d %d" % (n1, n3))["n2"], n3)
+		self.assertEqual(self.store.get_by_topology("springs", "%d 0.000 0.000 1.000" % n2)["n"], n2)
+		self.store.replace_references("springs", {n2: n3})
+		self.assertEqual(self.store.get_by_topology("springs", "%d 0.000 0.000 1.000" % n3)["n"], n3)
+
+	def test_ids_not_reused(self):
+
+		row_id = self.add_node(1, 0.0, 0.0, 0.0)
+		self.store.remove(row_id)
+		self.assertNotEqual(self.add_node(1, 0.0, 0.0, 0.0), row_id)
+
+	def test_remove(self):
+
+		row_id = self.add_node(1, 0.0, 0.0, 0.0)
+		self.store.remove(row_id)
+		self.assertEqual(self.store.count("nodes"), 0)
+
+
+class FileTest(unittest.TestCase):
+
+	def test_unique_files(self):
+
+		# a store still open in a background export is not touched by the next one
+		directory = tempfile.mkdtemp()
+		path = os.path.join(directory, "_system.sqlite")
+		first = ms.SQLiteStore(path)
+		first.insert("nodes", {"typ": "node", "no": 1})
+		first.commit()
+		second = ms.SQLiteStore(path)
+		self.assertNotEqual(first.path, second.path)
+		self.assertEqual(os.path.dirname(second.path), directory)
+		self.assertEqual(second.count("nodes"), 0)
+		self.assertEqual(first.count("nodes"), 1)
+		first.close()
+		second.close()
+		self.assertEqual(os.listdir(directory), [])
+		shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+
+	unittest.main()
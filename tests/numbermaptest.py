@@ -0,0 +1,79 @@
+# base imports
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import numbermap as nm
+
+class NumberMapTest(unittest.TestCase):
+
+	def test_get(self):
+
+		m = nm.NumberMap().set("a", 5, 2)
+		self.assertEqual(m.get("a", 2), 5)
+
+	def test_get_unknown(self):
+
+		m = nm.NumberMap()
+		self.assertEqual(m.get("a"), -1)
+
+	def test_get_other_group(self):
+
+		m = nm.NumberMap().set("a", 5, 2)
+		self.assertEqual(m.get("a", 3), -1)
+
+	def test_reserved(self):
+
+		m = nm.NumberMap().set("a", 5)
+		self.assertEqual(m.is_reserved(5), True)
+		self.assertEqual(m.is_reserved(5, 1), False)
+
+	def test_reset_releases_reservation(self):
+
+		m = nm.NumberMap().set("a", 5).set("a", 6)
+		self.assertEqual(m.is_reserved(5), False)
+		self.assertEqual(m.is_reserved(6), True)
+
+	def test_missing_key_is_ignored(self):
+
+		m = nm.NumberMap().set(None, 5)
+		self.assertEqual(len(m), 0)
+
+
+class SidecarTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, "_system.numbering.json")
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+	def test_round_trip(self):
+
+		nm.save(self.path, {"nodes": nm.NumberMap().set("pt 0.0 1.0 2.0", 3), "line elements": nm.NumberMap().set("abc", 7, 2)})
+		maps = nm.load(self.path)
+		self.assertEqual(maps["nodes"].get("pt 0.0 1.0 2.0"), 3)
+		self.assertEqual(maps["line elements"].get("abc", 2), 7)
+
+	def test_missing_file(self):
+
+		self.assertEqual(nm.load(self.path), {})
+
+	def test_corrupt_file(self):
+
+		f = open(self.path, "w")
+		f.write("{ not json")
+		f.close()
+		self.assertEqual(nm.load(self.path), {})
+
+
+if __name__ == '__main__':
+
+	unittest.main()
@@ -0,0 +1,102 @@
+# base imports
+import sys
+import os
+import random
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import Giraffe
+import query as qr
+
+class QueryTest(unittest.TestCase):
+
+	def setUp(self):
+
+		random.seed(3)
+		self.model = Giraffe.StructuralModel("test", 1.0)
+		self.nodes = [self.model.nodes.add(Giraffe.Node(None, [random.uniform(0, 100), random.uniform(0, 50), random.choice([0, 3, 6])])) for i in range(400)]
+		columns = self.model.get_layer("input::beams::2 [ncs 1] {columns}")
+		for i in range(200):
+			bm = Giraffe.LineElement(None, "beam")
+			bm.n1, bm.n2 = random.sample(self.nodes, 2)
+			bm.layer = columns if i % 2 else None
+			self.model.line_elements.add(bm)
+
+	def points(self, nodes):
+
+		return sorted([qr.get_point(node) for node in nodes])
+
+	def test_box(self):
+
+		low, high = [20, 10, 0], [60, 30, 3]
+		expected = [node for node in self.nodes if qr.is_inside(qr.get_point(node), low, high)]
+		self.assertEqual(self.points(self.model.get_nodes_in_box(low, high)), self.points(expected))
+		# a box around the whole model covers more cells than are occupied
+		self.assertEqual(len(self.model.get_nodes_in_box([-1e6] * 3, [1e6] * 3)), 400)
+
+	def test_radius(self):
+
+		center = (50, 25, 3)
+		found = self.model.get_nodes_in_radius(center, 12)
+		self.assertEqual(self.points(found), self.points([node for node in self.nodes if Giraffe.distance_to_segment(qr.get_point(node), center, center) <= 12]))
+		distances = [Giraffe.distance_to_segment(qr.get_point(node), center, center) for node in found]
+		self.assertEqual(distances, sorted(distances))
+
+	def test_nearest(self):
+
+		for point in [(0, 0, 0), (33.3, 12.1, 2), (500, -200, 40)]:
+			expected = min(self.nodes, key = lambda node: Giraffe.distance_to_segment(qr.get_point(node), point, point))
+			self.assertTrue(self.model.get_nearest_node(point) is expected)
+		self.assertEqual(Giraffe.StructuralModel("empty", 1.0).get_nearest_node((0, 0, 0)), None)
+
+	def test_elements_in_box(self):
+
+		low, high = [0, 0, 0], [70, 40, 6]
+		expected = [bm for bm in self.model.line_elements.iterate() if qr.is_inside(qr.get_point(bm.n1), low, high) and qr.is_inside(qr.get_point(bm.n2), low, high)]
+		self.assertEqual(sorted([id(bm) for bm in self.model.get_elements_in_box(low, high)]), sorted([id(bm) for bm in expected]))
+
+	def test_attributes(self):
+
+		self.assertEqual(len(self.model.get_by_group(2)), 100)
+		self.assertEqual(len(self.model.get_by_prop("ncs 1", "line elements")), 100)
+		self.assertEqual(self.model.get_by_prop("ncs 1", "nodes"), [])
+		self.assertEqual(len(self.model.get_by_layer(None, "line elements")), 100)
+		self.assertEqual(len(self.model.get_by_group(-1, "nodes")), 400)
+
+	def test_merged_props(self):
+
+		hinge = Giraffe.LineElement(None, "beam")
+		hinge.n1, hinge.n2 = self.nodes[0], self.nodes[1]
+		hinge.layer = self.model.get_layer("input::beams::2 [ncs 1] {columns}")
+		hinge.prop = "AHIN mymz"
+		self.model.line_elements.add(hinge, unique = True)
+		self.assertEqual(len(self.model.get_by_prop("ncs 1", "line elements")), 101)
+		self.assertEqual(self.model.get_by_prop("ncs 1 ahin mymz"), [hinge])
+		self.assertEqual(self.model.get_by_prop("ahin mymz ncs 2"), [])
+		self.assertEqual(len(self.model.get_by_prop("", "line elements")), 100)
+
+	def test_node_index(self):
+
+		# queries and node dedupe share the node index of the model
+		self.assertTrue(self.model.get_query().get_node_grid() is self.model.nodes.get_node_index())
+		node = self.nodes[0]
+		self.assertTrue(self.model.nodes.add(Giraffe.Node(None, [node.x + 0.05, node.y, node.z])) is node)
+		self.model.nodes.remove(node)
+		self.assertFalse(self.model.nodes.add(Giraffe.Node(None, [node.x, node.y, node.z])) is node)
+
+	def test_invalidated(self):
+
+		self.assertEqual(len(self.model.get_nodes_in_radius((200, 0, 0), 1)), 0)
+		doc = __import__("headlessdocument").HeadlessDocument("system.giraffe.json")
+		Giraffe.use_document(doc)
+		obj = doc.add_object(1, "input::nodes", [[200, 0, 0]], "[fix pp]")
+		self.model.add_object(obj, self.model.get_layer("input::nodes"))
+		self.assertEqual(len(self.model.get_nodes_in_radius((200, 0, 0), 1)), 1)
+		self.model.remove_object(obj)
+		self.assertEqual(len(self.model.get_nodes_in_radius((200, 0, 0), 1)), 0)
+
+
+if __name__ == '__main__':
+
+	unittest.main()
@@ -0,0 +1,66 @@
+# base imports
+import sys
+import os
+import random
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import Giraffe
+import renumbering as rn
+
+class RenumberingTest(unittest.TestCase):
+
+	def grid(self, nx, ny):
+
+		"""Returns nodes of a grid of quads, numbered in random order, and their adjacency."""
+
+		nodes = [Giraffe.Node(None, [i, j, 0]) for j in range(ny) for i in range(nx)]
+		numbers = list(range(1, len(nodes) + 1))
+		random.Random(0).shuffle(numbers)
+		for node, no in zip(nodes, numbers):
+			node.no = no
+		adjacency = dict([(id(node), set()) for node in nodes])
+		for j in range(ny):
+			for i in range(nx):
+				for di, dj in [(1, 0), (0, 1)]:
+					if (i + di < nx) and (j + dj < ny):
+						a, b = id(nodes[j * nx + i]), id(nodes[(j + dj) * nx + i + di])
+						adjacency[a].add(b)
+						adjacency[b].add(a)
+		return nodes, adjacency
+
+	def test_measure(self):
+
+		nodes, adjacency = self.grid(3, 1)
+		for node, no in zip(nodes, [1, 3, 2]):
+			node.no = no
+		self.assertEqual(rn.measure(nodes, adjacency), (2, 2))
+
+	def test_reverse_cuthill_mckee(self):
+
+		nodes, adjacency = self.grid(20, 4)
+		order = rn.reverse_cuthill_mckee(nodes, adjacency)
+		self.assertEqual(sorted(order), sorted([id(node) for node in nodes]))
+		before = rn.measure(nodes, adjacency)
+		by_id = dict([(id(node), node) for node in nodes])
+		for no, a in enumerate(order):
+			by_id[a].no = no + 1
+		after = rn.measure(nodes, adjacency)
+		# the grid is numbered across its short side
+		self.assertTrue(after[0] <= 5)
+		self.assertTrue(after[0] < before[0])
+		self.assertTrue(after[1] < before[1])
+
+	def test_components(self):
+
+		nodes, adjacency = self.grid(2, 1)
+		single = Giraffe.Node(None, [5, 5, 5])
+		adjacency[id(single)] = set()
+		order = rn.reverse_cuthill_mckee(nodes + [single], adjacency)
+		self.assertEqual(len(order), 3)
+
+
+if __name__ == '__main__':
+
+	unittest.main()
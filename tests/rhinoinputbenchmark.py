@@ -0,0 +1,244 @@
+##
+# RhinoInput micro-benchmark.
+# RhinoInput parses every object name and layer segment of a model, this measures its throughput on a corpus of realistic inputs:
+# - parses per second, a parse being what the build does per input: RhinoInput(s).get_no(), get_prop() and get_name()
+# - memory allocated per parse (peak) and memory blocks kept per parsed input, if tracemalloc is available (CPython 3.9+)
+# Timings are divided by the time of a calibration loop over the same corpus (strip, find and slice only), so that the ratio can be
+# compared across machines. The check fails if the ratio is more than THRESHOLD above the baseline stored next to this file.
+#
+# usage: python rhinoinputbenchmark.py [--check] [--save] [-n INPUTS]
+# - --check = exit with code 1 on a throughput regression
+# - --save = store the measured ratio as the new baseline
+##
+
+# base imports
+import sys
+import os
+import gc as _gc
+import json
+import random
+import timeit
+
+# import benchmarked module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import rhinoinput as ri
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "rhinoinputbenchmark.json")
+
+# tolerated slowdown relative to the baseline
+THRESHOLD = 0.3
+
+PROPS = ["gdiv 4", "fix px", "fix pp", "ncs 1", "ncs 12 mno 2", "ncs 3 ncse 4", "mno 1", "#", ""]
+NAMES = ["beam", "columns", "deck", "hangers", "main cable", "support", ""]
+
+
+def make_corpus(count = 10000, seed = 0):
+
+	"""Returns a list of layer segments and object names in the forms seen in models, e.g. '2 [gdiv 4] {beam}', '[fix px]',
+	'gdiv 4 {name}' and '[]'.
+	"""
+
+	r = random.Random(seed)
+
+	forms = [
+		lambda: str(r.randint(1, 999)) + " [" + r.choice(PROPS) + "] {" + r.choice(NAMES) + "}",
+		lambda: str(r.randint(1, 999)) + " [" + r.choice(PROPS) + "]",
+		lambda: str(r.randint(1, 99999)),
+		lambda: "[" + r.choice(PROPS) + "]",
+		lambda: r.choice(PROPS) + " {" + r.choice(NAMES) + "}",
+		lambda: "[]",
+		lambda: r.choice(["input", "beams", "trusses", "cables", "nodes", "springs", "quads"])
+	]
+
+	return [r.choice(forms)() for i in range(count)]
+
+
+def parse(s):
+
+	"""Parses a single input the way the model build does."""
+
+	inp = ri.RhinoInput(s)
+
+	return (inp.get_no(), inp.get_prop(), inp.get_name())
+
+
+def calibrate(s):
+
+	"""Reference work per input, independent of RhinoInput."""
+
+	s = s.strip()
+
+	i = s.find("[")
+	j = s.find("{")
+
+	return (s[:i], s[i + 1:j], s[j + 1:])
+
+
+def measure(functions, corpus, repeat = 15):
+
+	"""Returns best times in seconds of applying functions to the whole corpus. Runs of the functions are interleaved, so that
+	they are equally affected by the load of the machine.
+	"""
+
+	def timer(function):
+
+		def run():
+
+			for s in corpus:
+
+				function(s)
+
+		return run
+
+	times = [[] for function in functions]
+
+	for i in range(repeat):
+
+		for j, function in enumerate(functions):
+
+			times[j].append(timeit.timeit(timer(function), number = 1))
+
+	return [min(t) for t in times]
+
+
+def measure_memory(corpus):
+
+	"""Returns (peak bytes allocated per parse, memory blocks kept per parsed input); None if tracemalloc is not available."""
+
+	try:
+
+		import tracemalloc
+
+	except ImportError:
+
+		return None
+
+	# peaks per parse need Python 3.9
+	if not hasattr(tracemalloc, "reset_peak"):
+
+		return None
+
+	_gc.collect()
+
+	tracemalloc.start()
+
+	peaks = 0
+
+	for s in corpus:
+
+		tracemalloc.reset_peak()
+		before = tracemalloc.get_traced_memory()[0]
+
+		parse(s)
+
+		peaks += tracemalloc.get_traced_memory()[1] - before
+
+	tracemalloc.stop()
+
+	_gc.collect()
+
+	blocks = sys.getallocatedblocks()
+	results = [parse(s) for s in corpus]
+	kept = sys.getallocatedblocks() - blocks
+
+	del results
+
+	return (float(peaks) / len(corpus), float(kept) / len(corpus))
+
+
+def run(count = 50000):
+
+	"""Runs the benchmark.
+	Returns:
+	  dictionary of results
+	"""
+
+	corpus = make_corpus(count)
+
+	parse_time, calibration_time = measure([parse, calibrate], corpus)
+
+	results = {
+		"inputs": len(corpus),
+		"parses_per_second": len(corpus) / parse_time,
+		"ratio": parse_time / calibration_time
+	}
+
+	memory = measure_memory(corpus)
+
+	if memory:
+
+		results["bytes_per_parse"], results["blocks_per_parse"] = memory
+
+	return results
+
+
+def load_baseline():
+
+	"""Returns baseline ratio; None if no baseline is stored."""
+
+	if not os.path.isfile(BASELINE_PATH):
+
+		return None
+
+	f = open(BASELINE_PATH, "r")
+	baseline = json.load(f)
+	f.close()
+
+	return baseline["ratio"]
+
+
+def save_baseline(results):
+
+	"""Stores the measured ratio as baseline."""
+
+	f = open(BASELINE_PATH, "w")
+	json.dump({"ratio": round(results["ratio"], 2)}, f)
+	f.close()
+
+
+def main(argv):
+
+	"""Command line entry point.
+	Returns:
+	  exit code
+	"""
+
+	count = int(argv[argv.index("-n") + 1]) if "-n" in argv else 50000
+
+	results = run(count)
+
+	print("inputs:           %d" % results["inputs"])
+	print("parses/s:         %.0f" % results["parses_per_second"])
+	print("ratio:            %.2f (parse time / calibration time)" % results["ratio"])
+
+	if "bytes_per_parse" in results:
+
+		print("bytes/parse:      %.0f (peak)" % results["bytes_per_parse"])
+		print("blocks/parse:     %.1f (kept by the result)" % results["blocks_per_parse"])
+
+	baseline = load_baseline()
+
+	if "--save" in argv:
+
+		save_baseline(results)
+
+		print("baseline saved")
+
+	elif baseline is not None:
+
+		change = results["ratio"] / baseline - 1
+
+		print("baseline ratio:   %.2f (%+.0f%%)" % (baseline, 100 * change))
+
+		if "--check" in argv and change > THRESHOLD:
+
+			print("throughput regression: more than %.0f%% slower than the baseline" % (100 * THRESHOLD))
+
+			return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+
+	sys.exit(main(sys.argv[1:]))
@@ -78,6 +78,16 @@ class IntegrationTest(unittest.TestCase):
 		self.assertEqual(inp.get_name(), "")
 
 
+class MergePropsTest(unittest.TestCase):
+
+	def test_merge(self):
+
+		self.assertEqual(ri.merge_props("ncs 2", "ahin mymz"), "ncs 2 ahin mymz")
+		self.assertEqual(ri.merge_props("ncs 2 mno 1", "NCS 3"), "mno 1 NCS 3")
+		self.assertEqual(ri.merge_props("ncs 2 ", ""), "ncs 2")
+		self.assertEqual(ri.merge_props("", " ncs 3"), "ncs 3")
+
+
 if __name__ == '__main__':
 
 	unittest.main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+# base imports
+import sys
+import os
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import Giraffe
+import splitting as sp
+
+class SplittingTest(unittest.TestCase):
+
+	def line(self, p, q):
+
+		element = Giraffe.LineElement(None, "beam")
+		element.n1 = Giraffe.Node(None, p)
+		element.n2 = Giraffe.Node(None, q)
+		return element
+
+	def test_closest_points(self):
+
+		self.assertEqual(sp.closest_points((0, 0, 0), (2, 0, 0), (1, -1, 1), (1, 1, 1)), (0.5, 0.5))
+		self.assertEqual(sp.closest_points((0, 0, 0), (2, 0, 0), (0, 1, 0), (2, 1, 0)), None)
+		s, t = sp.closest_points((0, 0, 0), (2, 0, 0), (3, -1, 0), (3, 1, 0))
+		self.assertEqual((s, t), (1.0, 0.5))
+
+	def test_grid_of_lines(self):
+
+		# 10 x 10 crossing lines, lines of different lengths in cells of different sizes
+		lines = [self.line((0, i * 100, 0), (1000 + 500 * (i % 2), i * 100, 0)) for i in range(1, 11)]
+		lines += [self.line((i * 90, 0, 0), (i * 90, 1200, 0)) for i in range(1, 11)]
+		splits = sp.find_intersections(lines, 0.1)
+		self.assertEqual(sorted([len(splits[id(line)]) for line in lines]), [10] * 20)
+		horizontal = sorted(splits[id(lines[0])])
+		self.assertEqual([point for s, point in horizontal], [(i * 90.0, 100.0, 0.0) for i in range(1, 11)])
+
+	def test_tolerance(self):
+
+		lines = [self.line((0, 0, 0), (10, 0, 0)), self.line((5, -5, 0.05), (5, 5, 0.05)), self.line((7, -5, 1), (7, 5, 1))]
+		splits = sp.find_intersections(lines, 0.1)
+		self.assertEqual(len(splits[id(lines[0])]), 1)
+		self.assertFalse(id(lines[2]) in splits)
+
+	def test_endpoints(self):
+
+		# lines meeting at an end share a node already, T-junctions are not intersections
+		lines = [self.line((0, 0, 0), (10, 0, 0)), self.line((10, 0, 0), (10, 10, 0)), self.line((5, 0, 0), (5, 10, 0))]
+		self.assertEqual(sp.find_intersections(lines, 0.1), {})
+
+	def test_nodes_on_lines(self):
+
+		lines = [self.line((0, 0, 0), (10, 0, 0)), self.line((5, 0.05, 0), (5, 10, 0)), self.line((0, 0, 0), (0, 0, 0))]
+		nodes = [lines[0].n1, lines[0].n2, lines[1].n1, lines[1].n2, Giraffe.Node(None, [2, 0, 0]), Giraffe.Node(None, [10.05, 0, 0])]
+		splits = sp.find_nodes_on_lines(lines, nodes, 0.1)
+		self.assertEqual(list(splits.keys()), [id(lines[0])])
+		self.assertEqual(sorted(splits[id(lines[0])]), [(0.2, (2.0, 0.0, 0.0)), (0.5, (5.0, 0.05, 0.0))])
+
+	def test_node_index(self):
+
+		index = sp.NodeIndex([Giraffe.Node(None, [0, 0, 0]), Giraffe.Node(None, [1, 0.15, 0])], 0.1)
+		self.assertEqual(index.get((0.09, 0, 0)).x, 0)
+		self.assertEqual(index.get((1, 0.21, 0)).y, 0.15)
+		self.assertEqual(index.get((0.5, 0, 0)), None)
+
+
+if __name__ == '__main__':
+
+	unittest.main()
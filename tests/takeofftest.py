@@ -0,0 +1,84 @@
+# base imports
+import sys
+import os
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import Giraffe
+import catalog as cat
+import takeoff as tk
+
+class MeasureTest(unittest.TestCase):
+
+	def test_lengths(self):
+
+		self.assertEqual(tk.get_lengths([0, 1], [0, 0], [0, 0], [3, 1], [4, 0], [0, 2]), [5.0, 2.0])
+
+	def test_areas(self):
+
+		self.assertEqual(tk.get_areas([0], [0], [0], [2], [0], [0], [2], [3], [0], [0], [3], [0]), [6.0])
+
+	def test_value(self):
+
+		self.assertEqual(tk.get_value("ncs 1 div 4", "ncs"), 1)
+		self.assertEqual(tk.get_value("T 0.5", "t"), 0.5)
+		self.assertEqual(tk.get_value("ncs #ncs", "ncs"), None)
+		self.assertEqual(tk.get_value("", "mno"), None)
+
+
+class TakeoffTest(unittest.TestCase):
+
+	def element(self, typ, points, layer, prop = ""):
+
+		element = Giraffe.LineElement(None, typ) if len(points) == 2 else Giraffe.AreaElement(None)
+		for attr, point in zip(element.get_node_attributes() or ["n1", "n2", "n3", "n4"][:len(points)], points):
+			setattr(element, attr, Giraffe.Node(None, point))
+		element.layer = Giraffe.GiraffeLayer(layer)
+		element.prop = prop
+		return element
+
+	def test_rows(self):
+
+		catalog = cat.Catalog().parse_lines(["stee no 1 gam 78.5", "srec 1 h 100 b 200 mno 1", "mate 2 gam 25"], ".")
+		takeoff = tk.Takeoff(catalog, 0.001)
+		takeoff.add(self.element("beam", [[0, 0, 0], [3000, 0, 0]], "input::beams::2 [ncs 1]"), "line elements")
+		takeoff.add(self.element("beam", [[0, 0, 0], [0, 4000, 0]], "input::beams::2 [ncs 1]"), "line elements")
+		takeoff.add(self.element("beam", [[0, 0, 0], [0, 0, 1000]], "input::beams::2 [ncs 1]", "ncs 9"), "line elements")
+		takeoff.add(self.element("quad", [[0, 0, 0], [0, 2000, 0], [1000, 2000, 0], [1000, 0, 0]], "input::quads::[mno 2 t 200]"), "area elements")
+		takeoff.add(Giraffe.Node(None, [0, 0, 0]), "nodes")
+		rows = takeoff.get_rows()
+		self.assertEqual([(row["list"], row["grp"], row["prop"], row["count"]) for row in rows], [
+			("area elements", -1, "mno 2 t 200", 1),
+			("line elements", 2, "ncs 1", 2),
+			("line elements", 2, "ncs 9", 1)
+		])
+		self.assertAlmostEqual(rows[0]["area"], 2.0)
+		self.assertAlmostEqual(rows[0]["weight"], 2.0 * 0.2 * 25)
+		self.assertAlmostEqual(rows[1]["length"], 7.0)
+		self.assertAlmostEqual(rows[1]["weight"], 7.0 * 0.02 * 78.5)
+		self.assertAlmostEqual(rows[1]["mass"], rows[1]["weight"] / 9.81)
+		self.assertEqual((rows[2]["length"], rows[2]["weight"], rows[2]["mass"]), (1.0, None, None))
+
+	def test_element_props(self):
+
+		# a hinge on a layer with a section keeps the section of the layer
+		catalog = cat.Catalog().parse_lines(["stee no 1 gam 78.5", "srec 2 h 100 b 100 mno 1"], ".")
+		takeoff = tk.Takeoff(catalog, 0.001)
+		takeoff.add(self.element("beam", [[0, 0, 0], [2000, 0, 0]], "input::beams::2 [ncs 2]", "ahin mymz"), "line elements")
+		takeoff.add(self.element("beam", [[0, 0, 0], [0, 0, 1000]], "input::beams::2 [ncs 2]", "mno 3"), "line elements")
+		rows = takeoff.get_rows()
+		self.assertEqual([row["prop"] for row in rows], ["ncs 2 ahin mymz", "ncs 2 mno 3"])
+		self.assertAlmostEqual(rows[0]["weight"], 2.0 * 0.01 * 78.5)
+		self.assertEqual(rows[1]["weight"], None)
+
+	def test_without_catalog(self):
+
+		takeoff = tk.Takeoff()
+		takeoff.add(self.element("beam", [[0, 0, 0], [1, 0, 0]], "input::beams [ncs 1]"), "line elements")
+		self.assertEqual(takeoff.get_rows()[0]["weight"], None)
+
+
+if __name__ == '__main__':
+
+	unittest.main()
@@ -0,0 +1,62 @@
+# base imports
+import sys
+import os
+import unittest
+
+# import tested module
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import writers as wr
+
+class CsvWriterTest(unittest.TestCase):
+
+	def test_quote(self):
+
+		writer = wr.CsvWriter()
+		self.assertEqual(writer.quote(None), "")
+		self.assertEqual(writer.quote(2), "2")
+		self.assertEqual(writer.quote(0.1 * 3), repr(0.1 * 3))
+		self.assertEqual(writer.quote("a, b"), '"a, b"')
+		self.assertEqual(writer.quote('say "b"'), '"say ""b"""')
+
+
+class LoopTest(unittest.TestCase):
+
+	def test_split_record(self):
+
+		head, values, texts = wr.split_record("node no 3 x 0.5*#cf y 0.0*#cf z 1.0*#cf  $ n", "  $ n")
+		self.assertEqual(head, ("node", ("no", "x", "y", "z"), ("", "*#cf", "*#cf", "*#cf"), "  $ n"))
+		self.assertEqual(values, [3, 0.5, 0.0, 1.0])
+		self.assertEqual(texts, ["3", "0.5", "0.0", "1.0"])
+		self.assertEqual(wr.split_record("beam no 1 na 1 ne 2 ncs", ""), None)
+
+	def test_find_runs(self):
+
+		rows = [wr.split_record("node no " + str(no) + " x " + repr(x), "") for no, x in [(1, 0.0), (2, 0.5), (3, 1.0), (4, 2.0), (5, 3.0)]]
+		self.assertEqual(wr.find_runs(rows), [(0, 3, [1, 0.5]), (3, 2, [1, 1.0])])
+		self.assertEqual(wr.find_runs([None] + rows[:1]), [(0, 1, None), (1, 1, None)])
+
+	def test_inexact_increments(self):
+
+		# 0.1 + 0.1 + 0.1 is not 0.3: the third node is not in the run
+		rows = [wr.split_record("node no " + str(no) + " x " + repr(x), "") for no, x in [(1, 0.1), (2, 0.2), (3, 0.3)]]
+		self.assertEqual(wr.find_runs(rows), [(0, 2, [1, 0.1]), (2, 1, None)])
+
+	def test_format_loop(self):
+
+		row = wr.split_record("beam no 5 na 10 ne 9 ", " ")
+		self.assertEqual(wr.format_loop(row, 3, [1, 0, -1]), "let#gl0 5\nlet#gl2 9\nloop 3\nbeam no #gl0 na 10 ne #gl2 \nlet#gl0 #gl0+1\nlet#gl2 #gl2-1\nendloop\n")
+
+
+class FormatsTest(unittest.TestCase):
+
+	def test_formats(self):
+
+		for name in wr.FORMATS:
+			writer, extension = wr.FORMATS[name]
+			self.assertTrue(issubclass(writer, wr.Writer))
+			self.assertTrue(extension.startswith("."))
+
+
+if __name__ == '__main__':
+
+	unittest.main()